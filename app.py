@@ -1,25 +1,129 @@
-from flask import Flask, render_template, request, jsonify
-from src.compilador_api import compilar_para_web
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import Flask, Response, render_template, request, jsonify
+from src.compilador_api import compilar_com_cache, pagina_ast, MODOS_EXECUCAO, FORMATOS_AST, PROFUNDIDADE_PAGINA, FILHOS_PAGINA
+from src.cache import CacheCompilacao
+from src.incremental import AnalisadorIncremental
+from src.lote import compilar_lote
+from src.orcamento import Orcamento
+from src.metricas import RegistroMetricas
+from src.tarefas import FilaTarefas, FilaCheia
+from src.sessao_ast import ArvoresSessao
 
 app = Flask(__name__)
 
+# Cache de resultados por hash do código (configurável por variáveis de ambiente)
+cache = CacheCompilacao(
+    max_entradas=int(os.environ.get('COMPILADOR_CACHE_MAX_ENTRADAS', 256)),
+    max_bytes=int(os.environ.get('COMPILADOR_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    diretorio=os.environ.get('COMPILADOR_CACHE_DIR') or None,
+)
+# Tokens/AST por declaração de topo, reaproveitados entre submissões parecidas
+incremental = AnalisadorIncremental()
+# Tempos e contadores por fase acumulados de todas as compilações (GET /api/metricas)
+metricas = RegistroMetricas()
+# Árvores das compilações com formato_ast='paginado', lidas aos pedaços por GET /api/ast/<id>
+arvores = ArvoresSessao(
+    max_arvores=int(os.environ.get('COMPILADOR_AST_MAX_ARVORES', 64)),
+    validade=float(os.environ.get('COMPILADOR_AST_VALIDADE', 1800)),
+)
+
+# Pool de processos do endpoint de lote, criado na primeira requisição e reaproveitado
+TRABALHADORES_LOTE = int(os.environ.get('COMPILADOR_LOTE_TRABALHADORES', os.cpu_count() or 1))
+MAX_FONTES_LOTE = int(os.environ.get('COMPILADOR_LOTE_MAX_FONTES', 1000))
+_executor_lote = None
+_trava_executor = threading.Lock()
+
+# Teto dos orçamentos de execução que os clientes podem pedir (campo 'orcamento' do JSON)
+ORCAMENTO_MAXIMO = Orcamento(
+    max_passos=os.environ.get('COMPILADOR_MAX_PASSOS'),
+    max_tempo=os.environ.get('COMPILADOR_MAX_TEMPO'),
+    max_celulas=os.environ.get('COMPILADOR_MAX_CELULAS'),
+    max_bits=os.environ.get('COMPILADOR_MAX_BITS'),
+    max_erros=os.environ.get('COMPILADOR_MAX_ERROS'),
+)
+
+# Compilações assíncronas (/api/compilar/jobs): pool de threads, fila limitada e prazo por tarefa
+def _compilar_tarefa(codigo, modo_execucao, orcamento, otimizar, progresso, formato_ast):
+    return compilar_com_cache(codigo, modo_execucao, cache, incremental, orcamento, otimizar, progresso, formato_ast, arvores)
+
+tarefas = FilaTarefas(
+    _compilar_tarefa,
+    trabalhadores=int(os.environ.get('COMPILADOR_JOBS_TRABALHADORES', 2)),
+    max_pendentes=int(os.environ.get('COMPILADOR_JOBS_MAX_PENDENTES', 64)),
+    tempo_limite=float(os.environ.get('COMPILADOR_JOBS_TEMPO_LIMITE', 60)),
+    retencao=float(os.environ.get('COMPILADOR_JOBS_RETENCAO', 300)),
+    ao_concluir=metricas.registrar,
+)
+
+def executor_lote():
+    global _executor_lote
+    with _trava_executor:
+        if _executor_lote is None:
+            _executor_lote = ProcessPoolExecutor(max_workers=TRABALHADORES_LOTE)
+        return _executor_lote
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/compilar', methods=['POST'])
-def compilar():
-    data = request.get_json()
+def _ler_opcoes(data, exigir_codigo=True):
+    """
+    Opções comuns de /api/compilar, /lote, /jobs e /stream: devolve (opcoes, None), com as
+    chaves codigo, modo_execucao, orcamento, otimizar e formato_ast, ou (None, resposta 400)
+    """
+    if not isinstance(data, dict):
+        return None, (jsonify({
+            'sucesso': False,
+            'erro_geral': "O corpo da requisição deve ser um objeto JSON."
+        }), 400)
+
     codigo_fonte = data.get('codigo', '')
+    modo_execucao = data.get('modo_execucao', 'interpretador')
 
-    if not codigo_fonte:
-        return jsonify({
+    if exigir_codigo and not codigo_fonte:
+        return None, (jsonify({
             'sucesso': False,
             'erro_geral': "Nenhum código fonte fornecido."
-        }), 400
+        }), 400)
+
+    if modo_execucao not in MODOS_EXECUCAO:
+        return None, (jsonify({
+            'sucesso': False,
+            'erro_geral': f"Modo de execução inválido: '{modo_execucao}'."
+        }), 400)
 
     try:
-        resultados = compilar_para_web(codigo_fonte)
+        orcamento = Orcamento.de_dict(data.get('orcamento'), ORCAMENTO_MAXIMO)
+    except ValueError as e:
+        return None, (jsonify({'sucesso': False, 'erro_geral': str(e)}), 400)
+
+    otimizar = data.get('otimizar', False)
+    if not isinstance(otimizar, bool):
+        return None, (jsonify({'sucesso': False, 'erro_geral': "'otimizar' deve ser true ou false."}), 400)
+
+    # 'compacto': a AST da visualização vem em listas planas ('ast_compacta') em vez de 'ast_json';
+    # 'paginado': só a primeira página ('ast_paginada'), o resto vem de GET /api/ast/<id>
+    formato_ast = data.get('formato_ast', 'json')
+    if formato_ast not in FORMATOS_AST:
+        return None, (jsonify({'sucesso': False, 'erro_geral': f"'formato_ast' deve ser um de: {', '.join(FORMATOS_AST)}."}), 400)
+
+    return {'codigo': codigo_fonte, 'modo_execucao': modo_execucao, 'orcamento': orcamento, 'otimizar': otimizar,
+            'formato_ast': formato_ast}, None
+
+@app.route('/api/compilar', methods=['POST'])
+def compilar():
+    data = request.get_json(silent=True)
+    opcoes, erro = _ler_opcoes(data)
+    if erro: return erro
+
+    try:
+        resultados = compilar_com_cache(opcoes['codigo'], opcoes['modo_execucao'], cache, incremental, opcoes['orcamento'],
+                                        opcoes['otimizar'], formato_ast=opcoes['formato_ast'], arvores=arvores)
+        metricas.registrar(resultados)
         return jsonify(resultados), 200
 
     except Exception as e:
@@ -28,5 +132,147 @@ def compilar():
             'erro_geral': f"Erro interno do servidor ao compilar: {str(e)}"
         }), 500
 
+@app.route('/api/compilar/lote', methods=['POST'])
+def compilar_em_lote():
+    data = request.get_json(silent=True)
+    opcoes, erro = _ler_opcoes(data, exigir_codigo=False)
+    if erro: return erro
+
+    fontes = data.get('fontes')
+
+    # Aceita {"nome": "código", ...} ou [{"nome": ..., "codigo": ...}, ...]
+    if isinstance(fontes, list):
+        fontes = {str(f.get('nome', i)): f.get('codigo', '') for i, f in enumerate(fontes) if isinstance(f, dict)}
+
+    if not isinstance(fontes, dict) or not fontes:
+        return jsonify({
+            'sucesso': False,
+            'erro_geral': "Nenhuma fonte fornecida (campo 'fontes')."
+        }), 400
+
+    if len(fontes) > MAX_FONTES_LOTE:
+        return jsonify({
+            'sucesso': False,
+            'erro_geral': f"Lote grande demais: {len(fontes)} fontes (máximo {MAX_FONTES_LOTE})."
+        }), 400
+
+    try:
+        lote = compilar_lote(fontes, opcoes['modo_execucao'], TRABALHADORES_LOTE, executor_lote(), opcoes['orcamento'],
+                             opcoes['otimizar'])
+        for resultados in lote['resultados'].values():
+            metricas.registrar(resultados)
+        lote['sucesso'] = True
+        return jsonify(lote), 200
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro_geral': f"Erro interno do servidor ao compilar o lote: {str(e)}"
+        }), 500
+
+@app.route('/api/compilar/jobs', methods=['POST'])
+def criar_tarefa():
+    data = request.get_json(silent=True)
+    opcoes, erro = _ler_opcoes(data)
+    if erro: return erro
+
+    try:
+        tarefa = tarefas.submeter(opcoes['codigo'], opcoes['modo_execucao'], opcoes['orcamento'], opcoes['otimizar'],
+                                  formato_ast=opcoes['formato_ast'])
+    except FilaCheia as e:
+        return jsonify({'sucesso': False, 'erro_geral': str(e)}), 429
+
+    return jsonify({'sucesso': True, 'id': tarefa.id, 'estado': tarefa.estado,
+                    'url': f"/api/compilar/jobs/{tarefa.id}"}), 202
+
+# Intervalo (s) dos comentários que mantêm o stream vivo enquanto uma fase demora
+INTERVALO_PING_SSE = 15
+
+def _evento_sse(nome, dados):
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+# Mesmo JSON de /api/compilar; a resposta é um text/event-stream com um evento por fase
+# (assim que ela termina) e um evento 'fim' com o estado da tarefa
+@app.route('/api/compilar/stream', methods=['POST'])
+def compilar_stream():
+    data = request.get_json(silent=True)
+    opcoes, erro = _ler_opcoes(data)
+    if erro: return erro
+
+    eventos = queue.Queue()
+    try:
+        tarefa = tarefas.submeter(opcoes['codigo'], opcoes['modo_execucao'], opcoes['orcamento'], opcoes['otimizar'],
+                                  eventos, opcoes['formato_ast'])
+    except FilaCheia as e:
+        return jsonify({'sucesso': False, 'erro_geral': str(e)}), 429
+
+    def gerar():
+        try:
+            yield _evento_sse('tarefa', {'id': tarefa.id})
+            while True:
+                try:
+                    fase, dados = eventos.get(timeout=INTERVALO_PING_SSE)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield _evento_sse(fase, dados)
+                if fase == 'fim': return
+        finally:
+            # Cliente desconectado antes do fim: a execução não precisa continuar
+            tarefas.cancelar(tarefa.id)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/compilar/jobs/<id_tarefa>', methods=['GET'])
+def consultar_tarefa(id_tarefa):
+    dados = tarefas.consultar(id_tarefa)
+    if dados is None:
+        return jsonify({'sucesso': False, 'erro_geral': f"Tarefa desconhecida: '{id_tarefa}'."}), 404
+    return jsonify(dados), 200
+
+@app.route('/api/compilar/jobs/<id_tarefa>', methods=['DELETE'])
+def cancelar_tarefa(id_tarefa):
+    dados = tarefas.cancelar(id_tarefa)
+    if dados is None:
+        return jsonify({'sucesso': False, 'erro_geral': f"Tarefa desconhecida: '{id_tarefa}'."}), 404
+    return jsonify(dados), 200
+
+@app.route('/api/compilar/jobs', methods=['GET'])
+def estatisticas_tarefas():
+    return jsonify(tarefas.estatisticas()), 200
+
+# Um pedaço da árvore guardada: ?no=<caminho>&profundidade=&inicio=&limite= (ver pagina_ast)
+@app.route('/api/ast/<id_arvore>', methods=['GET'])
+def pagina_arvore(id_arvore):
+    raiz = arvores.obter(id_arvore)
+    if raiz is None:
+        return jsonify({'sucesso': False, 'erro_geral': f"Árvore desconhecida ou expirada: '{id_arvore}'. Compile o programa de novo."}), 404
+
+    try:
+        profundidade = int(request.args.get('profundidade', PROFUNDIDADE_PAGINA))
+        inicio = int(request.args.get('inicio', 0))
+        limite = int(request.args.get('limite', FILHOS_PAGINA))
+    except ValueError:
+        return jsonify({'sucesso': False, 'erro_geral': "'profundidade', 'inicio' e 'limite' devem ser inteiros."}), 400
+    if profundidade < 1 or inicio < 0 or limite < 1:
+        return jsonify({'sucesso': False, 'erro_geral': "'profundidade' e 'limite' devem ser positivos e 'inicio' não negativo."}), 400
+
+    caminho = request.args.get('no', '')
+    try:
+        pagina = pagina_ast(raiz, caminho, profundidade, inicio, limite)
+    except KeyError:
+        return jsonify({'sucesso': False, 'erro_geral': f"Nó desconhecido: '{caminho}'."}), 404
+    return jsonify({'sucesso': True, 'arvore': id_arvore, 'no': pagina}), 200
+
+@app.route('/api/cache', methods=['GET'])
+def estatisticas_cache():
+    return jsonify(cache.estatisticas()), 200
+
+@app.route('/api/metricas', methods=['GET'])
+def exportar_metricas():
+    # Formato texto do Prometheus (pode ser coletado direto por um scrape)
+    return Response(metricas.formatar_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    # Nenhuma fase escreve no stdout: o servidor pode atender requisições em várias threads
+    app.run(debug=True, port=5000, threaded=True)
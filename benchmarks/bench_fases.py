@@ -0,0 +1,254 @@
+"""
+Mede cada fase do compilador (léxico, sintático, semântico, tradutor pós-fixo, geradores
+Python comum e otimizado) e a compilação completa (compilar_para_web) sobre os programas de tests/*.min e
+entradas sintéticas: muitas linhas, blocos e parênteses profundamente aninhados, expressões
+longas e laços (escalares e vetorizáveis).
+
+Relata tempo, tokens/s, nós/s, passos interpretados/s e pico de memória (tracemalloc,
+numa execução separada para não distorcer os tempos). Os resultados podem ser gravados
+e comparados com uma execução anterior.
+
+Uso:
+  python benchmarks/bench_fases.py                                # corpus + 10k linhas
+  python benchmarks/bench_fases.py --linhas 10000 100000 1000000  # escolhe os tamanhos
+  python benchmarks/bench_fases.py --salvar base.json
+  python benchmarks/bench_fases.py --comparar base.json           # sai com código 1 se algo piorar
+  python benchmarks/bench_fases.py --otimizar                     # também mede a execução da árvore otimizada
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.lexico import Lexico
+from src.parser_ast import ParserAST
+from src.tradutor import Tradutor, Gerador, GeradorOtimizado
+from src.compilador_api import compilar_para_web, MODOS_EXECUCAO
+from src.orcamento import Orcamento
+from src.metricas import contar_nos
+from src.otimizador import Otimizador
+from src.util import MapaFonte
+
+PASTA_TESTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+# Os programas sintéticos são grandes: o orçamento não pode ser o gargalo medido
+ORCAMENTO = Orcamento(max_passos=10**9, max_tempo=3600, max_celulas=10**9)
+
+# --- Entradas sintéticas ---
+
+_MODELOS_LINHA = [
+    "x = x + 1;",
+    "y = x * 2 - y / 3;",
+    "se x > y entao { z = x; } senao { z = y; }",
+    "v[3] = v[2] + x;",
+    "$ comentario da linha",
+    "para (i = 0; i < 3; i = i + 1) { s = s + i; }",
+    "enquanto w < 2 { w = w + 1; } w = 0;",
+    "ok = (x >= 10 e y != 0) ou z == 1;",
+]
+
+def gerar_linhas(n):
+    """ Programa válido com n linhas, misturando todos os tipos de comando """
+    linhas = ["x = 0; y = 1; z = 0; s = 0; w = 0; v = [8];"]
+    linhas += [_MODELOS_LINHA[k % len(_MODELOS_LINHA)] for k in range(n - 1)]
+    return "\n".join(linhas) + "\n"
+
+def gerar_aninhado(profundidade):
+    """ 'se' dentro de 'se' até a profundidade pedida """
+    return ("se 1 entao {\n" * profundidade) + "x = 1;\n" + ("}\n" * profundidade)
+
+def gerar_parenteses(profundidade):
+    """ Parênteses dentro de parênteses até a profundidade pedida """
+    return "x = " + "(1 + " * profundidade + "1" + ")" * profundidade + ";\n"
+
+def gerar_expressao(termos):
+    """ Uma única atribuição com uma expressão de 'termos' parcelas """
+    return "x = " + " + ".join(str(k % 10) for k in range(termos)) + ";\n"
+
+def gerar_laco(iteracoes):
+    """ Poucos nós e muitas iterações: mede passos interpretados por segundo """
+    return (f"s = 0; v = [10];\npara (i = 0; i < {iteracoes}; i = i + 1) {{\n"
+            "    s = s + i * 2;\n    v[3] = s;\n}\n")
+
+def gerar_laco_invariante(iteracoes):
+    """ Laço com constantes e expressões invariantes: o caso que o otimizador ataca """
+    return (f"s = 0; n = {iteracoes}; passo = 3;\npara (i = 0; i < n * 1 + 0; i = i + 1) {{\n"
+            "    s = s + i * (2 ** 10 * 3) - (n - 1) * passo + (n - 1) * passo;\n}\n")
+
+def gerar_laco_vetorial(iteracoes):
+    """ Laços elemento a elemento sobre arrays: o caso que src/vetorizacao.py executa com NumPy """
+    return (f"n = {iteracoes}; v = [n]; w = [n];\npara (i = 0; i < n; i = i + 1) {{ v[i] = i * 3 - 7; }}\n"
+            "para (i = 0; i < n; i = i + 1) {\n    w[i] = v[i] * 2 + 1;\n}\n")
+
+def casos(args):
+    lista = []
+    if not args.sem_corpus:
+        corpus = []
+        for caminho in sorted(glob.glob(os.path.join(PASTA_TESTES, "*.min"))):
+            with open(caminho, "r", encoding="utf-8") as f: codigo = f.read()
+            # Só entram os programas que passam pelas fases sem erro
+            tokens, erros = Lexico(codigo).analisar()
+            if erros or ParserAST(tokens).analisar()[1]: continue
+            corpus.append((os.path.basename(caminho), codigo))
+        lista += corpus
+    lista += [(f"linhas_{n}", gerar_linhas(n)) for n in args.linhas]
+    lista += [(f"aninhado_{p}", gerar_aninhado(p)) for p in args.profundidades]
+    lista += [(f"parenteses_{p}", gerar_parenteses(p)) for p in args.profundidades]
+    lista += [(f"expressao_{t}", gerar_expressao(t)) for t in args.termos]
+    lista += [(f"laco_{i}", gerar_laco(i)) for i in args.iteracoes]
+    lista += [(f"laco_invariante_{i}", gerar_laco_invariante(i)) for i in args.iteracoes]
+    lista += [(f"laco_vetorial_{i}", gerar_laco_vetorial(i)) for i in args.iteracoes]
+    return lista
+
+# --- Medição ---
+
+def cronometrar(funcao, repeticoes):
+    """ Melhor tempo entre as repetições e o último resultado """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def pico_memoria(funcao):
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def medir_caso(codigo, modos, repeticoes, memoria, otimizar=False):
+    """ Retorna {fase: {...}} para um programa; uma fase que falhar é registrada com 'erro' """
+    fases = {}
+
+    def registrar(fase, funcao, unidade=None, contar=None, erros=None):
+        try:
+            segundos, resultado = cronometrar(funcao, repeticoes)
+        except Exception as e:
+            fases[fase] = {'erro': f"{type(e).__name__}: {e}"[:200]}
+            return None
+        medida = {'segundos': segundos}
+        if unidade:
+            quantidade = contar(resultado)
+            medida.update({'unidade': unidade, 'quantidade': quantidade,
+                           'por_segundo': quantidade / segundos if segundos else 0.0})
+        if erros and erros(resultado):
+            # A fase terminou, mas com erros (ex.: recursão profunda vira "Erro Crítico de Execução")
+            medida['erros'] = erros(resultado)
+        if memoria:
+            medida['pico_bytes'] = pico_memoria(funcao)
+        fases[fase] = medida
+        return resultado
+
+    mapa = MapaFonte(codigo)
+    tokens = registrar('lexico', lambda: Lexico(codigo, mapa).analisar()[0], 'tokens', len)
+    if tokens is None: return fases
+    arvores = registrar('sintatico', lambda: ParserAST(tokens).analisar()[0], 'nós', lambda a: contar_nos(a[0]))
+    if arvores is None: return fases
+    arvore = arvores[0]
+
+    for modo in modos:
+        def executar(modo=modo):
+            semantico = MODOS_EXECUCAO[modo](arvore, codigo, mapa, ORCAMENTO)
+            semantico.analisar()
+            return semantico
+        registrar(f'semantico_{modo}', executar, 'passos', lambda s: s.consumo.passos, lambda s: len(s.erros))
+
+    if otimizar:
+        otimizada = registrar('otimizador', lambda: Otimizador().otimizar(arvore), 'nós', contar_nos)
+        for modo in modos if otimizada is not None else ():
+            def executar_otimizada(modo=modo):
+                semantico = MODOS_EXECUCAO[modo](otimizada, codigo, mapa, ORCAMENTO)
+                semantico.analisar()
+                return semantico
+            registrar(f'semantico_{modo}_otimizado', executar_otimizada, 'passos', lambda s: s.consumo.passos,
+                      lambda s: len(s.erros))
+
+    registrar('tradutor', lambda: Tradutor().formatar(arvore))
+    registrar('gerador', lambda: Gerador().traduzir(arvore))
+    registrar('gerador_otimizado', lambda: GeradorOtimizado().traduzir(arvore))
+    registrar('completo', lambda: compilar_para_web(codigo, modos[0], orcamento=ORCAMENTO),
+              'linhas', lambda _: mapa.num_linhas)
+    return fases
+
+# --- Saída, gravação e comparação ---
+
+def _formatar_taxa(medida):
+    if 'por_segundo' not in medida: return ""
+    return f"{medida['por_segundo']:>12,.0f} {medida['unidade']}/s"
+
+def imprimir(resultados):
+    print(f"{'CASO':<22} | {'FASE':<34} | {'TEMPO (ms)':>11} | {'TAXA':<22} | {'PICO (KB)':>10}")
+    print("-" * 112)
+    for caso, fases in resultados.items():
+        for fase, medida in fases.items():
+            if 'erro' in medida:
+                print(f"{caso:<22} | {fase:<34} | {'falhou':>11} | {medida['erro'][:60]}")
+                continue
+            pico = f"{medida['pico_bytes'] / 1024:>10,.0f}" if 'pico_bytes' in medida else ""
+            erros = f"  ({medida['erros']} erro(s))" if 'erros' in medida else ""
+            print(f"{caso:<22} | {fase:<34} | {medida['segundos'] * 1000:>11.2f} | {_formatar_taxa(medida):<22} | {pico}{erros}")
+
+def comparar(atual, base, tolerancia):
+    """ Imprime a razão de tempo (atual / base) por fase; retorna quantas pioraram além da tolerância """
+    pioras = 0
+    print(f"\n{'CASO':<22} | {'FASE':<34} | {'BASE (ms)':>10} | {'ATUAL (ms)':>10} | {'RAZÃO':>7}")
+    print("-" * 96)
+    for caso, fases in atual.items():
+        for fase, medida in fases.items():
+            anterior = base.get(caso, {}).get(fase)
+            if not anterior or 'segundos' not in anterior or 'segundos' not in medida: continue
+            razao = medida['segundos'] / anterior['segundos'] if anterior['segundos'] else 1.0
+            marca = ""
+            if razao > 1 + tolerancia: marca = "  PIOROU"; pioras += 1
+            elif razao < 1 - tolerancia: marca = "  melhorou"
+            print(f"{caso:<22} | {fase:<34} | {anterior['segundos'] * 1000:>10.2f} | "
+                  f"{medida['segundos'] * 1000:>10.2f} | {razao:>6.2f}x{marca}")
+    return pioras
+
+def main():
+    args = argparse.ArgumentParser(description="Benchmark das fases do compilador")
+    args.add_argument("--linhas", type=int, nargs="*", default=[10_000], help="tamanhos do programa sintético de N linhas")
+    args.add_argument("--profundidades", type=int, nargs="*", default=[50, 150, 5000],
+                      help="profundidades de blocos e parênteses aninhados")
+    args.add_argument("--termos", type=int, nargs="*", default=[500, 5000], help="parcelas das expressões longas")
+    args.add_argument("--iteracoes", type=int, nargs="*", default=[100_000], help="iterações do laço interpretado")
+    args.add_argument("--modos", nargs="*", default=['interpretador', 'vm'], choices=sorted(MODOS_EXECUCAO))
+    args.add_argument("--repeticoes", type=int, default=3, help="repetições por fase (vale o melhor tempo)")
+    args.add_argument("--otimizar", action="store_true", help="mede também o otimizador e a execução da árvore otimizada")
+    args.add_argument("--sem-corpus", action="store_true", help="não inclui tests/*.min")
+    args.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (mais rápido)")
+    args.add_argument("--salvar", metavar="ARQUIVO", help="grava os resultados em JSON")
+    args.add_argument("--comparar", metavar="ARQUIVO", help="compara com resultados gravados antes")
+    args.add_argument("--tolerancia", type=float, default=0.10, help="variação aceita na comparação (padrão 10%%)")
+    opcoes = args.parse_args()
+
+    resultados = {}
+    for nome, codigo in casos(opcoes):
+        resultados[nome] = medir_caso(codigo, opcoes.modos or ['interpretador'], opcoes.repeticoes, not opcoes.sem_memoria,
+                                    opcoes.otimizar)
+    imprimir(resultados)
+
+    if opcoes.salvar:
+        with open(opcoes.salvar, "w", encoding="utf-8") as f:
+            json.dump({'python': platform.python_version(), 'maquina': platform.machine(),
+                       'data': time.strftime("%Y-%m-%d %H:%M:%S"), 'resultados': resultados},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em '{opcoes.salvar}'.")
+
+    if opcoes.comparar:
+        with open(opcoes.comparar, "r", encoding="utf-8") as f: base = json.load(f)
+        pioras = comparar(resultados, base['resultados'], opcoes.tolerancia)
+        print(f"\n{pioras} fase(s) mais lenta(s) que a base (tolerância {opcoes.tolerancia:.0%}).")
+        if pioras: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Latência por chamada do compilador de linha de comando nos programas de tests/*.min:
+partida a frio (python main.py arquivo) contra o cliente do servidor persistente
+(python main.py --cliente arquivo), que só repassa o fonte a um --servidor já aquecido.
+Também mede a ida e volta pelo socket sem a partida do interpretador, com e sem acerto
+no cache do servidor.
+
+Uso: python benchmarks/bench_servidor.py [repeticoes] [--modo vm]
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from src.servidor_cli import enviar, ServidorIndisponivel
+from src.orcamento import Orcamento
+
+PASTA_TESTES = os.path.join(RAIZ, "tests")
+MAIN = os.path.join(RAIZ, "main.py")
+
+def medir_processo(comando, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos)
+
+def medir_envio(codigo, modo, caminho, repeticoes, variar):
+    tempos = []
+    for i in range(repeticoes):
+        # Um comentário diferente a cada envio muda o hash do código: o servidor compila de novo
+        pedido = {'codigo': f"{codigo}\n$ {time.time_ns()} {i}" if variar else codigo, 'modo': modo,
+                  'orcamento': Orcamento().como_dict()}
+        inicio = time.perf_counter()
+        enviar(pedido, caminho)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def esperar_servidor(caminho, limite=10.0):
+    fim = time.time() + limite
+    while time.time() < fim:
+        try:
+            enviar({'ping': True}, caminho); return
+        except (ServidorIndisponivel, OSError):
+            time.sleep(0.05)
+    raise RuntimeError(f"O servidor não respondeu em '{caminho}'.")
+
+def main():
+    args = argparse.ArgumentParser(description="Latência do --cliente contra a partida a frio")
+    args.add_argument("repeticoes", type=int, nargs="?", default=20)
+    args.add_argument("--modo", default="interpretador")
+    opcoes = args.parse_args()
+
+    caminho = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    servidor = subprocess.Popen([sys.executable, MAIN, "--servidor", "--socket", caminho], stdout=subprocess.DEVNULL)
+    try:
+        esperar_servidor(caminho)
+        print(f"{'PROGRAMA':<24} | {'FRIO (ms)':>10} | {'CLIENTE (ms)':>12} | {'GANHO':>6} | {'SOCKET (ms)':>11} | {'SEM CACHE (ms)':>14}")
+        print("-" * 94)
+        for arquivo in sorted(glob.glob(os.path.join(PASTA_TESTES, "*.min"))):
+            with open(arquivo, "r", encoding="utf-8") as f: codigo = f.read()
+            frio, _ = medir_processo([sys.executable, MAIN, arquivo, "--modo", opcoes.modo], opcoes.repeticoes)
+            cliente, _ = medir_processo([sys.executable, MAIN, "--cliente", "--socket", caminho, arquivo, "--modo", opcoes.modo],
+                                        opcoes.repeticoes)
+            socket_cache = medir_envio(codigo, opcoes.modo, caminho, opcoes.repeticoes, False)
+            socket_novo = medir_envio(codigo, opcoes.modo, caminho, opcoes.repeticoes, True)
+            print(f"{os.path.basename(arquivo):<24} | {frio * 1000:>10.1f} | {cliente * 1000:>12.1f} | {frio / cliente:>5.2f}x"
+                  f" | {socket_cache * 1000:>11.2f} | {socket_novo * 1000:>14.2f}")
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        print(f"\nPartida do interpretador sem nenhum import: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+if __name__ == "__main__":
+    main()
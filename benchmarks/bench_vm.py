@@ -0,0 +1,48 @@
+"""
+Compara o Semantico (visitor) com a MaquinaVirtual (bytecode) nos programas de tests/*.min.
+
+Uso: python benchmarks/bench_vm.py [repeticoes]
+"""
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.lexico import Lexico
+from src.parser_ast import ParserAST
+from src.semantico import Semantico
+from src.bytecode import MaquinaVirtual, CompiladorBytecode
+
+PASTA_TESTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+def preparar(caminho):
+    with open(caminho, "r", encoding="utf-8") as f: codigo = f.read()
+    tokens, erros = Lexico(codigo).analisar()
+    if erros: return None
+    arvores, erros = ParserAST(tokens).analisar()
+    if erros: return None
+    return codigo, arvores[0]
+
+def medir(executar, repeticoes):
+    return min(timeit.repeat(executar, number=repeticoes, repeat=5)) / repeticoes
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'PROGRAMA':<24} | {'VISITOR (us)':>12} | {'VM (us)':>10} | {'GANHO':>6} | {'VM EXEC (us)':>12} | {'GANHO':>6}")
+    print("-" * 88)
+    for caminho in sorted(glob.glob(os.path.join(PASTA_TESTES, "*.min"))):
+        preparado = preparar(caminho)
+        if not preparado: continue
+        codigo, arvore = preparado
+        programa = CompiladorBytecode().compilar(arvore)
+        t_visitor = medir(lambda: Semantico(arvore, codigo).analisar(), repeticoes)
+        t_vm = medir(lambda: MaquinaVirtual(arvore, codigo).analisar(), repeticoes)
+        # Só execução: bytecode compilado uma vez e reaproveitado
+        t_exec = medir(lambda: MaquinaVirtual(arvore, codigo, programa=programa).analisar(), repeticoes)
+        print(f"{os.path.basename(caminho):<24} | {t_visitor * 1e6:>12.1f} | {t_vm * 1e6:>10.1f} | {t_visitor / t_vm:>5.2f}x"
+              f" | {t_exec * 1e6:>12.1f} | {t_visitor / t_exec:>5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,46 @@
+import argparse
+import contextlib
+import io
+import json
+import os
 import sys
-from src.lexico import Lexico
-from src.parser_ast import ParserAST
-from src.tradutor import Tradutor
+import time
+from src.orcamento import Orcamento
+
+# Os módulos do compilador são importados só por quem compila neste processo: o --cliente
+# repassa o fonte ao --servidor e não paga esses imports a cada chamada.
+# Chaves de MODOS_EXECUCAO (src/compilador_api.py), para o argparse sem importar o compilador
+MODOS = ('interpretador', 'python', 'vm')
 
 def carregar_codigo(arquivo):
     try:
         with open(arquivo, "r", encoding="utf-8") as f: return f.read()
     except Exception as e: print(f"Erro ao ler: {e}"); return ""
 
-def executar_compilacao(arquivo='', codigo=''):
-    if arquivo: codigo = carregar_codigo(arquivo)
-    if not codigo: return
+def executar_compilacao(arquivo='', codigo='', modo=None, orcamento=None, otimizar=False, mostrar_otimizacao=False):
+    from src.lexico import Lexico, LexicoArquivo
+    from src.parser_ast import ParserAST
+    from src.tradutor import Tradutor
+    from src.compilador_api import MODOS_EXECUCAO, ast_para_string
+    from src.util import MapaFonte, MapaArquivo, abrir_mapeado
+    from src.otimizador import Otimizador
+
+    if arquivo:
+        # Arquivo mapeado em memória e tokenizado em blocos: o conteúdo nunca vira uma string
+        # inteira, e as linhas dos erros são lidas do próprio mapeamento
+        try: buffer = abrir_mapeado(arquivo)
+        except Exception as e: print(f"Erro ao ler: {e}"); return
+        if not buffer: return
+        mapa = MapaArquivo(buffer)
+        lexico = LexicoArquivo(buffer, mapa)
+    else:
+        if not codigo: return
+        mapa = MapaFonte(codigo)
+        lexico = Lexico(codigo, mapa)
 
     # 1. Lexico
-    lexico = Lexico(codigo)
-    tokens, erros = lexico.analisar()
+    try: tokens, erros = lexico.analisar()
+    except UnicodeDecodeError as e: print(f"Erro ao ler: {e}"); return
     if erros:
         print("\n Erros Léxicos:"); [print(e) for e in erros]; return
     lexico.imprimir_tokens()
@@ -25,21 +51,200 @@ def executar_compilacao(arquivo='', codigo=''):
     if erros_sint:
         print("\n Erros Sintáticos:"); [print(e) for e in erros_sint]; return
 
-    # 3. Tradutor
+    # 3. Otimizador (opcional): execução e tradução passam a usar a árvore otimizada
+    otimizador = None
+    if otimizar and arvore:
+        otimizador = Otimizador(orcamento.max_bits if orcamento else None)
+        otimizada = otimizador.otimizar(arvore[0])
+        if mostrar_otimizacao:
+            print("\n--- AST ANTES DA OTIMIZAÇÃO ---"); print(ast_para_string(arvore[0]), end="")
+            print("\n--- AST DEPOIS DA OTIMIZAÇÃO ---"); print(ast_para_string(otimizada), end="")
+            est = otimizador.estatisticas()
+            print(f"\n{est['dobradas']} constante(s) dobrada(s), {est['simplificadas']} identidade(s) simplificada(s), "
+                  f"{est['elevadas']} invariante(s) de laço elevada(s)\n")
+        arvore = [otimizada]
+
+    # 4. Semantico (execução), apenas quando um modo é pedido
+    if modo:
+        semantico = MODOS_EXECUCAO[modo](arvore[0], codigo, mapa, orcamento)
+        erros_sem = semantico.analisar()
+        if otimizador: otimizador.ocultar(semantico.tabela)
+        semantico.tabela.imprimir()
+        if erros_sem:
+            print("\n Erros Semânticos:"); [print(e) for e in erros_sem]; return
+
+    # 5. Tradutor
     if arvore:
         tradutor = Tradutor()
         tradutor.traduzir(arvore[0])
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2 or sys.argv[1] in ("-i", "--interativo"):
-        print("--- MODO INTERATIVO (Digite 'OK' em uma nova linha para compilar, ou 'SAIR' para cancelar.) ---")
-        linhas = []
+def modo_interativo(modo=None, orcamento=None, otimizar=False, mostrar_otimizacao=False):
+    print("--- MODO INTERATIVO (Digite 'OK' em uma nova linha para compilar, ou 'SAIR' para cancelar.) ---")
+    linhas = []
+    while True:
+        try:
+            l = input(">> ")
+            if l.upper() == "SAIR": break
+            if l.upper() == "OK": executar_compilacao(codigo="\n".join(linhas), modo=modo, orcamento=orcamento,
+                                                          otimizar=otimizar, mostrar_otimizacao=mostrar_otimizacao); linhas = []
+            else: linhas.append(l)
+        except: break
+
+def modo_lote(pasta, modo=None, trabalhadores=None, saida_json=None, orcamento=None, otimizar=False):
+    from src.lote import compilar_lote, carregar_pasta
+    fontes = carregar_pasta(pasta)
+    if not fontes:
+        print(f"Nenhum arquivo .min encontrado em '{pasta}'."); return
+    lote = compilar_lote(fontes, modo or 'interpretador', trabalhadores, orcamento=orcamento, otimizar=otimizar)
+
+    print(f"{'ARQUIVO':<40} | {'STATUS':<8} | {'TEMPO (ms)':>10}")
+    print("-" * 66)
+    for nome, r in lote['resultados'].items():
+        status = "OK" if r.get('sucesso') else "ERRO"
+        print(f"{nome:<40} | {status:<8} | {r['tempo_segundos'] * 1000:>10.2f}")
+    print("-" * 66)
+    print(f"{lote['total']} arquivos, {lote['sucessos']} OK, {lote['falhas']} com erro | "
+          f"{lote['trabalhadores']} processos | total {lote['tempo_total_segundos']:.3f}s "
+          f"(soma das compilações {lote['tempo_compilacao_segundos']:.3f}s)")
+
+    if saida_json:
+        with open(saida_json, "w", encoding="utf-8") as f: json.dump(lote, f, ensure_ascii=False, indent=2)
+        print(f"Resultados completos em '{saida_json}'.")
+
+# --- Observação de uma pasta (--observar) ---
+
+def imprimir_compilacao(nome, resultados, reaproveitados, analisados):
+    status = "OK" if resultados['sucesso'] else "ERRO"
+    print(f"[{time.strftime('%H:%M:%S')}] {nome}: {status} "
+          f"({reaproveitados} declaração(ões) reaproveitada(s), {analisados} analisada(s))")
+    for fase, campo in (("LEXICO", 'erros_lexicos'), ("SINTATICO", 'erros_sintaticos'), ("SEMANTICO", 'erros_semanticos')):
+        for erro in resultados[campo]: print(f"  [{fase}]: {erro}")
+    metricas = resultados['metricas']
+    tempos = " | ".join(f"{fase} {medida['segundos'] * 1000:.2f}" for fase, medida in metricas['fases'].items())
+    print(f"  tempos (ms): {tempos} | total {metricas['total_segundos'] * 1000:.2f}")
+
+def modo_observar(pasta, modo=None, orcamento=None, otimizar=False, intervalo=0.5):
+    from src.compilador_api import compilar_para_web
+    from src.incremental import AnalisadorIncremental
+    from src.observador import ObservadorPasta
+    if not os.path.isdir(pasta):
+        print(f"Pasta não encontrada: '{pasta}'."); return
+
+    # Um analisador para a pasta toda: declarações de topo que não mudaram (neste ou em
+    # outro arquivo) reaproveitam tokens e AST
+    observador, incremental = ObservadorPasta(pasta), AnalisadorIncremental()
+    print(f"Observando os .min de '{pasta}' (verificação a cada {intervalo:g}s). Ctrl-C encerra.")
+    try:
         while True:
-            try:
-                l = input(">> ")
-                if l.upper() == "SAIR": break
-                if l.upper() == "OK": executar_compilacao(codigo="\n".join(linhas)); linhas = []
-                else: linhas.append(l)
-            except: break
+            alterados, removidos = observador.verificar()
+            for nome in removidos: print(f"[{time.strftime('%H:%M:%S')}] {nome}: removido")
+            for nome in alterados:
+                codigo = carregar_codigo(os.path.join(pasta, nome))
+                if not codigo: continue
+                antes = (incremental.reaproveitados, incremental.analisados)
+                resultados = compilar_para_web(codigo, modo or 'interpretador', incremental, orcamento, otimizar)
+                imprimir_compilacao(nome, resultados, incremental.reaproveitados - antes[0], incremental.analisados - antes[1])
+            sys.stdout.flush()
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("Observação encerrada.")
+
+# --- Servidor persistente (--servidor) e cliente (--cliente) ---
+
+def compilar_pedido(pedido, cache):
+    """ Pedido de um --cliente, executado no servidor: devolve {'saida': o que executar_compilacao imprimiria} """
+    modo = pedido.get('modo')
+    if modo is not None and modo not in MODOS:
+        raise ValueError(f"Modo de execução desconhecido: '{modo}'.")
+    orcamento = Orcamento.de_dict(pedido.get('orcamento'))
+    codigo, otimizar, mostrar = pedido.get('codigo', ''), bool(pedido.get('otimizar')), bool(pedido.get('mostrar_otimizacao'))
+
+    chave = cache.chave(codigo, "cli", modo, orcamento.chave(), f"otimizar={otimizar}", f"mostrar_otimizacao={mostrar}")
+    resposta = cache.obter(chave)
+    if resposta is None:
+        saida = io.StringIO()
+        with contextlib.redirect_stdout(saida):
+            executar_compilacao(codigo=codigo, modo=modo, orcamento=orcamento, otimizar=otimizar, mostrar_otimizacao=mostrar)
+        resposta = {'saida': saida.getvalue()}
+        cache.guardar(chave, resposta)
+    return resposta
+
+def modo_servidor(caminho=None, trabalhadores=None):
+    from src.cache import CacheCompilacao
+    from src.servidor_cli import servir, caminho_socket
+    caminho = caminho or caminho_socket()
+    trabalhadores = trabalhadores or 1
+    # Uma compilação por back-end antes de atender: o que só inicializa no primeiro uso fica pronto
+    # (e é herdado pelos processos filhos)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for modo in MODOS: executar_compilacao(codigo="x = 1;", modo=modo, otimizar=True)
+    cache = CacheCompilacao()
+    def ao_iniciar():
+        print(f"Servidor do compilador em '{caminho}' ({trabalhadores} processo(s)). Ctrl-C encerra.", flush=True)
+    try:
+        servir(lambda pedido: compilar_pedido(pedido, cache), caminho, trabalhadores, ao_iniciar)
+    except OSError as e:
+        print(f"Servidor encerrado: {e}", file=sys.stderr); sys.exit(1)
+
+def modo_cliente(arquivo='', caminho=None, modo=None, orcamento=None, otimizar=False, mostrar_otimizacao=False):
+    from src.servidor_cli import enviar, ServidorIndisponivel
+    codigo = carregar_codigo(arquivo) if arquivo else sys.stdin.read()
+    if not codigo: return
+    pedido = {'codigo': codigo, 'modo': modo, 'orcamento': (orcamento or Orcamento()).como_dict(),
+              'otimizar': otimizar, 'mostrar_otimizacao': mostrar_otimizacao}
+    try:
+        resposta = enviar(pedido, caminho)
+    except ServidorIndisponivel as e:
+        print(f"{e} Compilando neste processo.", file=sys.stderr)
+        executar_compilacao(codigo=codigo, modo=modo, orcamento=orcamento, otimizar=otimizar, mostrar_otimizacao=mostrar_otimizacao)
+        return
+    if 'erro' in resposta:
+        print(f"Erro no servidor: {resposta['erro']}", file=sys.stderr); sys.exit(1)
+    sys.stdout.write(resposta['saida'])
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description="Mini Compilador")
+    args.add_argument("arquivo", nargs="?", help="arquivo .min a compilar (omitido: modo interativo)")
+    args.add_argument("-i", "--interativo", action="store_true", help="lê o código do terminal")
+    args.add_argument("--modo", choices=MODOS, help="executa a fase semântica com o back-end escolhido")
+    args.add_argument("--vm", dest="modo", action="store_const", const="vm", help="atalho para --modo vm")
+    args.add_argument("--lote", metavar="PASTA", help="compila todos os .min da pasta em paralelo")
+    args.add_argument("--trabalhadores", type=int,
+                      help="número de processos do modo --lote (padrão: núcleos da CPU) ou do --servidor (padrão: 1)")
+    args.add_argument("--saida-json", metavar="ARQUIVO", help="grava os resultados completos do modo --lote em JSON")
+    args.add_argument("--observar", metavar="PASTA", help="recompila os .min da pasta sempre que um deles muda")
+    args.add_argument("--intervalo", type=float, default=0.5, help="segundos entre as verificações do --observar (padrão: 0.5)")
+    args.add_argument("--servidor", action="store_true", help="mantém o compilador carregado, atendendo --cliente num socket Unix")
+    args.add_argument("--cliente", action="store_true",
+                      help="repassa o arquivo (ou a entrada padrão) ao --servidor e imprime a saída dele")
+    args.add_argument("--socket", metavar="CAMINHO",
+                      help="socket do --servidor/--cliente (padrão: COMPILADOR_SOCKET ou mini_compilador-<uid>.sock na pasta temporária)")
+    args.add_argument("--otimizar", action="store_true", help="dobra constantes, simplifica identidades e eleva invariantes de laço")
+    args.add_argument("--mostrar-otimizacao", action="store_true", help="imprime a AST antes e depois da otimização (implica --otimizar)")
+    limites = args.add_argument_group("orçamento de execução")
+    limites.add_argument("--max-passos", type=int, help=f"iterações de laço (padrão: {Orcamento.PADRAO['max_passos']})")
+    limites.add_argument("--max-tempo", type=float, help=f"segundos de execução (padrão: {Orcamento.PADRAO['max_tempo']:g})")
+    limites.add_argument("--max-celulas", type=int, help=f"células de array alocadas (padrão: {Orcamento.PADRAO['max_celulas']})")
+    limites.add_argument("--max-bits", type=int, help=f"bits de um inteiro (padrão: {Orcamento.PADRAO['max_bits']})")
+    limites.add_argument("--max-erros", type=int, help=f"erros semânticos coletados (padrão: {Orcamento.PADRAO['max_erros']})")
+    opcoes = args.parse_args()
+
+    try:
+        orcamento = Orcamento(opcoes.max_passos, opcoes.max_tempo, opcoes.max_celulas, opcoes.max_bits, opcoes.max_erros)
+    except ValueError as e:
+        args.error(str(e))
+    otimizar = opcoes.otimizar or opcoes.mostrar_otimizacao
+
+    if opcoes.servidor:
+        modo_servidor(opcoes.socket, opcoes.trabalhadores)
+    elif opcoes.cliente:
+        modo_cliente(opcoes.arquivo, opcoes.socket, opcoes.modo, orcamento, otimizar, opcoes.mostrar_otimizacao)
+    elif opcoes.observar:
+        modo_observar(opcoes.observar, opcoes.modo, orcamento, otimizar, opcoes.intervalo)
+    elif opcoes.lote:
+        modo_lote(opcoes.lote, opcoes.modo, opcoes.trabalhadores, opcoes.saida_json, orcamento, otimizar)
+    elif opcoes.interativo or not opcoes.arquivo:
+        modo_interativo(opcoes.modo, orcamento, otimizar, opcoes.mostrar_otimizacao)
     else:
-        executar_compilacao(arquivo=sys.argv[1])
\ No newline at end of file
+        executar_compilacao(arquivo=opcoes.arquivo, modo=opcoes.modo, orcamento=orcamento,
+                            otimizar=otimizar, mostrar_otimizacao=opcoes.mostrar_otimizacao)
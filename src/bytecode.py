@@ -0,0 +1,432 @@
+from src.parser_ast import BinOpNode, BlockNode, IfNode, WhileNode, ForNode, NumeroNode, IdNode, ArrayNode, ArrayAccessNode, CommentNode
+from src.parser_ast import (OP_ATRIBUICAO, OP_SOMA, OP_SUB, OP_MULT, OP_DIV, OP_POT, OP_MAIOR, OP_MENOR, OP_MAIOR_IGUAL,
+                            OP_MENOR_IGUAL, OP_IGUAL, OP_E, OP_OU, SIMBOLOS_OP)
+from src.semantico import Semantico, tipo_do_valor
+from src.orcamento import LimiteExcedido
+from src.vetor import Vetor
+
+# --- Códigos de operação da máquina de pilha ---
+CONST = 0              # empilha constantes[arg]
+CARREGA = 1            # empilha o valor da variável no slot arg
+ARMAZENA = 2           # desempilha e grava no slot arg
+BINOP = 3              # desempilha dir, esq e aplica o operador arg
+DESCARTA = 4           # desempilha e ignora
+SALTA = 5              # pc = arg
+SALTA_SE_FALSO = 6     # desempilha; se falso, pc = arg
+E_CURTO = 7            # 'e': se o topo for falso, troca por False e salta para arg
+OU_CURTO = 8           # 'ou': se o topo for verdadeiro, troca por True e salta para arg
+PARA_BOOL = 9          # converte o topo com bool()
+CONTA_LOOP = 10        # conta uma iteração no orçamento (LimiteExcedido interrompe a execução)
+NOVO_ARRAY = 11        # desempilha o tamanho e empilha um array zerado
+VERIFICA_LEITURA = 12  # confere se o slot arg é um array antes de ler um elemento
+LE_ELEMENTO = 13       # desempilha o índice e empilha array[slot arg][índice]
+VERIFICA_ESCRITA = 14  # confere se o slot arg[0] é um array; se não, descarta o valor e salta para arg[1]
+GRAVA_ELEMENTO = 15    # desempilha índice e valor e grava em array[slot arg]
+
+NOMES_OPERACOES = ['CONST', 'CARREGA', 'ARMAZENA', 'BINOP', 'DESCARTA', 'SALTA', 'SALTA_SE_FALSO', 'E_CURTO',
+                   'OU_CURTO', 'PARA_BOOL', 'CONTA_LOOP', 'NOVO_ARRAY', 'VERIFICA_LEITURA', 'LE_ELEMENTO',
+                   'VERIFICA_ESCRITA', 'GRAVA_ELEMENTO']
+
+# O argumento de BINOP é o próprio BinOpNode.opcode (OP_SOMA, OP_SUB... de parser_ast)
+
+# Ações pendentes nas pilhas do compilador (comandos e expressões)
+_FIM_SE, _CORRIGIR, _CORPO_PARA, _FIM_LACO = range(4)
+_EMITIR, _CURTO, _FIM_CURTO, _FIM_LEITURA = range(4)
+
+# Marca de variável ainda não definida (None é um valor válido em tempo de execução)
+_INDEFINIDO = object()
+
+class Programa:
+    """ Bytecode plano: instruções em listas paralelas, pool de constantes e nomes dos slots """
+    def __init__(self, codigo, args, posicoes, constantes, nomes):
+        self.codigo = codigo
+        self.args = args
+        self.posicoes = posicoes
+        self.constantes = constantes
+        self.nomes = nomes
+
+    def desmontar(self):
+        linhas = []
+        for i, (op, arg) in enumerate(zip(self.codigo, self.args)):
+            if op == CONST: detalhe = repr(self.constantes[arg])
+            elif op in (CARREGA, ARMAZENA, VERIFICA_LEITURA, LE_ELEMENTO, GRAVA_ELEMENTO): detalhe = self.nomes[arg]
+            elif op == VERIFICA_ESCRITA: detalhe = f"{self.nomes[arg[0]]} -> {arg[1]}"
+            elif op == BINOP: detalhe = SIMBOLOS_OP[arg]
+            else: detalhe = "" if arg is None else str(arg)
+            linhas.append(f"{i:>5}  {NOMES_OPERACOES[op]:<17} {detalhe}")
+        return "\n".join(linhas)
+
+# --- Compilador AST -> Bytecode ---
+class CompiladorBytecode:
+    def __init__(self):
+        self.codigo = []
+        self.args = []
+        self.posicoes = []
+        self.constantes = []
+        self._indices_constantes = {}
+        self.nomes = []
+        self._slots = {}
+
+    def compilar(self, arvore):
+        self._comando(arvore)
+        return Programa(self.codigo, self.args, self.posicoes, self.constantes, self.nomes)
+
+    def _emitir(self, op, arg=None, pos=-1):
+        codigo = self.codigo
+        codigo.append(op)
+        self.args.append(arg)
+        self.posicoes.append(pos)
+        return len(codigo) - 1
+
+    def _corrigir_salto(self, indice):
+        """ Aponta o salto emitido em 'indice' para a próxima instrução """
+        if self.codigo[indice] == VERIFICA_ESCRITA:
+            self.args[indice] = (self.args[indice][0], len(self.codigo))
+        else:
+            self.args[indice] = len(self.codigo)
+
+    def _slot(self, nome):
+        if nome not in self._slots:
+            self._slots[nome] = len(self.nomes)
+            self.nomes.append(nome)
+        return self._slots[nome]
+
+    def _constante(self, valor):
+        chave = (type(valor), valor)
+        if chave not in self._indices_constantes:
+            self._indices_constantes[chave] = len(self.constantes)
+            self.constantes.append(valor)
+        return self._indices_constantes[chave]
+
+    # --- Comandos (não deixam nada na pilha) ---
+
+    def _comando(self, raiz):
+        """
+        Comandos com pilha explícita (blocos aninhados não usam a pilha do Python). Tuplas
+        (ação, ...) na pilha marcam o que falta emitir depois de um bloco: o salto do 'senao'
+        ou o fim de um laço.
+        """
+        pendentes = [raiz]
+        while pendentes:
+            node = pendentes.pop()
+            t = type(node)
+
+            if t is BinOpNode and node.opcode == OP_ATRIBUICAO:
+                self._atribuicao(node)
+
+            elif t is BlockNode:
+                pendentes += reversed(node.statements)
+
+            elif t is tuple:
+                acao = node[0]
+                if acao == _FIM_SE:
+                    _, false_block, salto_senao = node
+                    if false_block:
+                        salto_fim = self._emitir(SALTA)
+                        self._corrigir_salto(salto_senao)
+                        pendentes += ((_CORRIGIR, salto_fim), false_block)
+                    else:
+                        self._corrigir_salto(salto_senao)
+                elif acao == _CORRIGIR:
+                    self._corrigir_salto(node[1])
+                elif acao == _CORPO_PARA:
+                    laco = node[1]
+                    inicio = len(self.codigo)
+                    self._expressao(laco.condition)
+                    salto_fim = self._emitir(SALTA_SE_FALSO)
+                    pendentes += ((_FIM_LACO, laco.pos, inicio, salto_fim), laco.increment, laco.block)
+                else:  # _FIM_LACO
+                    _, pos, inicio, salto_fim = node
+                    self._emitir(CONTA_LOOP, pos=pos)
+                    self._emitir(SALTA, inicio)
+                    self._corrigir_salto(salto_fim)
+
+            elif node is None or t is CommentNode:
+                continue
+
+            elif t is IfNode:
+                self._expressao(node.condition)
+                salto_senao = self._emitir(SALTA_SE_FALSO)
+                pendentes += ((_FIM_SE, node.false_block, salto_senao), node.true_block)
+
+            elif t is WhileNode:
+                inicio = len(self.codigo)
+                self._expressao(node.condition)
+                salto_fim = self._emitir(SALTA_SE_FALSO)
+                pendentes += ((_FIM_LACO, node.pos, inicio, salto_fim), node.block)
+
+            elif t is ForNode:
+                pendentes += ((_CORPO_PARA, node), node.init)
+
+            else:
+                # Expressão solta: avalia (pode gerar erros) e descarta o resultado
+                self._expressao(node)
+                self._emitir(DESCARTA)
+
+    def _atribuicao(self, node):
+        # O lado direito é avaliado antes de tudo, como no Semantico
+        self._expressao(node.right)
+
+        if isinstance(node.left, ArrayAccessNode):
+            slot = self._slot(node.left.array.nome)
+            verifica = self._emitir(VERIFICA_ESCRITA, (slot, None))
+            self._expressao(node.left.indice)
+            self._emitir(GRAVA_ELEMENTO, slot, node.left.pos)
+            self._corrigir_salto(verifica)
+        else:
+            self._emitir(ARMAZENA, self._slot(node.left.nome))
+
+    # --- Expressões (deixam exatamente um valor na pilha) ---
+
+    def _folha(self, node):
+        """ Emite uma variável ou constante; False se o nó não for folha """
+        t = type(node)
+        if t is IdNode:
+            self._emitir(CARREGA, self._slot(node.nome), node.pos)
+        elif t is NumeroNode:
+            self._emitir(CONST, self._constante(node.valor))
+        else:
+            return False
+        return True
+
+    def _expressao(self, raiz):
+        """
+        Emissão em pós-ordem com pilha explícita. Além de nós, a pilha guarda tuplas
+        (ação, ...) com o que falta emitir depois que os filhos de um nó foram compilados.
+        Folhas são emitidas direto, sem passar pela pilha.
+        """
+        if self._folha(raiz): return
+        emitir = self._emitir
+        folha = self._folha
+        pendentes = [raiz]
+        while pendentes:
+            node = pendentes.pop()
+            t = type(node)
+
+            if t is BinOpNode:
+                op = node.opcode
+                if op == OP_ATRIBUICAO:
+                    # Não gerado pelo parser em expressões; mantém o valor atribuído na pilha
+                    self._atribuicao(node)
+                    pendentes.append(node.left)
+                elif op == OP_E or op == OP_OU:
+                    salto = []
+                    pendentes += ((_FIM_CURTO, salto), node.right, (_CURTO, op, salto), node.left)
+                elif not folha(node.left):
+                    pendentes += ((_EMITIR, BINOP, op, node.pos), node.right, node.left)
+                elif folha(node.right):
+                    emitir(BINOP, op, node.pos)
+                else:
+                    pendentes += ((_EMITIR, BINOP, op, node.pos), node.right)
+
+            elif t is tuple:
+                acao = node[0]
+                if acao == _EMITIR:
+                    emitir(node[1], node[2], node[3])
+                elif acao == _CURTO:
+                    # Lado esquerdo já está na pilha: salta o direito se ele decidir o resultado
+                    node[2].append(emitir(E_CURTO if node[1] == OP_E else OU_CURTO))
+                elif acao == _FIM_CURTO:
+                    emitir(PARA_BOOL)
+                    self._corrigir_salto(node[1][0])
+                else:  # _FIM_LEITURA
+                    _, slot, pos, verifica = node
+                    emitir(LE_ELEMENTO, slot, pos)
+                    self.args[verifica] = (slot, len(self.codigo))
+
+            elif folha(node):
+                continue
+
+            elif t is ArrayNode:
+                pendentes += ((_EMITIR, NOVO_ARRAY, None, node.pos), node.tamanho)
+
+            elif t is ArrayAccessNode:
+                slot = self._slot(node.array.nome)
+                verifica = emitir(VERIFICA_LEITURA, (slot, None), node.pos)
+                pendentes += ((_FIM_LEITURA, slot, node.pos, verifica), node.indice)
+
+            else:
+                # Nó ausente (expressão incompleta) vale None, como em Semantico.visitar_generico
+                emitir(CONST, self._constante(None))
+
+# --- Máquina virtual ---
+class MaquinaVirtual(Semantico):
+    """
+    Executa o bytecode gerado por CompiladorBytecode.
+    Produz a mesma TabelaSimbolos e os mesmos erros que o Semantico (visitor).
+    """
+    def __init__(self, arvore, codigo_fonte="", mapa=None, orcamento=None, programa=None):
+        super().__init__(arvore, codigo_fonte, mapa, orcamento)
+        self.programa = programa  # bytecode já compilado (opcional) para reexecuções
+
+    def analisar(self):
+        self.erros = []
+        self.limites_excedidos = []
+        self.consumo = self.orcamento.iniciar()
+        try:
+            if self.programa is None:
+                self.programa = CompiladorBytecode().compilar(self.arvore)
+            self._executar(self.programa)
+        except LimiteExcedido as e:
+            self._registrar_limite(e)
+        except Exception as e:
+            self.erros.append(f"Erro Crítico de Execução: {str(e)}")
+        return self.erros
+
+    def _executar(self, programa):
+        codigo, args, posicoes = programa.codigo, programa.args, programa.posicoes
+        constantes, nomes = programa.constantes, programa.nomes
+        valores = [_INDEFINIDO] * len(nomes)
+        ordem = []  # slots na ordem da primeira definição (ordem da tabela de símbolos)
+        erros = self.erros
+        formatar = self._formatar_erro
+        erro = self._erro
+        consumo = self.consumo
+        verificar_operacao = consumo.verificar_operacao
+
+        pilha = []
+        empilha = pilha.append
+        desempilha = pilha.pop
+        pc = 0
+        fim = len(codigo)
+
+        try:
+            while pc < fim:
+                op = codigo[pc]
+                arg = args[pc]
+                pc += 1
+
+                if op == CARREGA:
+                    v = valores[arg]
+                    if v is _INDEFINIDO:
+                        erro_fmt = formatar(posicoes[pc - 1], f"Variável '{nomes[arg]}' não definida.")
+                        if erro_fmt not in erros:
+                            consumo.registrar_erro(erros, erro_fmt, posicoes[pc - 1])
+                        v = 0
+                    empilha(v)
+
+                elif op == CONST:
+                    empilha(constantes[arg])
+
+                elif op == BINOP:
+                    d = desempilha()
+                    e = desempilha()
+                    if e is None or d is None:
+                        empilha(0)
+                        continue
+                    if arg == OP_MULT or arg == OP_POT or (arg == OP_SOMA and type(e) is Vetor):
+                        verificar_operacao(SIMBOLOS_OP[arg], e, d, posicoes[pc - 1])
+                    if arg == OP_DIV and d == 0:
+                        # Fora do try: o LimiteExcedido de max_erros não pode virar "Erro na operação"
+                        erro(posicoes[pc - 1], "Divisão por zero.")
+                        empilha(0)
+                        continue
+                    try:
+                        if arg == OP_SOMA: r = e + d
+                        elif arg == OP_SUB: r = e - d
+                        elif arg == OP_MULT: r = e * d
+                        elif arg == OP_MENOR: r = e < d
+                        elif arg == OP_MAIOR: r = e > d
+                        elif arg == OP_DIV: r = e / d
+                        elif arg == OP_POT: r = e ** d
+                        elif arg == OP_MAIOR_IGUAL: r = e >= d
+                        elif arg == OP_MENOR_IGUAL: r = e <= d
+                        elif arg == OP_IGUAL: r = e == d
+                        else: r = e != d
+                    except Exception:
+                        erro(posicoes[pc - 1], f"Erro na operação '{SIMBOLOS_OP[arg]}'.")
+                        r = 0
+                    empilha(r)
+
+                elif op == ARMAZENA:
+                    if valores[arg] is _INDEFINIDO:
+                        ordem.append(arg)
+                    valores[arg] = desempilha()
+
+                elif op == SALTA_SE_FALSO:
+                    if not desempilha():
+                        pc = arg
+
+                elif op == SALTA:
+                    pc = arg
+
+                elif op == VERIFICA_LEITURA:
+                    slot, destino = arg
+                    v = valores[slot]
+                    if v is _INDEFINIDO:
+                        erro(posicoes[pc - 1], f"Array '{nomes[slot]}' não declarado.")
+                        empilha(0); pc = destino
+                    elif not isinstance(v, Vetor):
+                        erro(posicoes[pc - 1], f"Variável '{nomes[slot]}' não é um array.")
+                        empilha(0); pc = destino
+
+                elif op == LE_ELEMENTO:
+                    indice = desempilha()
+                    dados = valores[arg].dados
+                    if not isinstance(indice, int):
+                        erro(posicoes[pc - 1], "Índice do array deve ser inteiro.")
+                        empilha(0)
+                    elif indice < 0 or indice >= len(dados):
+                        erro(posicoes[pc - 1], f"Índice {indice} fora dos limites.")
+                        empilha(0)
+                    else:
+                        empilha(dados[indice])
+
+                elif op == VERIFICA_ESCRITA:
+                    slot, destino = arg
+                    if not isinstance(valores[slot], Vetor):
+                        desempilha()
+                        pc = destino
+
+                elif op == GRAVA_ELEMENTO:
+                    indice = desempilha()
+                    valor = desempilha()
+                    vetor = valores[arg]
+                    if not isinstance(indice, int):
+                        erro(posicoes[pc - 1], "Índice do array deve ser inteiro.")
+                    elif indice < 0 or indice >= len(vetor.dados):
+                        erro(posicoes[pc - 1], f"Índice {indice} fora dos limites.")
+                    else:
+                        vetor.gravar(indice, valor)
+
+                elif op == CONTA_LOOP:
+                    consumo.passos += 1
+                    if consumo.passos >= consumo.proxima_verificacao:
+                        consumo.verificar(posicoes[pc - 1])
+
+                elif op == E_CURTO:
+                    if not pilha[-1]:
+                        pilha[-1] = False
+                        pc = arg
+                    else:
+                        desempilha()
+
+                elif op == OU_CURTO:
+                    if pilha[-1]:
+                        pilha[-1] = True
+                        pc = arg
+                    else:
+                        desempilha()
+
+                elif op == PARA_BOOL:
+                    pilha[-1] = bool(pilha[-1])
+
+                elif op == NOVO_ARRAY:
+                    tamanho = desempilha()
+                    if not isinstance(tamanho, int):
+                        erro(posicoes[pc - 1], "Tamanho do array deve ser inteiro.")
+                        empilha(Vetor.zeros(0))
+                    elif tamanho < 0:
+                        erro(posicoes[pc - 1], "Tamanho do array não pode ser negativo.")
+                        empilha(Vetor.zeros(0))
+                    else:
+                        consumo.alocar(tamanho, posicoes[pc - 1])
+                        empilha(Vetor.zeros(tamanho))
+
+                elif op == DESCARTA:
+                    desempilha()
+        finally:
+            # Sincroniza a tabela mesmo se a execução for interrompida por erro crítico
+            for slot in ordem:
+                valor = valores[slot]
+                self.tabela.definir(nomes[slot], tipo_do_valor(valor), valor)
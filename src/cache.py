@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Incrementar quando a saída do compilador mudar, para invalidar entradas antigas gravadas em disco
+VERSAO_CACHE = "3"
+
+class CacheCompilacao:
+    """
+    Cache LRU de resultados de compilar_para_web, endereçado pelo hash do código-fonte.
+    Os resultados ficam serializados em JSON: o tamanho em bytes é medido direto e cada
+    acerto devolve um dict novo (quem recebe pode alterá-lo sem corromper o cache).
+    Com 'diretorio', as entradas também são gravadas em disco e sobrevivem a reinícios.
+    """
+    def __init__(self, max_entradas=256, max_bytes=32 * 1024 * 1024, diretorio=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.diretorio = diretorio
+        self._entradas = OrderedDict()  # chave -> bytes (JSON)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    @staticmethod
+    def chave(codigo_fonte, *opcoes):
+        h = hashlib.sha256()
+        h.update(VERSAO_CACHE.encode())
+        for parte in (codigo_fonte, *opcoes):
+            h.update(b"\0")
+            h.update(str(parte).encode("utf-8"))
+        return h.hexdigest()
+
+    def obter(self, chave):
+        with self._trava:
+            dados = self._entradas.get(chave)
+            if dados is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return json.loads(dados)
+
+        dados = self._ler_disco(chave)
+        with self._trava:
+            if dados is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self.acertos_disco += 1
+            self._inserir(chave, dados)
+        return json.loads(dados)
+
+    def guardar(self, chave, resultado):
+        dados = json.dumps(resultado, ensure_ascii=False).encode("utf-8")
+        with self._trava:
+            self._inserir(chave, dados)
+        self._gravar_disco(chave, dados)
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas), 'bytes': self._bytes,
+                'max_entradas': self.max_entradas, 'max_bytes': self.max_bytes,
+                'acertos': self.acertos, 'acertos_disco': self.acertos_disco, 'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'disco': self.diretorio,
+            }
+
+    # --- Internos (chamados com a trava adquirida) ---
+
+    def _inserir(self, chave, dados):
+        if len(dados) > self.max_bytes: return  # não cabe nem sozinho
+        antigo = self._entradas.pop(chave, None)
+        if antigo is not None:
+            self._bytes -= len(antigo)
+        self._entradas[chave] = dados
+        self._bytes += len(dados)
+        while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+            _, removido = self._entradas.popitem(last=False)
+            self._bytes -= len(removido)
+
+    # --- Armazenamento em disco (opcional) ---
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], chave + ".json")
+
+    def _ler_disco(self, chave):
+        if not self.diretorio: return None
+        try:
+            with open(self._caminho(chave), "rb") as f: return f.read()
+        except OSError:
+            return None
+
+    def _gravar_disco(self, chave, dados):
+        if not self.diretorio: return
+        caminho = self._caminho(chave)
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, "wb") as f: f.write(dados)
+            os.replace(temporario, caminho)  # escrita atômica: leitores nunca veem arquivo pela metade
+        except OSError:
+            pass
@@ -1,75 +1,106 @@
-from contextlib import redirect_stdout
-import io
-
+from collections import deque
 from .lexico import Lexico
-from .parser_ast import ParserAST, BinOpNode, BlockNode, IfNode, WhileNode, ForNode, IdNode, NumeroNode, ArrayNode, ArrayAccessNode, CommentNode
+from .parser_ast import ParserAST, BinOpNode, BlockNode, IfNode, WhileNode, ForNode, IdNode, NumeroNode, ArrayNode, ArrayAccessNode, CommentNode, SIMBOLOS_OP, OP_POT
 from .semantico import Semantico, TabelaSimbolos
-from .tradutor import Tradutor, Gerador
+from .bytecode import MaquinaVirtual
+from .executor_python import ExecutorPython
+from .tradutor import Tradutor, Gerador, GeradorOtimizado
+from .util import MapaFonte
+from .orcamento import Orcamento
+from .metricas import MedidorFases, contar_nos
+from .otimizador import Otimizador
+
+# Back-ends de execução da fase semântica (mesma interface: analisar() -> erros, .tabela)
+MODOS_EXECUCAO = {
+    'interpretador': Semantico,
+    'vm': MaquinaVirtual,
+    'python': ExecutorPython,
+}
+
+# A árvore pode ser tão funda quanto a memória deixar, mas a AST exibida para nestes níveis:
+# o texto cresce com o quadrado da profundidade, e o JSON ainda passa por json/Flask e pelo
+# pickle do lote, todos recursivos (cada nível da AST vira um dict e uma lista)
+PROFUNDIDADE_TEXTO = 500
+PROFUNDIDADE_JSON = 200
+_OMITIDO = "... (níveis mais profundos omitidos)"
 
 def ast_para_string(node, nivel=0):
-    if not node: return ""
+    # As linhas vão para uma lista só (concatenar a saída de cada filho seria quadrático na profundidade)
+    linhas = []
+    _ast_para_linhas(node, nivel, linhas)
+    return "".join(linhas)
+
+def _ast_para_linhas(node, nivel, linhas):
+    if not node: return
     indent = "  " * nivel
+    if nivel >= PROFUNDIDADE_TEXTO:
+        linhas.append(f"{indent}{_OMITIDO}\n"); return
     nome_no = getattr(node, 'nome', node.__class__.__name__.replace('Node', ''))
-    saida = f"{indent}--- {nome_no} ({node.__class__.__name__}) ---\n"
-    for attr, value in node.__dict__.items():
+    linhas.append(f"{indent}--- {nome_no} ({node.__class__.__name__}) ---\n")
+    for attr in node.CAMPOS:
+        value = getattr(node, attr)
         if attr in ['statements', 'left', 'right', 'condition', 'true_block', 'false_block', 'init', 'increment', 'block']:
-            saida += f"{indent}{attr}:\n"
+            linhas.append(f"{indent}{attr}:\n")
             if isinstance(value, list):
-                for item in value: saida += ast_para_string(item, nivel + 1)
+                for item in value: _ast_para_linhas(item, nivel + 1, linhas)
             elif isinstance(value, (BinOpNode, BlockNode, IfNode, WhileNode, ForNode, IdNode, NumeroNode)):
-                saida += ast_para_string(value, nivel + 1)
-        elif attr in ['valor', 'nome']: saida += f"{indent}  {attr}: {value}\n"
-        elif attr == 'op': saida += f"{indent}  {attr}: {value[1]} ({value[0]})\n"
-    return saida
+                _ast_para_linhas(value, nivel + 1, linhas)
+        elif attr == 'valor': linhas.append(f"{indent}  {attr}: {node.texto}\n")
+        elif attr == 'nome': linhas.append(f"{indent}  {attr}: {value}\n")
+        elif attr == 'op': linhas.append(f"{indent}  {attr}: {value[1]} ({value[0]})\n")
 
 # --- FUNÇÃO JSON ---
-def ast_para_json(node):
+def ast_para_json(node, nivel=0):
     if not node: return None
     
     # Padrão se não reconhecer
     data = {"name": "?", "type": "default", "children": []}
 
+    if nivel >= PROFUNDIDADE_JSON:
+        data["name"] = _OMITIDO
+        return data
+
     if isinstance(node, BlockNode):
         data["name"] = "{...}"; data["type"] = "block"
         for stmt in node.statements:
-            child = ast_para_json(stmt)
+            child = ast_para_json(stmt, nivel + 1)
             if child: data["children"].append(child)
             
     elif isinstance(node, IfNode):
         data["name"] = "SE"; data["type"] = "if"
-        data["children"].append(ast_para_json(node.condition))
-        data["children"].append(ast_para_json(node.true_block))
+        data["children"].append(ast_para_json(node.condition, nivel + 1))
+        data["children"].append(ast_para_json(node.true_block, nivel + 1))
         if node.false_block:
-            f = ast_para_json(node.false_block); f["name"] = "SENAO"; data["children"].append(f)
+            f = ast_para_json(node.false_block, nivel + 1); f["name"] = "SENAO"; data["children"].append(f)
             
     elif isinstance(node, WhileNode):
         data["name"] = "ENQUANTO"; data["type"] = "loop"
-        data["children"].append(ast_para_json(node.condition))
-        data["children"].append(ast_para_json(node.block))
+        data["children"].append(ast_para_json(node.condition, nivel + 1))
+        data["children"].append(ast_para_json(node.block, nivel + 1))
         
     elif isinstance(node, ForNode):
         data["name"] = "PARA"; data["type"] = "loop"
-        h = {"name": "(regras)", "type": "default", "children": [ast_para_json(node.init), ast_para_json(node.condition), ast_para_json(node.increment)]}
-        data["children"].append(h); data["children"].append(ast_para_json(node.block))
+        h = {"name": "(regras)", "type": "default", "children": [ast_para_json(node.init, nivel + 1), ast_para_json(node.condition, nivel + 1), ast_para_json(node.increment, nivel + 1)]}
+        data["children"].append(h); data["children"].append(ast_para_json(node.block, nivel + 1))
         
     elif isinstance(node, BinOpNode):
-        data["name"] = node.op[1]; data["type"] = "pow" if node.op[1]=='**' else "op"
-        data["children"] = [ast_para_json(node.left), ast_para_json(node.right)]
+        data["name"] = SIMBOLOS_OP[node.opcode]; data["type"] = "pow" if node.opcode == OP_POT else "op"
+        data["children"] = [ast_para_json(node.left, nivel + 1), ast_para_json(node.right, nivel + 1)]
         
     elif isinstance(node, NumeroNode):
-        data["name"] = str(node.valor); data["type"] = "number"
+        data["name"] = node.texto; data["type"] = "number"
         
     elif isinstance(node, IdNode):
         data["name"] = node.nome; data["type"] = "id"
 
     elif isinstance(node, ArrayNode):
         data["name"] = "[]"; data["type"] = "number"
-        data["children"].append(ast_para_json(node.tamanho))
+        data["children"].append(ast_para_json(node.tamanho, nivel + 1))
 
     elif isinstance(node, ArrayAccessNode):
         # Mostra o nome do array com [..]
         data["name"] = f"{node.array.nome}[..]"; data["type"] = "id"
-        data["children"].append(ast_para_json(node.indice))
+        data["children"].append(ast_para_json(node.indice, nivel + 1))
         
     elif isinstance(node, CommentNode):
         # Limpa o texto para não ficar gigante
@@ -80,50 +111,288 @@ def ast_para_json(node):
 
     return data
 
-def compilar_para_web(codigo_fonte: str):
+# --- AST compacta (listas planas) ---
+TIPOS_AST = ('default', 'block', 'if', 'loop', 'op', 'pow', 'number', 'id')
+FORMATOS_AST = ('json', 'compacto', 'paginado')
+
+class _Regras:
+    """ Nó "(regras)" do PARA na visualização (não conta na profundidade) """
+    __slots__ = ('node',)
+    def __init__(self, node): self.node = node
+
+def _exibicao_comentario(node):
+    txt = node.texto.replace('$', '').strip()
+    if len(txt) > 15: txt = txt[:12] + "..."
+    return f"📝 {txt}", 0, ()
+
+def _exibicao_se(node):
+    filhos = [(node.condition, None), (node.true_block, None)]
+    if node.false_block: filhos.append((node.false_block, "SENAO"))
+    return "SE", 2, filhos
+
+# Por classe: nó -> (nome, índice em TIPOS_AST, filhos); filhos são pares (nó, nome forçado ou None)
+_EXIBICAO = {
+    BlockNode: lambda n: ("{...}", 1, [(stmt, None) for stmt in n.statements if stmt]),
+    IfNode: _exibicao_se,
+    WhileNode: lambda n: ("ENQUANTO", 3, ((n.condition, None), (n.block, None))),
+    ForNode: lambda n: ("PARA", 3, ((_Regras(n), None), (n.block, None))),
+    BinOpNode: lambda n: (SIMBOLOS_OP[n.opcode], 5 if n.opcode == OP_POT else 4, ((n.left, None), (n.right, None))),
+    NumeroNode: lambda n: (n.texto, 6, ()),
+    IdNode: lambda n: (n.nome, 7, ()),
+    ArrayNode: lambda n: ("[]", 6, ((n.tamanho, None),)),
+    ArrayAccessNode: lambda n: (f"{n.array.nome}[..]", 7, ((n.indice, None),)),
+    CommentNode: _exibicao_comentario,
+}
+
+def _exibicao_desconhecida(node):
+    return "?", 0, ()
+
+def ast_compacta(raiz):
+    """
+    A árvore de ast_para_json (mesmos nomes, tipos e limite de profundidade) em listas planas,
+    montadas numa passada com pilha explícita: o nó i se chama nomes[nome[i]], tem o tipo
+    tipos[tipo[i]] e o pai pai[i] (-1 na raiz). Os nós estão em pré-ordem, então cada pai vem
+    antes dos filhos e os irmãos ficam na ordem do programa. Cada texto entra uma vez em 'nomes'.
+    """
+    if not raiz: return None
+    nomes, indice_nome = [], {}
+    nome_no, tipo_no, pai_no = [], [], []
+
+    pendentes = [(raiz, 0, -1, None)]
+    while pendentes:
+        node, nivel, pai, nome = pendentes.pop()
+        if type(node) is _Regras:
+            nome, tipo, filhos = "(regras)", 0, ((node.node.init, None), (node.node.condition, None), (node.node.increment, None))
+            nivel -= 1  # os filhos ficam no nível do próprio "(regras)"
+        elif nivel >= PROFUNDIDADE_JSON:
+            nome, tipo, filhos = nome or _OMITIDO, 0, ()
+        else:
+            proprio, tipo, filhos = _EXIBICAO.get(type(node), _exibicao_desconhecida)(node)
+            nome = nome or proprio
+
+        i = indice_nome.get(nome)
+        if i is None:
+            i = indice_nome[nome] = len(nomes)
+            nomes.append(nome)
+        nome_no.append(i); tipo_no.append(tipo); pai_no.append(pai)
+        if filhos:
+            atual = len(pai_no) - 1
+            for filho, forcado in reversed(filhos): pendentes.append((filho, nivel + 1, atual, forcado))
+    return {'nomes': nomes, 'tipos': list(TIPOS_AST), 'nome': nome_no, 'tipo': tipo_no, 'pai': pai_no}
+
+# --- AST paginada (pedaços da árvore guardada no servidor) ---
+# Limites de cada página: níveis abaixo do nó pedido, filhos por nó e nós no total
+PROFUNDIDADE_PAGINA = 3
+FILHOS_PAGINA = 50
+MAX_NOS_PAGINA = 1000
+
+def _exibir(node):
+    if type(node) is _Regras:
+        return "(regras)", 0, ((node.node.init, None), (node.node.condition, None), (node.node.increment, None))
+    return _EXIBICAO.get(type(node), _exibicao_desconhecida)(node)
+
+def pagina_ast(raiz, caminho="", profundidade=PROFUNDIDADE_PAGINA, inicio=0, limite=FILHOS_PAGINA, max_nos=MAX_NOS_PAGINA):
+    """
+    Um pedaço da árvore de ast_para_json (mesmos nomes e tipos) a partir do nó 'caminho': os
+    índices dos filhos desde a raiz separados por ponto ("" é a raiz, "0.2" o terceiro filho do
+    primeiro filho). Vão 'profundidade' níveis abaixo dele, até 'limite' filhos por nó (os do nó
+    pedido a partir de 'inicio') e até 'max_nos' nós, então o tamanho não depende do programa.
+    Cada nó traz 'id' (o caminho) e 'total_filhos'; quando 'children' tem menos que isso, o
+    restante vem pedindo o próprio nó com inicio=len(children).
+    Levanta KeyError se o caminho não existe.
+    """
+    # Cada nível ainda é um dict aninhado no JSON (ver PROFUNDIDADE_JSON)
+    profundidade = min(profundidade, PROFUNDIDADE_JSON)
+    node, nome = raiz, None
+    if not node: raise KeyError(caminho)
+    if caminho:
+        for parte in caminho.split("."):
+            filhos = _exibir(node)[2]
+            if not parte.isdigit() or int(parte) >= len(filhos): raise KeyError(caminho)
+            node, nome = filhos[int(parte)]
+
+    proprio, tipo, filhos = _exibir(node)
+    topo = {'id': caminho, 'name': nome or proprio, 'type': TIPOS_AST[tipo], 'total_filhos': len(filhos),
+            'inicio': inicio, 'children': []}
+    prefixo = caminho + "." if caminho else ""
+    # Em largura: com 'max_nos' esgotado, os níveis de cima ficam completos primeiro
+    fila, restantes = deque([(topo, filhos, prefixo, 0, inicio)]), max_nos
+    while fila and restantes > 0:
+        dados, filhos, prefixo, nivel, primeiro = fila.popleft()
+        if nivel >= profundidade: continue
+        for k in range(primeiro, min(len(filhos), primeiro + limite)):
+            if restantes == 0: break
+            restantes -= 1
+            filho, forcado = filhos[k]
+            proprio, tipo, netos = _exibir(filho)
+            item = {'id': f"{prefixo}{k}", 'name': forcado or proprio, 'type': TIPOS_AST[tipo],
+                    'total_filhos': len(netos), 'children': []}
+            dados['children'].append(item)
+            if netos: fila.append((item, netos, f"{prefixo}{k}.", nivel + 1, 0))
+    return topo
+
+# Partes do resultado publicadas por 'progresso', na ordem das fases: (fase, campos, campo de
+# erros que encerra a compilação quando não está vazio)
+FASES_PUBLICADAS = (
+    ('lexico', ('tokens', 'erros_lexicos'), 'erros_lexicos'),
+    ('sintatico', ('erros_sintaticos', 'ast', 'ast_json', 'ast_compacta', 'ast_paginada'), 'erros_sintaticos'),
+    ('otimizador', ('otimizacao', 'ast_otimizada'), None),
+    ('semantico', ('erros_semanticos', 'limites_excedidos', 'tabela_simbolos'), 'erros_semanticos'),
+    ('tradutor', ('traducao_posfixa',), None),
+    ('gerador', ('codigo_python',), None),
+)
+_CAMPOS_FASE = {fase: campos for fase, campos, _ in FASES_PUBLICADAS}
+
+def compilar_para_web(codigo_fonte: str, modo_execucao: str = 'interpretador', incremental=None, orcamento=None, otimizar=False,
+                      progresso=None, formato_ast='json', arvores=None):
+    """
+    Compila e executa o programa e devolve o dict com a saída de todas as fases.
+    'progresso(fase, campos)', se dado, recebe cada parte do resultado assim que ela fica
+    pronta (ex. 'lexico' com tokens e erros_lexicos), antes das fases seguintes rodarem;
+    uma exceção levantada por ele interrompe a compilação.
+    Com formato_ast='compacto' a visualização da AST vem em 'ast_compacta' (listas planas,
+    ver ast_compacta) e 'ast_json' fica None. Com formato_ast='paginado' a raiz é guardada em
+    'arvores' (um ArvoresSessao) e 'ast_paginada' traz o id dela e só a primeira página (pagina_ast).
+    """
+    if modo_execucao not in MODOS_EXECUCAO:
+        raise ValueError(f"Modo de execução desconhecido: '{modo_execucao}'.")
+    if formato_ast not in FORMATOS_AST:
+        raise ValueError(f"Formato de AST desconhecido: '{formato_ast}'.")
+    if formato_ast == 'paginado' and arvores is None:
+        raise ValueError("formato_ast='paginado' precisa de 'arvores' para guardar a árvore.")
+
     resultados = {
         'tokens': '', 'erros_lexicos': [],
         'ast': '', 'ast_json': None,
         'erros_sintaticos': [], 'erros_semanticos': [],
+        'limites_excedidos': [],
         'tabela_simbolos': '',
         'traducao_posfixa': '', 'codigo_python': '',
         'sucesso': False
     }
 
-    lexico = Lexico(codigo_fonte); tokens, erros_lexicos = lexico.analisar()
+    medidor = MedidorFases(modo_execucao)
+    resultados['metricas'] = medidor.dados
+
+    def publicar(fase):
+        if progresso is not None: progresso(fase, _campos(resultados, fase))
+
+    # Um único mapa de linhas/colunas para todas as fases
+    mapa = MapaFonte(codigo_fonte)
+
+    if incremental is not None:
+        # Reaproveita tokens/AST das declarações que não mudaram (ver src/incremental.py)
+        fase_arvore = 'incremental'
+        with medidor.fase(fase_arvore) as medida:
+            lexico, arvores_raiz, erros_sintaticos = incremental.analisar(codigo_fonte, mapa)
+            medida['tokens'] = len(lexico.tokens)
+    else:
+        with medidor.fase('lexico') as medida:
+            lexico, arvores_raiz, erros_sintaticos = Lexico(codigo_fonte, mapa), None, []
+            lexico.analisar()
+            medida['tokens'] = len(lexico.tokens)
+    tokens, erros_lexicos = lexico.tokens, lexico.erros
     resultados['erros_lexicos'] = erros_lexicos
-    f = io.StringIO(); 
-    with redirect_stdout(f): lexico.imprimir_tokens()
-    resultados['tokens'] = f.getvalue()
+    with medidor.fase('formatar_tokens'):
+        resultados['tokens'] = lexico.formatar_tokens()
+    publicar('lexico')
 
     if erros_lexicos: return resultados
 
-    parser = ParserAST(tokens); arvores_raiz, erros_sintaticos = parser.analisar()
+    if arvores_raiz is None:
+        fase_arvore = 'sintatico'
+        with medidor.fase(fase_arvore):
+            parser = ParserAST(tokens); arvores_raiz, erros_sintaticos = parser.analisar()
     resultados['erros_sintaticos'] = erros_sintaticos
 
     if arvores_raiz and arvores_raiz[0]:
-        resultados['ast'] = ast_para_string(arvores_raiz[0])
-        resultados['ast_json'] = ast_para_json(arvores_raiz[0]) # Chama a função corrigida
+        medidor.anotar(fase_arvore, nos=contar_nos(arvores_raiz[0]))
+        with medidor.fase('ast'):
+            resultados['ast'] = ast_para_string(arvores_raiz[0])
+            if formato_ast == 'compacto': resultados['ast_compacta'] = ast_compacta(arvores_raiz[0])
+            elif formato_ast == 'paginado':
+                resultados['ast_paginada'] = {'arvore': arvores.guardar(arvores_raiz[0]), 'raiz': pagina_ast(arvores_raiz[0])}
+            else: resultados['ast_json'] = ast_para_json(arvores_raiz[0]) # Chama a função corrigida
+    publicar('sintatico')
 
     if erros_sintaticos: return resultados
 
-    semantico = Semantico(arvores_raiz[0], codigo_fonte); erros_semanticos = semantico.analisar()
+    # Execução e traduções usam a árvore otimizada; 'ast'/'ast_json' continuam mostrando o programa escrito
+    arvore = arvores_raiz[0]
+    otimizador = None
+    if otimizar:
+        with medidor.fase('otimizador') as medida:
+            otimizador = Otimizador(orcamento.max_bits if orcamento else None)
+            arvore = otimizador.otimizar(arvore)
+            medida.update(otimizador.estatisticas())
+        resultados['otimizacao'] = otimizador.estatisticas()
+        resultados['ast_otimizada'] = ast_para_string(arvore)
+        publicar('otimizador')
+
+    with medidor.fase('semantico') as medida:
+        semantico = MODOS_EXECUCAO[modo_execucao](arvore, codigo_fonte, mapa, orcamento); erros_semanticos = semantico.analisar()
+        medida['passos'] = semantico.consumo.passos
+        medida['celulas'] = semantico.consumo.celulas
+    if otimizador: otimizador.ocultar(semantico.tabela)
     resultados['erros_semanticos'] = erros_semanticos
-    f = io.StringIO(); 
-    with redirect_stdout(f): semantico.tabela.imprimir()
-    resultados['tabela_simbolos'] = f.getvalue()
+    resultados['limites_excedidos'] = semantico.limites_excedidos
+    resultados['tabela_simbolos'] = semantico.tabela.formatar()
+    publicar('semantico')
 
     if erros_semanticos: return resultados
 
-    tradutor = Tradutor(); f = io.StringIO()
-    with redirect_stdout(f): tradutor.traduzir(arvores_raiz[0])
-    resultados['traducao_posfixa'] = f.getvalue()
+    with medidor.fase('tradutor'):
+        tradutor = Tradutor()
+        resultados['traducao_posfixa'] = tradutor.formatar(arvore)
+    publicar('tradutor')
 
-    try:
-        py_trad = Gerador()
-        resultados['codigo_python'] = py_trad.traduzir(arvores_raiz[0])
-    except Exception as e:
-        resultados['codigo_python'] = f"# Erro ao gerar Python: {str(e)}"
+    with medidor.fase('gerador'):
+        try:
+            py_trad = GeradorOtimizado() if otimizador else Gerador()
+            resultados['codigo_python'] = py_trad.traduzir(arvore)
+        except Exception as e:
+            resultados['codigo_python'] = f"# Erro ao gerar Python: {str(e)}"
+    publicar('gerador')
 
     resultados['sucesso'] = True
-    return resultados
\ No newline at end of file
+    return resultados
+
+def compilar_com_cache(codigo_fonte: str, modo_execucao: str = 'interpretador', cache=None, incremental=None, orcamento=None,
+                       otimizar=False, progresso=None, formato_ast='json', arvores=None):
+    """
+    compilar_para_web com reaproveitamento de resultados idênticos (ver src/cache.py).
+    Num acerto o 'progresso' recebe as partes guardadas, na mesma ordem da compilação.
+    """
+    if cache is None:
+        return compilar_para_web(codigo_fonte, modo_execucao, incremental, orcamento, otimizar, progresso, formato_ast, arvores)
+
+    # O orçamento entra na chave: o mesmo código pode terminar ou estourar dependendo dos limites
+    orcamento = orcamento or Orcamento()
+    chave = cache.chave(codigo_fonte, modo_execucao, orcamento.chave(), f"otimizar={bool(otimizar)}",
+                        f"formato_ast={formato_ast}")
+    resultados = cache.obter(chave)
+    # Resultado paginado cuja árvore já saiu de 'arvores': as próximas páginas não existiriam mais
+    paginada = resultados.get('ast_paginada') if resultados is not None else None
+    if paginada and (arvores is None or paginada['arvore'] not in arvores):
+        resultados = None
+    if resultados is None:
+        resultados = compilar_para_web(codigo_fonte, modo_execucao, incremental, orcamento, otimizar, progresso, formato_ast,
+                                       arvores)
+        # Uma interrupção externa (tarefa cancelada) não se repetiria com o mesmo código
+        if not any(limite['limite'] == 'interrompido' for limite in resultados['limites_excedidos']):
+            cache.guardar(chave, resultados)
+    else:
+        # As métricas guardadas são as da compilação original
+        resultados['metricas']['cache'] = True
+        if progresso is not None: _republicar(resultados, progresso)
+    return resultados
+
+def _campos(resultados, fase):
+    # 'ast_compacta' e 'ast_paginada' só existem quando pedidas
+    return {campo: resultados[campo] for campo in _CAMPOS_FASE[fase] if campo in resultados}
+
+def _republicar(resultados, progresso):
+    for fase, _, erros in FASES_PUBLICADAS:
+        if fase == 'otimizador' and 'otimizacao' not in resultados: continue
+        progresso(fase, _campos(resultados, fase))
+        if erros and resultados[erros]: return
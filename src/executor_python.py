@@ -0,0 +1,206 @@
+import ast
+from functools import lru_cache
+
+from src.semantico import Semantico, tipo_do_valor
+from src.tradutor import GeradorOtimizado
+from src.vetor import Vetor
+from src.vetorizacao import np, plano_while, plano_for, executar_plano
+
+# Nomes injetados no namespace do programa; programas que usam nomes com '__' vão direto para o interpretador
+_PREFIXO = "__"
+
+class _Interrompido(Exception):
+    """ Uma proteção disparou: o interpretador refaz a execução e produz o diagnóstico exato """
+
+class _Protecoes(ast.NodeTransformer):
+    """
+    Reescreve o Python do GeradorOtimizado para reproduzir as regras do Semantico:
+      a[int(i)]        -> __ler(a, i)         (array existente, índice inteiro e dentro dos limites)
+      a[int(i)] = v    -> __gravar(a, i, v)
+      x / y            -> __div(x, y)         (divisão por zero)
+      [0] * int(n)     -> __novo_array(n)     (tamanho inteiro e não negativo)
+      a and b / a or b -> __bool(...)         ('e'/'ou' sempre resultam em booleano)
+      x * y / x ** y   -> __mult / __pot      (orçamento de bits e de células)
+      x + y            -> __soma(x, y)        (só se um lado puder ser array: orçamento de células)
+      fim de cada while/for -> __passo()      (orçamento de passos e de tempo)
+      range(...)       -> __range(...)        (o namespace não tem builtins)
+      while/for de um 'para' vetorizável -> 'if not __vetorizar(k): ...'   (ver src/vetorizacao.py)
+    """
+    def __init__(self, nomes_array):
+        self.nomes_array = nomes_array
+        self.planos = []
+    def visit_Subscript(self, node):
+        argumentos = [self.visit(node.value), self.visit(self._indice(node.slice))]
+        return ast.Call(ast.Name('__ler', ast.Load()), argumentos, [])
+
+    def visit_Assign(self, node):
+        alvo = node.targets[0]
+        if len(node.targets) == 1 and isinstance(alvo, ast.Subscript):
+            # O alvo não passa por visit_Subscript (viraria uma chamada em contexto de escrita)
+            argumentos = [self.visit(alvo.value), self.visit(self._indice(alvo.slice)), self.visit(node.value)]
+            return ast.Expr(ast.Call(ast.Name('__gravar', ast.Load()), argumentos, []))
+        self.generic_visit(node)
+        return node
+
+    def visit_BinOp(self, node):
+        if isinstance(node.op, ast.Mult) and isinstance(node.left, ast.List):
+            return ast.Call(ast.Name('__novo_array', ast.Load()), [self.visit(self._indice(node.right))], [])
+        pode_ser_array = isinstance(node.op, ast.Add) and (
+            _pode_ser_array(node.left, self.nomes_array) or _pode_ser_array(node.right, self.nomes_array))
+        self.generic_visit(node)
+        protecao = {ast.Div: '__div', ast.Mult: '__mult', ast.Pow: '__pot'}.get(type(node.op))
+        if pode_ser_array: protecao = '__soma'
+        if protecao:
+            return ast.Call(ast.Name(protecao, ast.Load()), [node.left, node.right], [])
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        return ast.Call(ast.Name('__bool', ast.Load()), [node], [])
+
+    def visit_While(self, node):
+        return self._laco(node, plano_while(node) if np is not None else None)
+
+    def visit_For(self, node):
+        plano = plano_for(node) if np is not None else None
+        node.iter.func = ast.Name('__range', ast.Load())
+        return self._laco(node, plano)
+
+    def _laco(self, node, plano):
+        self.generic_visit(node)
+        node.body.append(ast.Expr(ast.Call(ast.Name('__passo', ast.Load()), [], [])))
+        if plano is None: return node
+        # O laço escalar só roda se o NumPy não puder executar tudo de uma vez
+        self.planos.append(plano)
+        tentativa = ast.Call(ast.Name('__vetorizar', ast.Load()), [ast.Constant(len(self.planos) - 1)], [])
+        return ast.If(ast.UnaryOp(ast.Not(), tentativa), [node], [])
+
+    @staticmethod
+    def _indice(expr):
+        # Índices e tamanhos podem vir em int(...); a proteção precisa do valor original
+        if isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name) and expr.func.id == 'int' and len(expr.args) == 1:
+            return expr.args[0]
+        return expr
+
+def _pode_ser_array(expr, nomes_array):
+    """ A expressão pode resultar num array? (criação '[0] * n' ou variável que já recebeu um) """
+    pendentes = [expr]
+    while pendentes:
+        n = pendentes.pop()
+        if isinstance(n, ast.List) or (isinstance(n, ast.Name) and n.id in nomes_array): return True
+        if isinstance(n, ast.Subscript) and '' not in nomes_array:
+            continue  # elemento de array: só é array se algum array guardar outro (marcado com '')
+        pendentes.extend(ast.iter_child_nodes(n))
+    return False
+
+def _nomes_array(arvore):
+    """ Variáveis que podem guardar arrays (ponto fixo sobre as atribuições do programa) """
+    atribuicoes = [(n.targets[0], n.value) for n in ast.walk(arvore) if isinstance(n, ast.Assign)]
+    nomes = set()
+    mudou = True
+    while mudou:
+        mudou = False
+        for alvo, valor in atribuicoes:
+            # '' representa "elementos de algum array" (array guardado dentro de array)
+            nome = alvo.id if isinstance(alvo, ast.Name) else ''
+            if nome not in nomes and _pode_ser_array(valor, nomes):
+                nomes.add(nome); mudou = True
+    return nomes
+
+@lru_cache(maxsize=256)
+def compilar_protegido(codigo_python):
+    """ Code object do Python gerado, já com as proteções, e os planos dos laços vetorizáveis (compilado uma vez por código) """
+    arvore = ast.parse(codigo_python, "<gerado>", "exec")
+    nomes = {n.id for n in ast.walk(arvore) if isinstance(n, ast.Name)}
+    if any(nome.startswith(_PREFIXO) for nome in nomes):
+        raise _Interrompido("nome reservado no programa")
+    protecoes = _Protecoes(_nomes_array(arvore))
+    arvore = ast.fix_missing_locations(protecoes.visit(arvore))
+    return compile(arvore, "<gerado>", "exec"), tuple(protecoes.planos)
+
+class ExecutorPython(Semantico):
+    """
+    Back-end de execução nativa: roda o Python emitido pelo GeradorOtimizado num namespace isolado
+    (sem builtins) e preenche a TabelaSimbolos a partir das variáveis resultantes.
+    Se qualquer proteção disparar, o programa não compilar ou der qualquer exceção,
+    a execução é refeita pelo Semantico, que gera os erros e a tabela de referência.
+    O mesmo vale para um limite do Orcamento: o interpretador repete a execução com um
+    consumo novo (no caso do tempo, o total pode chegar ao dobro de max_tempo).
+    """
+    def __init__(self, arvore, codigo_fonte="", mapa=None, orcamento=None):
+        super().__init__(arvore, codigo_fonte, mapa, orcamento)
+        self.usou_interpretador = False
+
+    def analisar(self):
+        self.erros = []
+        self.limites_excedidos = []
+        self.consumo = self.orcamento.iniciar()
+        try:
+            namespace = self._executar_nativo()
+        except Exception:
+            self.usou_interpretador = True
+            return super().analisar()
+
+        for nome, valor in namespace.items():
+            if nome.startswith(_PREFIXO): continue
+            self.tabela.definir(nome, tipo_do_valor(valor), valor)
+        return self.erros
+
+    def _executar_nativo(self):
+        codigo, planos = compilar_protegido(GeradorOtimizado().traduzir(self.arvore))
+        consumo = self.consumo
+        verificar_operacao = consumo.verificar_operacao
+
+        def passo():
+            consumo.passos += 1
+            if consumo.passos >= consumo.proxima_verificacao: consumo.verificar()
+
+        def ler(vetor, indice):
+            if type(vetor) is not Vetor or not isinstance(indice, int) or indice < 0 or indice >= len(vetor.dados):
+                raise _Interrompido("acesso a array")
+            return vetor.dados[indice]
+
+        def gravar(vetor, indice, valor):
+            if type(vetor) is not Vetor or not isinstance(indice, int) or indice < 0 or indice >= len(vetor.dados):
+                raise _Interrompido("escrita em array")
+            dados = vetor.dados
+            if type(dados) is list or (type(valor) is int and valor.bit_length() < 64):
+                dados[indice] = valor
+            else:
+                vetor.gravar(indice, valor)
+
+        def div(esq, dir):
+            if dir == 0: raise _Interrompido("divisão por zero")
+            return esq / dir
+
+        def novo_array(tamanho):
+            if not isinstance(tamanho, int) or tamanho < 0: raise _Interrompido("tamanho de array")
+            consumo.alocar(tamanho)
+            return Vetor.zeros(tamanho)
+
+        def mult(esq, dir):
+            verificar_operacao('*', esq, dir)
+            return esq * dir
+
+        def pot(esq, dir):
+            verificar_operacao('**', esq, dir)
+            return esq ** dir
+
+        def soma(esq, dir):
+            verificar_operacao('+', esq, dir)
+            return esq + dir
+
+        def vetorizar(k):
+            plano = planos[k]
+            fim = executar_plano(plano, namespace.get, consumo)
+            if fim is None: return False
+            namespace[plano.variavel] = fim
+            return True
+
+        namespace = {
+            '__builtins__': {}, '__passo': passo, '__ler': ler, '__gravar': gravar,
+            '__div': div, '__novo_array': novo_array, '__bool': bool,
+            '__mult': mult, '__pot': pot, '__soma': soma, '__vetorizar': vetorizar, '__range': range,
+        }
+        exec(codigo, namespace)
+        return namespace
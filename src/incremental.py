@@ -0,0 +1,149 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from src.lexico import Lexico
+from src.parser_ast import Node, BlockNode, ParserAST
+
+# Caracteres que delimitam declarações de topo (comentários '$' são pulados inteiros)
+_REGEX_DELIMITADORES = re.compile(r'[()\[\]{};]|\$[^\n]*')
+# 'senao' logo após o '}' de um 'se' pertence à mesma declaração
+_REGEX_SENAO = re.compile(r'(?:\s|\$[^\n]*)*senao\b')
+
+def dividir_declaracoes(codigo_fonte):
+    """
+    Divide o código em trechos contíguos, um por declaração de topo: termina em ';' ou
+    no '}' que fecha o nível zero (sem 'senao' em seguida). Espaços e comentários ficam
+    no início do trecho seguinte; a concatenação dos trechos é o próprio código.
+    """
+    trechos = []
+    inicio = 0
+    nivel = 0
+    for mo in _REGEX_DELIMITADORES.finditer(codigo_fonte):
+        c = mo.group()
+        if c[0] == '$': continue
+        if c in '([{':
+            nivel += 1
+        elif c in ')]}':
+            nivel -= 1
+            if c == '}' and nivel == 0 and not _REGEX_SENAO.match(codigo_fonte, mo.end()):
+                trechos.append((inicio, mo.end())); inicio = mo.end()
+        elif nivel == 0:  # ';'
+            trechos.append((inicio, mo.end())); inicio = mo.end()
+    if inicio < len(codigo_fonte):
+        trechos.append((inicio, len(codigo_fonte)))
+    return trechos
+
+def deslocar_no(node, delta):
+    """ Cópia da subárvore com todas as posições somadas de 'delta' (pilha explícita, sem recursão) """
+    if isinstance(node, list):
+        return [deslocar_no(item, delta) for item in node]
+    if not isinstance(node, Node):
+        return node
+    raiz = object.__new__(node.__class__)
+    # (cópia ainda vazia, original): filhos ganham a cópia na hora e são preenchidos depois
+    pendentes = [(raiz, node)]
+    while pendentes:
+        novo, original = pendentes.pop()
+        for attr in original.__slots__:
+            valor = getattr(original, attr)
+            if attr == 'pos':
+                valor += delta
+            elif isinstance(valor, Node):
+                copia = object.__new__(valor.__class__)
+                pendentes.append((copia, valor))
+                valor = copia
+            elif isinstance(valor, list):
+                itens = []
+                for item in valor:
+                    if isinstance(item, Node):
+                        copia = object.__new__(item.__class__)
+                        pendentes.append((copia, item))
+                        item = copia
+                    itens.append(item)
+                valor = itens
+            setattr(novo, attr, valor)
+    return raiz
+
+class AnalisadorIncremental:
+    """
+    Front-end (léxico + sintático) com cache por declaração de topo.
+    Cada trecho é identificado pelo hash do seu texto; numa nova submissão só os
+    trechos alterados são analisados de novo e os demais são reaproveitados. Trechos
+    que continuam no mesmo deslocamento reaproveitam os próprios objetos (a AST é só
+    lida pelas fases seguintes); os que mudaram de lugar recebem cópias com as posições
+    deslocadas. Se algum trecho tiver erro, a análise é refeita do jeito tradicional
+    para que as mensagens saiam idênticas.
+    """
+    def __init__(self, max_entradas=4096):
+        self.max_entradas = max_entradas
+        self._cache = OrderedDict()  # hash -> (inicio, tokens, declaracao), posições absolutas a partir de 'inicio'
+        self._trava = threading.Lock()
+        self.reaproveitados = 0
+        self.analisados = 0
+
+    def analisar(self, codigo_fonte, mapa=None):
+        """ Retorna (lexico, arvores_raiz, erros_sintaticos); arvores_raiz é None se houver erro léxico """
+        lexico = Lexico(codigo_fonte, mapa)
+        tokens = []
+        declaracoes = []
+
+        for inicio, fim in dividir_declaracoes(codigo_fonte):
+            entrada = self._analisar_trecho(codigo_fonte[inicio:fim], inicio)
+            if entrada is None:
+                return self._analisar_completo(lexico)
+            tokens.extend(entrada[1])
+            if entrada[2] is not None:
+                declaracoes.append(entrada[2])
+
+        lexico.tokens = tokens
+        return lexico, [BlockNode(declaracoes)], []
+
+    def _analisar_trecho(self, texto, inicio):
+        chave = hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+        with self._trava:
+            entrada = self._cache.get(chave)
+            if entrada is not None:
+                self._cache.move_to_end(chave)
+                self.reaproveitados += 1
+
+        if entrada is not None:
+            if entrada[0] == inicio:
+                return entrada
+            delta = inicio - entrada[0]
+            entrada = (inicio, [(t[0], t[1], t[2] + delta) for t in entrada[1]], deslocar_no(entrada[2], delta))
+        else:
+            entrada = self._analisar_novo(texto, inicio)
+            if entrada is None: return None
+
+        with self._trava:
+            self._cache[chave] = entrada
+            if len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+        return entrada
+
+    def _analisar_novo(self, texto, inicio):
+        tokens, erros = Lexico(texto).analisar()
+        if erros: return None
+        declaracao = None
+        if tokens:
+            parser = ParserAST(tokens)
+            try:
+                declaracao = parser.declaracao()
+            except Exception:
+                return None
+            # O trecho precisa formar exatamente uma declaração válida, sem sobras
+            if declaracao is None or parser.token_atual is not None or parser.erros:
+                return None
+
+        with self._trava:
+            self.analisados += 1
+        return (inicio, [(t[0], t[1], t[2] + inicio) for t in tokens], deslocar_no(declaracao, inicio))
+
+    def _analisar_completo(self, lexico):
+        tokens, erros_lexicos = lexico.analisar()
+        if erros_lexicos:
+            return lexico, None, []
+        arvores_raiz, erros_sintaticos = ParserAST(tokens).analisar()
+        return lexico, arvores_raiz, erros_sintaticos
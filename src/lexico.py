@@ -1,24 +1,60 @@
 import re
 
+from src.util import MapaFonte, MapaArquivo, blocos_de_linhas, TAMANHO_BLOCO
+
+REGRAS_TOKENS = [
+    ('SENAO',         r'senao\b'),     
+    ('ENTAO',         r'entao\b'),     
+    ('ENQUANTO',      r'enquanto\b'),  
+    ('PARA',          r'para\b'),
+    ('SE',            r'se\b'),
+    ('E',             r'e\b'),
+    ('OU',            r'ou\b'),
+
+    ('FIM',           r';'),
+    ('LBRACE',        r'\{'),
+    ('RBRACE',        r'\}'),
+    ('LPAREN',        r'\('),
+    ('RPAREN',        r'\)'),
+
+    ('LBRACKET',      r'\['),
+    ('RBRACKET',      r'\]'),
+
+    ('IGUAL',         r'=='),
+    ('DIFERENTE',     r'!='),
+    ('MAIOR_IGUAL',   r'>='),
+    ('MENOR_IGUAL',   r'<='),
+    ('POTENCIA',      r'\*\*'),
+
+    ('ATRIBUICAO',    r'='),
+    ('MAIOR',         r'>'),
+    ('MENOR',         r'<'),
+    ('SOMA',          r'\+'),
+    ('SUB',           r'-'),
+    ('MULT',          r'\*'),
+    ('DIV',           r'/'),
+
+    ('ID',            r'[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('NUMERO',        r'\d+(\.\d+)?'),
+
+    ('COMENTARIO',    r'\$.*'),
+    ('ESPACO',        r'[ \t\r\n]+'),
+    ('ERRO',          r'.'),
+]
+
+# Compilado uma única vez por processo (reaproveitado por todas as análises)
+_REGEX_TOKENS = re.compile('|'.join('(?P<%s>%s)' % par for par in REGRAS_TOKENS))
+
 class Lexico:
-    def __init__(self, codigo_fonte: str):
+    def __init__(self, codigo_fonte: str, mapa=None):
         self.codigo_fonte = codigo_fonte
         self.tokens = []
         self.erros = []
-        self.linhas = codigo_fonte.split('\n')
+        self.mapa = mapa or MapaFonte(codigo_fonte)
 
     def _formatar_erro(self, pos_global: int, char: str):
-        contador = 0
-        for num_linha, conteudo in enumerate(self.linhas, start=1):
-            if contador + len(conteudo) + 1 > pos_global:
-                coluna = pos_global - contador
-                break
-            contador += len(conteudo) + 1
-        
-        if num_linha > len(self.linhas): 
-            return f"Erro Léxico: {char}"
-            
-        linha_original = self.linhas[num_linha - 1]
+        num_linha, coluna = self.mapa.localizar(pos_global)
+        linha_original = self.mapa.linha(num_linha)
         
         coluna = max(0, min(coluna, len(linha_original)))
         
@@ -26,71 +62,55 @@ class Lexico:
         underline = " " * coluna + f"^"
         return (f"Erro Léxico na linha {num_linha}, coluna {coluna + 1}: caractere inesperado '{char}'\n    {linha_colorida}\n    {underline}")
     
-    def analisar(self):
-        self.tokens = []
+    def iter_tokens(self):
+        """ Gera os tokens sob demanda; erros léxicos vão sendo acumulados em self.erros """
         self.erros = []
+        for texto, base in self._trechos():
+            for mo in _REGEX_TOKENS.finditer(texto):
+                tipo = mo.lastgroup
 
-        regras_tokens = [
-            ('SENAO',         r'senao\b'),     
-            ('ENTAO',         r'entao\b'),     
-            ('ENQUANTO',      r'enquanto\b'),  
-            ('PARA',          r'para\b'),
-            ('SE',            r'se\b'),
-            ('E',             r'e\b'),
-            ('OU',            r'ou\b'),
-
-            ('FIM',           r';'),
-            ('LBRACE',        r'\{'),
-            ('RBRACE',        r'\}'),
-            ('LPAREN',        r'\('),
-            ('RPAREN',        r'\)'),
-            
-            ('LBRACKET',      r'\['),
-            ('RBRACKET',      r'\]'),
-
-            ('IGUAL',         r'=='),
-            ('DIFERENTE',     r'!='),
-            ('MAIOR_IGUAL',   r'>='),
-            ('MENOR_IGUAL',   r'<='),
-            ('POTENCIA',      r'\*\*'),
-
-            ('ATRIBUICAO',    r'='),
-            ('MAIOR',         r'>'),
-            ('MENOR',         r'<'),
-            ('SOMA',          r'\+'),
-            ('SUB',           r'-'),
-            ('MULT',          r'\*'),
-            ('DIV',           r'/'),
-
-            ('ID',            r'[a-zA-Z_][a-zA-Z0-9_]*'),
-            ('NUMERO',        r'\d+(\.\d+)?'),
-
-            ('COMENTARIO',    r'\$.*'),
-            ('ESPACO',        r'[ \t\r\n]+'),
-            ('ERRO',          r'.'),
-        ]
-
-        regex = '|'.join('(?P<%s>%s)' % pair for pair in regras_tokens)
-
-        for mo in re.finditer(regex, self.codigo_fonte):
-            tipo = mo.lastgroup
-            valor = mo.group()
-            pos_global = mo.start()
-            
-            if tipo == 'ESPACO' or tipo == 'COMENTARIO':
-                continue
-            
-            elif tipo == 'ERRO':
-                self.erros.append(self._formatar_erro(pos_global, valor))
-            else:
-                self.tokens.append((tipo, valor, pos_global))
-        
+                if tipo == 'ESPACO' or tipo == 'COMENTARIO':
+                    continue
+
+                elif tipo == 'ERRO':
+                    self.erros.append(self._formatar_erro(base + mo.start(), mo.group()))
+                else:
+                    yield (tipo, mo.group(), base + mo.start())
+
+    def _trechos(self):
+        # (texto, posição do texto no código-fonte); aqui, o código inteiro de uma vez
+        yield self.codigo_fonte, 0
+
+    def analisar(self):
+        self.tokens = list(self.iter_tokens())
         return self.tokens, self.erros
 
+    def formatar_tokens(self):
+        linhas = ["-" * 30, "LISTA DE TOKENS:", "-" * 30]
+        linhas.extend(f"[{t[0]:<15}] : {t[1]}" for t in self.tokens)
+        linhas.append("-" * 30)
+        return "\n".join(linhas) + "\n"
+
     def imprimir_tokens(self):
-        print("-" * 30)
-        print("LISTA DE TOKENS:")
-        print("-" * 30)
-        for t in self.tokens:
-            print(f"[{t[0]:<15}] : {t[1]}")
-        print("-" * 30)
\ No newline at end of file
+        print(self.formatar_tokens(), end="")
+
+class LexicoArquivo(Lexico):
+    """
+    Léxico de um arquivo mapeado em memória (abrir_mapeado): o conteúdo nunca vira uma string
+    inteira. Cada bloco de ~'tamanho_bloco' bytes é decodificado e tokenizado por vez. Os blocos
+    terminam logo após um '\n', e nenhum token atravessa uma quebra de linha, então os tokens são
+    os mesmos do texto inteiro (um espaço em branco dividido em dois é descartado do mesmo jeito).
+    As posições continuam contadas em caracteres desde o início do arquivo, e as linhas dos erros
+    vêm do próprio buffer (MapaArquivo).
+    """
+    def __init__(self, buffer, mapa=None, tamanho_bloco=TAMANHO_BLOCO):
+        super().__init__("", mapa or MapaArquivo(buffer, tamanho_bloco))
+        self.buffer = buffer
+        self.tamanho_bloco = tamanho_bloco
+
+    def _trechos(self):
+        base = 0
+        for inicio, fim in blocos_de_linhas(self.buffer, self.tamanho_bloco):
+            texto = self.buffer[inicio:fim].decode("utf-8")
+            yield texto, base
+            base += len(texto)
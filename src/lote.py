@@ -0,0 +1,63 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.compilador_api import compilar_para_web
+
+def _compilar_item(item):
+    """ Executado nos processos trabalhadores (precisa ser de topo para ser serializável) """
+    nome, codigo, modo_execucao, orcamento, otimizar = item
+    inicio = time.perf_counter()
+    try:
+        resultados = compilar_para_web(codigo, modo_execucao, orcamento=orcamento, otimizar=otimizar)
+    except Exception as e:
+        resultados = {'sucesso': False, 'erro_geral': f"Erro interno ao compilar: {str(e)}"}
+    resultados['tempo_segundos'] = time.perf_counter() - inicio
+    return nome, resultados
+
+def compilar_lote(fontes, modo_execucao='interpretador', trabalhadores=None, executor=None, orcamento=None, otimizar=False):
+    """
+    Compila vários programas em paralelo, um processo por trabalhador.
+    'fontes' é um dict nome -> código. Usa o 'executor' recebido (pool persistente do
+    servidor) ou cria um ProcessPoolExecutor com 'trabalhadores' processos; com um
+    único trabalhador tudo roda no próprio processo. O 'orcamento' e 'otimizar' valem para cada programa.
+    """
+    itens = [(nome, codigo, modo_execucao, orcamento, otimizar) for nome, codigo in fontes.items()]
+    if trabalhadores is None:
+        trabalhadores = os.cpu_count() or 1
+    trabalhadores = max(1, min(trabalhadores, len(itens) or 1))
+    # Lotes maiores por envio diminuem o custo de comunicação entre processos
+    tamanho_pedaco = max(1, len(itens) // (trabalhadores * 4))
+
+    inicio = time.perf_counter()
+    if executor is not None:
+        pares = list(executor.map(_compilar_item, itens, chunksize=tamanho_pedaco))
+    elif trabalhadores == 1:
+        pares = [_compilar_item(item) for item in itens]
+    else:
+        with ProcessPoolExecutor(max_workers=trabalhadores) as pool:
+            pares = list(pool.map(_compilar_item, itens, chunksize=tamanho_pedaco))
+    tempo_total = time.perf_counter() - inicio
+
+    resultados = dict(pares)
+    sucessos = sum(1 for r in resultados.values() if r.get('sucesso'))
+    return {
+        'resultados': resultados,
+        'total': len(resultados),
+        'sucessos': sucessos,
+        'falhas': len(resultados) - sucessos,
+        'trabalhadores': trabalhadores,
+        'tempo_total_segundos': tempo_total,
+        'tempo_compilacao_segundos': sum(r['tempo_segundos'] for r in resultados.values()),
+    }
+
+def carregar_pasta(pasta, extensao='.min'):
+    """ Lê todos os arquivos da pasta (e subpastas) com a extensão dada: nome relativo -> código """
+    fontes = {}
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in sorted(arquivos):
+            if not arquivo.endswith(extensao): continue
+            caminho = os.path.join(raiz, arquivo)
+            with open(caminho, "r", encoding="utf-8", errors="replace") as f:
+                fontes[os.path.relpath(caminho, pasta)] = f.read()
+    return dict(sorted(fontes.items()))
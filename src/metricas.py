@@ -0,0 +1,116 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from src.parser_ast import Node
+
+# Limites superiores (segundos) dos baldes dos histogramas de tempo por fase
+BALDES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Campos das fases que viram contadores acumulados
+CONTADORES = ('tokens', 'nos', 'passos', 'celulas')
+
+def contar_nos(raiz):
+    """ Quantidade de nós da AST (percurso com pilha explícita) """
+    total = 0
+    pendentes = [raiz]
+    while pendentes:
+        node = pendentes.pop()
+        if isinstance(node, list):
+            pendentes.extend(node)
+        elif isinstance(node, Node):
+            total += 1
+            pendentes.extend(v for v in map(node.__getattribute__, node.__slots__) if isinstance(v, (Node, list)))
+    return total
+
+class MedidorFases:
+    """
+    Instrumentação de uma compilação: tempo de relógio e contadores por fase.
+    'dados' vai direto para resultados['metricas'] e é preenchido conforme as fases rodam,
+    então fica correto mesmo quando a compilação para no meio (erro léxico, sintático...).
+    """
+    def __init__(self, modo_execucao=None):
+        self.dados = {'modo_execucao': modo_execucao, 'cache': False, 'fases': {}, 'total_segundos': 0.0}
+
+    @contextmanager
+    def fase(self, nome, **contadores):
+        medida = dict(contadores)
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            segundos = time.perf_counter() - inicio
+            medida['segundos'] = segundos
+            self.dados['fases'][nome] = medida
+            self.dados['total_segundos'] += segundos
+
+    def anotar(self, nome, **contadores):
+        """ Acrescenta contadores medidos fora do cronômetro a uma fase já registrada """
+        self.dados['fases'][nome].update(contadores)
+
+class _Histograma:
+    def __init__(self):
+        self.baldes = [0] * len(BALDES_SEGUNDOS)
+        self.soma = 0.0
+        self.contagem = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BALDES_SEGUNDOS):
+            if valor <= limite: self.baldes[i] += 1
+        self.soma += valor
+        self.contagem += 1
+
+class RegistroMetricas:
+    """
+    Acumula as métricas de todas as compilações do processo (servidor) e as exporta no
+    formato texto do Prometheus: histogramas de tempo por fase e contadores de tokens,
+    nós, passos interpretados e células de array.
+    """
+    def __init__(self, prefixo="compilador"):
+        self.prefixo = prefixo
+        self._trava = threading.Lock()
+        self._histogramas = {}   # fase -> _Histograma
+        self._totais = {}        # (campo, fase) -> soma
+        self._compilacoes = {}   # (modo, sucesso, cache) -> quantidade
+
+    def registrar(self, resultados):
+        """ Soma as métricas de um resultado de compilar_para_web (ignora resultados sem 'metricas') """
+        metricas = resultados.get('metricas')
+        if not metricas: return
+        modo = metricas.get('modo_execucao') or ''
+        em_cache = bool(metricas.get('cache'))
+        chave = (modo, bool(resultados.get('sucesso')), em_cache)
+        with self._trava:
+            self._compilacoes[chave] = self._compilacoes.get(chave, 0) + 1
+            if em_cache: return  # as fases não rodaram de novo
+            for fase, medida in metricas['fases'].items():
+                self._histogramas.setdefault(fase, _Histograma()).observar(medida['segundos'])
+                for campo in CONTADORES:
+                    if campo in medida:
+                        self._totais[(campo, fase)] = self._totais.get((campo, fase), 0) + medida[campo]
+
+    def formatar_prometheus(self):
+        p = self.prefixo
+        linhas = []
+        with self._trava:
+            linhas += [f"# HELP {p}_compilacoes_total Compilações atendidas.",
+                       f"# TYPE {p}_compilacoes_total counter"]
+            for (modo, sucesso, em_cache), quantidade in sorted(self._compilacoes.items()):
+                rotulos = f'modo="{modo}",sucesso="{str(sucesso).lower()}",cache="{str(em_cache).lower()}"'
+                linhas.append(f"{p}_compilacoes_total{{{rotulos}}} {quantidade}")
+
+            linhas += [f"# HELP {p}_fase_segundos Tempo de relógio de cada fase da compilação.",
+                       f"# TYPE {p}_fase_segundos histogram"]
+            for fase, h in sorted(self._histogramas.items()):
+                for limite, quantidade in zip(BALDES_SEGUNDOS, h.baldes):
+                    linhas.append(f'{p}_fase_segundos_bucket{{fase="{fase}",le="{limite:g}"}} {quantidade}')
+                linhas.append(f'{p}_fase_segundos_bucket{{fase="{fase}",le="+Inf"}} {h.contagem}')
+                linhas.append(f'{p}_fase_segundos_sum{{fase="{fase}"}} {h.soma!r}')
+                linhas.append(f'{p}_fase_segundos_count{{fase="{fase}"}} {h.contagem}')
+
+            for campo in CONTADORES:
+                linhas += [f"# HELP {p}_{campo}_total Soma de '{campo}' medidos em cada fase.",
+                           f"# TYPE {p}_{campo}_total counter"]
+                for (c, fase), total in sorted(self._totais.items()):
+                    if c == campo: linhas.append(f'{p}_{campo}_total{{fase="{fase}"}} {total}')
+        return "\n".join(linhas) + "\n"
@@ -0,0 +1,29 @@
+import os
+
+class ObservadorPasta:
+    """
+    Acompanha os arquivos com a extensão dada numa pasta (e subpastas) por polling: um arquivo
+    mudou quando o mtime ou o tamanho mudam. Só a biblioteca padrão, em qualquer sistema.
+    verificar() devolve (alterados, removidos) desde a chamada anterior, em nomes relativos à
+    pasta; na primeira chamada todos os arquivos contam como alterados.
+    """
+    def __init__(self, pasta, extensao='.min'):
+        self.pasta = pasta
+        self.extensao = extensao
+        self._marcas = {}  # nome relativo -> (mtime em ns, tamanho)
+
+    def verificar(self):
+        atuais = {}
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                if not arquivo.endswith(self.extensao): continue
+                caminho = os.path.join(raiz, arquivo)
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue  # removido entre a listagem e o stat
+                atuais[os.path.relpath(caminho, self.pasta)] = (info.st_mtime_ns, info.st_size)
+        alterados = sorted(nome for nome, marca in atuais.items() if self._marcas.get(nome) != marca)
+        removidos = sorted(set(self._marcas) - set(atuais))
+        self._marcas = atuais
+        return alterados, removidos
@@ -0,0 +1,162 @@
+import math
+import time
+
+from src.vetor import Vetor
+
+class LimiteExcedido(Exception):
+    """ Um dos limites do Orcamento foi ultrapassado; interrompe a execução do programa """
+    def __init__(self, limite, maximo, consumido, mensagem, pos=-1):
+        super().__init__(mensagem)
+        self.limite = limite
+        self.maximo = maximo
+        self.consumido = consumido
+        self.mensagem = mensagem
+        self.pos = pos
+
+    def como_dict(self, mapa=None):
+        linha = mapa.localizar(self.pos)[0] if mapa is not None and mapa.contem(self.pos) else None
+        return {'limite': self.limite, 'maximo': self.maximo, 'consumido': self.consumido,
+                'linha': linha, 'mensagem': self.mensagem}
+
+class Orcamento:
+    """
+    Limites de execução de um programa (configuração imutável, pode ser compartilhada):
+      max_passos  - iterações de laço (somadas entre todos os laços)
+      max_tempo   - segundos de relógio
+      max_celulas - células de array alocadas (criação, concatenação e repetição)
+      max_bits    - tamanho de um inteiro produzido por '*' ou '**'
+      max_erros   - erros semânticos coletados (um laço sem fim que erra a cada volta para aqui)
+    Cada execução chama iniciar() e recebe um Consumo próprio com os contadores.
+    'interrupcao' (opcional, fora da chave do cache) é um objeto com is_set(), como um
+    threading.Event: quando ligado, a execução para na próxima verificação do relógio.
+    """
+    CAMPOS = ('max_passos', 'max_tempo', 'max_celulas', 'max_bits', 'max_erros')
+    PADRAO = {'max_passos': 1_000_000, 'max_tempo': 10.0, 'max_celulas': 10_000_000, 'max_bits': 1_000_000,
+              'max_erros': 1000}
+
+    def __init__(self, max_passos=None, max_tempo=None, max_celulas=None, max_bits=None, max_erros=None,
+                 interrupcao=None):
+        self.max_passos = int(max_passos if max_passos is not None else self.PADRAO['max_passos'])
+        self.max_tempo = float(max_tempo if max_tempo is not None else self.PADRAO['max_tempo'])
+        self.max_celulas = int(max_celulas if max_celulas is not None else self.PADRAO['max_celulas'])
+        self.max_bits = int(max_bits if max_bits is not None else self.PADRAO['max_bits'])
+        self.max_erros = int(max_erros if max_erros is not None else self.PADRAO['max_erros'])
+        self.interrupcao = interrupcao
+        for campo in self.CAMPOS:
+            if getattr(self, campo) <= 0:
+                raise ValueError(f"'{campo}' deve ser positivo.")
+
+    @classmethod
+    def de_dict(cls, dados, teto=None):
+        """
+        Constrói a partir do JSON de uma requisição; campos ausentes usam o padrão e nenhum
+        campo pode passar do 'teto' (outro Orcamento). Valores inválidos geram ValueError.
+        """
+        if dados is None: dados = {}
+        if not isinstance(dados, dict):
+            raise ValueError("'orcamento' deve ser um objeto.")
+        desconhecidos = set(dados) - set(cls.CAMPOS)
+        if desconhecidos:
+            raise ValueError(f"Campos de orçamento desconhecidos: {', '.join(sorted(desconhecidos))}.")
+        for campo, valor in dados.items():
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                raise ValueError(f"Orçamento inválido: '{campo}' deve ser numérico.")
+
+        campos = dict(cls.PADRAO)
+        if teto is not None:
+            campos = {campo: min(valor, getattr(teto, campo)) for campo, valor in campos.items()}
+        campos.update(dados)
+        orcamento = cls(**campos)
+        if teto is not None:
+            for campo in cls.CAMPOS:
+                if getattr(orcamento, campo) > getattr(teto, campo):
+                    raise ValueError(f"Orçamento inválido: '{campo}' acima do máximo permitido ({getattr(teto, campo):g}).")
+        return orcamento
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    def com_interrupcao(self, interrupcao):
+        """ Cópia com os mesmos limites que também para quando 'interrupcao' for ligada """
+        return Orcamento(**self.como_dict(), interrupcao=interrupcao)
+
+    def chave(self):
+        """ Representação estável (entra na chave do cache de resultados) """
+        return ",".join(f"{campo}={getattr(self, campo)!r}" for campo in self.CAMPOS)
+
+    def iniciar(self):
+        return Consumo(self)
+
+class Consumo:
+    """
+    Contadores de uma execução. O caminho quente só compara 'passos' com
+    'proxima_verificacao'; o relógio e o limite de passos são conferidos em verificar(),
+    a cada INTERVALO_RELOGIO passos.
+    """
+    INTERVALO_RELOGIO = 1024
+
+    def __init__(self, orcamento):
+        self.orcamento = orcamento
+        self.passos = 0
+        self.celulas = 0
+        self.inicio = time.perf_counter()
+        self.prazo = self.inicio + orcamento.max_tempo
+        self.proxima_verificacao = min(self.INTERVALO_RELOGIO, orcamento.max_passos + 1)
+        self.interrupcao = orcamento.interrupcao
+
+    def verificar(self, pos=-1):
+        """ Chamado quando passos >= proxima_verificacao """
+        orc = self.orcamento
+        if self.passos > orc.max_passos:
+            raise LimiteExcedido('max_passos', orc.max_passos, self.passos,
+                                 f"Limite de execução excedido: mais de {orc.max_passos} iterações de laço.", pos)
+        if self.interrupcao is not None and self.interrupcao.is_set():
+            raise LimiteExcedido('interrompido', None, self.passos, "Execução interrompida antes do fim.", pos)
+        agora = time.perf_counter()
+        if agora > self.prazo:
+            raise LimiteExcedido('max_tempo', orc.max_tempo, round(agora - self.inicio, 3),
+                                 f"Limite de execução excedido: mais de {orc.max_tempo:g}s de execução.", pos)
+        self.proxima_verificacao = min(self.passos + self.INTERVALO_RELOGIO, orc.max_passos + 1)
+
+    def alocar(self, celulas, pos=-1):
+        orc = self.orcamento
+        if celulas > orc.max_celulas - self.celulas:
+            raise LimiteExcedido('max_celulas', orc.max_celulas, self.celulas + celulas,
+                                 f"Limite de memória excedido: mais de {orc.max_celulas} células de array.", pos)
+        self.celulas += celulas
+
+    def registrar_erro(self, erros, erro, pos=-1):
+        """ Acrescenta 'erro' à lista; passar de max_erros interrompe a execução """
+        erros.append(erro)
+        if len(erros) > self.orcamento.max_erros:
+            raise LimiteExcedido('max_erros', self.orcamento.max_erros, len(erros),
+                                 f"Limite de execução excedido: mais de {self.orcamento.max_erros} erros semânticos.", pos)
+
+    def verificar_operacao(self, op, esq, dir, pos=-1):
+        """
+        Confere, antes de calcular, operações que podem explodir em memória/tempo:
+        '*'/'**' entre inteiros (tamanho em bits) e '+'/'*' que criam arrays.
+        """
+        te, td = type(esq), type(dir)
+        if te is int and td is int:
+            if op == '*':
+                bits = esq.bit_length() + dir.bit_length()
+            elif op == '**' and dir > 0 and esq not in (0, 1, -1):
+                # |esq| >= 2: o resultado tem mais de 'dir' bits; expoentes acima de max_bits são
+                # recusados só com inteiros (dir * log2 estouraria o float)
+                if dir > self.orcamento.max_bits:
+                    bits = dir * (abs(esq).bit_length() - 1) + 1
+                else:
+                    bits = int(dir * math.log2(abs(esq))) + 1
+            else:
+                return
+            if bits > self.orcamento.max_bits:
+                raise LimiteExcedido('max_bits', self.orcamento.max_bits, bits,
+                                     f"Limite de execução excedido: inteiro com mais de {self.orcamento.max_bits} bits.", pos)
+        elif te is Vetor or td is Vetor:
+            if op == '+' and te is Vetor and td is Vetor:
+                self.alocar(len(esq.dados) + len(dir.dados), pos)
+            elif op == '*':
+                vetor, vezes = (esq, dir) if te is Vetor else (dir, esq)
+                if isinstance(vezes, int) and vezes > 0:
+                    self.alocar(len(vetor.dados) * vezes, pos)
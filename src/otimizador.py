@@ -0,0 +1,353 @@
+import math
+import operator
+
+from src.parser_ast import Node, BinOpNode, BlockNode, IfNode, WhileNode, ForNode, NumeroNode, IdNode, ArrayNode, ArrayAccessNode
+from src.parser_ast import (OP_ATRIBUICAO, OP_SOMA, OP_SUB, OP_MULT, OP_DIV, OP_POT, OP_MAIOR, OP_MENOR, OP_MAIOR_IGUAL,
+                            OP_MENOR_IGUAL, OP_IGUAL, OP_DIFERENTE, OP_E, OP_OU)
+
+# Maior inteiro (em bits) que a dobra de constantes grava na árvore; acima disso o cálculo fica para a execução
+_BITS_DOBRA = 1024
+
+_CALCULOS = {OP_SOMA: operator.add, OP_SUB: operator.sub, OP_MULT: operator.mul, OP_DIV: operator.truediv,
+             OP_POT: operator.pow, OP_MAIOR: operator.gt, OP_MENOR: operator.lt, OP_MAIOR_IGUAL: operator.ge,
+             OP_MENOR_IGUAL: operator.le, OP_IGUAL: operator.eq, OP_DIFERENTE: operator.ne}
+_COMPARACOES = frozenset((OP_MAIOR, OP_MENOR, OP_MAIOR_IGUAL, OP_MENOR_IGUAL, OP_IGUAL, OP_DIFERENTE))
+# Operações que nunca geram erro com operandos escalares (candidatas a sair do laço). '*' fica
+# de fora: o orçamento (max_bits) pode recusá-la, e elevada ela rodaria mesmo com o laço vazio
+_ELEVAVEIS = frozenset((OP_SOMA, OP_SUB, OP_E, OP_OU)) | _COMPARACOES
+
+# Tipos possíveis de um valor, como na execução: 'int', 'float', 'bool', 'complex', 'array' e 'none'
+_NUMERICOS = frozenset(('int', 'float'))
+_INTEIROS = frozenset(('int',))
+_ESCALARES = frozenset(('int', 'float', 'bool'))
+
+def _tipo(valor):
+    return {bool: 'bool', int: 'int', float: 'float'}.get(type(valor), 'complex')
+
+def _copiar(node, **campos):
+    """ Cópia rasa do nó com alguns campos trocados (a árvore original pode estar no cache incremental) """
+    novo = object.__new__(type(node))
+    for campo in type(node).__slots__:
+        setattr(novo, campo, campos[campo] if campo in campos else getattr(node, campo))
+    return novo
+
+def _numero(valor, pos):
+    # Negativos entre parênteses: o Gerador emite o texto tal qual e '-2 ** x' seria -(2 ** x) em Python
+    texto = repr(valor)
+    if texto.startswith('-'): texto = f"({texto})"
+    node = NumeroNode(('NUMERO', texto, pos))
+    node.valor = valor
+    return node
+
+def _literal(node, valor):
+    return type(node) is NumeroNode and type(node.valor) is int and node.valor == valor
+
+def _chave(node):
+    """ Forma estrutural de uma expressão elevável (expressões iguais dividem o temporário) """
+    if type(node) is NumeroNode: return (type(node.valor), node.valor)
+    if type(node) is IdNode: return node.nome
+    return (node.opcode, _chave(node.left), _chave(node.right))
+
+def _nomes(arvore):
+    """ Todos os nomes de variáveis e arrays usados no programa """
+    nomes = set()
+    pendentes = [arvore]
+    while pendentes:
+        node = pendentes.pop()
+        if isinstance(node, list):
+            pendentes.extend(node)
+        elif type(node) is IdNode:
+            nomes.add(node.nome)
+        elif isinstance(node, Node):
+            pendentes.extend(v for v in map(node.__getattribute__, node.__slots__) if isinstance(v, (Node, list)))
+    return nomes
+
+def variaveis_atribuidas(node, nomes):
+    """ Variáveis que recebem valor em algum ponto do comando (inclusive em laços internos) """
+    t = type(node)
+    if t is BinOpNode and node.opcode == OP_ATRIBUICAO:
+        if type(node.left) is IdNode: nomes.add(node.left.nome)
+    elif t is BlockNode:
+        for stmt in node.statements: variaveis_atribuidas(stmt, nomes)
+    elif t is IfNode:
+        variaveis_atribuidas(node.true_block, nomes); variaveis_atribuidas(node.false_block, nomes)
+    elif t is WhileNode:
+        variaveis_atribuidas(node.block, nomes)
+    elif t is ForNode:
+        for parte in (node.init, node.increment, node.block): variaveis_atribuidas(parte, nomes)
+    return nomes
+
+def _mapear(node, f):
+    """ Cópia do comando com f aplicada a cada expressão (inclusive nos blocos internos) """
+    t = type(node)
+    if t is BinOpNode:
+        alvo = node.left
+        if type(alvo) is ArrayAccessNode: alvo = _copiar(alvo, indice=f(alvo.indice))
+        return _copiar(node, left=alvo, right=f(node.right))
+    if t is BlockNode:
+        return BlockNode([_mapear(stmt, f) for stmt in node.statements])
+    if t is IfNode:
+        return _copiar(node, condition=f(node.condition), true_block=_mapear(node.true_block, f),
+                       false_block=_mapear(node.false_block, f))
+    if t is WhileNode:
+        return _copiar(node, condition=f(node.condition), block=_mapear(node.block, f))
+    if t is ForNode:
+        return _copiar(node, init=_mapear(node.init, f), condition=f(node.condition),
+                       increment=_mapear(node.increment, f), block=_mapear(node.block, f))
+    return node
+
+def _comandos(node):
+    """ Todos os comandos de atribuição da árvore """
+    t = type(node)
+    if t is BinOpNode: yield node
+    elif t is BlockNode:
+        for stmt in node.statements: yield from _comandos(stmt)
+    elif t is IfNode:
+        yield from _comandos(node.true_block); yield from _comandos(node.false_block)
+    elif t is WhileNode:
+        yield from _comandos(node.block)
+    elif t is ForNode:
+        for parte in (node.init, node.increment, node.block): yield from _comandos(parte)
+
+class TiposInferidos:
+    """
+    Inferência de tipos insensível ao fluxo: cada variável recebe a união dos tipos de
+    todas as expressões atribuídas a ela no programa (ponto fixo); os elementos de todos
+    os arrays dividem um único conjunto. Ler variável/elemento inexistente resulta em 0.
+    Com semantica_python, 'x e y' / 'x ou y' resultam num dos operandos, como no Python gerado.
+    """
+    def __init__(self, arvore, semantica_python=False):
+        self.semantica_python = semantica_python
+        self.variaveis = {}
+        self.elementos = set()
+        atribuicoes = list(_comandos(arvore))
+        mudou = True
+        while mudou:
+            mudou = False
+            for node in atribuicoes:
+                tipos = self.de(node.right)
+                destino = self.variaveis.setdefault(node.left.nome, set()) if type(node.left) is IdNode else self.elementos
+                if not tipos <= destino:
+                    destino |= tipos; mudou = True
+
+    def de(self, node):
+        t = type(node)
+        if t is NumeroNode: return {_tipo(node.valor)}
+        if t is IdNode: return self.variaveis.get(node.nome, set()) | _INTEIROS
+        if t is ArrayNode: return {'array'}
+        if t is ArrayAccessNode: return self.elementos | _INTEIROS
+        if t is not BinOpNode: return {'none'}
+
+        op = node.opcode
+        if op == OP_E or op == OP_OU:
+            return self.de(node.left) | self.de(node.right) if self.semantica_python else {'bool'}
+        if op in _COMPARACOES: return {'bool', 'int'}
+        operandos = self.de(node.left) | self.de(node.right)
+        # Erros e operandos ausentes resultam em 0
+        tipos = {'int'}
+        if 'array' in operandos: tipos.add('array')
+        if op == OP_DIV or op == OP_POT or 'float' in operandos or 'complex' in operandos: tipos.add('float')
+        if (op == OP_POT and 'float' in operandos) or 'complex' in operandos: tipos.add('complex')
+        return tipos
+
+class Otimizador:
+    """
+    Passo de otimização entre o ParserAST e os back-ends. Devolve uma árvore nova (a de
+    entrada não é alterada) com o mesmo comportamento observável:
+      - dobra de constantes: '2 ** 10 * 3' vira 3072; '0 e x' vira False. Divisões por zero,
+        operações que dariam erro e inteiros acima de max_bits ficam para a execução;
+      - identidades 'x * 1', 'x ** 1' (x int ou float), 'x + 0' e 'x - 0' (x int), com os
+        tipos inferidos para o programa inteiro;
+      - elevação de invariantes: expressões sem erro possível, cujas variáveis já têm valor
+        antes do laço e não mudam dentro dele, são calculadas uma vez em temporários antes
+        do 'enquanto'/'para'. Os temporários não fazem parte do programa: ocultar() os tira
+        da tabela de símbolos depois da execução.
+    """
+    def __init__(self, max_bits=None):
+        self.max_bits = min(_BITS_DOBRA, max_bits or _BITS_DOBRA)
+        self.temporarios = []
+        self.dobradas = 0
+        self.simplificadas = 0
+
+    def otimizar(self, arvore):
+        self.temporarios = []
+        self.dobradas = self.simplificadas = 0
+        try:
+            otimizada = _mapear(arvore, self._dobrar)
+            self.tipos = TiposInferidos(otimizada)
+            otimizada = _mapear(otimizada, self._simplificar)
+            nomes = _nomes(otimizada)
+            self._prefixo = "_inv"
+            while any(nome.startswith(self._prefixo) for nome in nomes):
+                self._prefixo = "_" + self._prefixo
+            return BlockNode(self._elevar_bloco(otimizada.statements, set()))
+        except RecursionError:
+            # Expressões profundas demais para este passo: executa a árvore original
+            self.temporarios = []
+            self.dobradas = self.simplificadas = 0
+            return arvore
+
+    def ocultar(self, tabela):
+        for nome in self.temporarios: tabela.remover(nome)
+
+    def estatisticas(self):
+        return {'dobradas': self.dobradas, 'simplificadas': self.simplificadas, 'elevadas': len(self.temporarios)}
+
+    # --- Dobra de constantes ---
+
+    def _dobrar(self, node):
+        t = type(node)
+        if t is ArrayNode: return _copiar(node, tamanho=self._dobrar(node.tamanho))
+        if t is ArrayAccessNode: return _copiar(node, indice=self._dobrar(node.indice))
+        if t is not BinOpNode: return node
+
+        esq = self._dobrar(node.left)
+        op = node.opcode
+        if type(esq) is NumeroNode and (op == OP_E and not esq.valor or op == OP_OU and esq.valor):
+            # Curto-circuito: o lado direito nunca é avaliado
+            self.dobradas += 1
+            return _numero(op == OP_OU, node.pos)
+        dir = self._dobrar(node.right)
+        if type(esq) is NumeroNode and type(dir) is NumeroNode:
+            valor = self._calcular(op, esq.valor, dir.valor)
+            if valor is not None:
+                self.dobradas += 1
+                return _numero(valor, node.pos)
+        if esq is node.left and dir is node.right: return node
+        return _copiar(node, left=esq, right=dir)
+
+    def _calcular(self, op, esq, dir):
+        """ Valor da operação entre constantes, ou None quando ela deve ficar para a execução """
+        if op == OP_E or op == OP_OU: return bool(dir)  # o lado esquerdo já decidiu o curto-circuito
+        if op == OP_DIV and dir == 0: return None
+        if type(esq) is int and type(dir) is int:
+            # Mesma estimativa do Orcamento: não calcula nada que a execução recusaria
+            if op == OP_MULT and esq.bit_length() + dir.bit_length() > self.max_bits: return None
+            if op == OP_POT and dir > 0 and esq not in (0, 1, -1) and (dir > self.max_bits or dir * math.log2(abs(esq)) + 1 > self.max_bits): return None
+        try:
+            valor = _CALCULOS[op](esq, dir)
+        except Exception:
+            return None
+        if _tipo(valor) == 'complex': return None
+        if type(valor) is float and not math.isfinite(valor): return None
+        if type(valor) is int and valor.bit_length() > self.max_bits: return None
+        return valor
+
+    # --- Identidades ---
+
+    def _simplificar(self, node):
+        t = type(node)
+        if t is ArrayNode: return _copiar(node, tamanho=self._simplificar(node.tamanho))
+        if t is ArrayAccessNode: return _copiar(node, indice=self._simplificar(node.indice))
+        if t is not BinOpNode: return node
+
+        esq, dir = self._simplificar(node.left), self._simplificar(node.right)
+        op = node.opcode
+        resultado = None
+        if op == OP_MULT:
+            if _literal(dir, 1) and self.tipos.de(esq) <= _NUMERICOS: resultado = esq
+            elif _literal(esq, 1) and self.tipos.de(dir) <= _NUMERICOS: resultado = dir
+        elif op == OP_POT:
+            if _literal(dir, 1) and self.tipos.de(esq) <= _NUMERICOS: resultado = esq
+        elif op == OP_SOMA:
+            # 'x + 0' só para inteiros: com float, -0.0 + 0 resulta em 0.0
+            if _literal(dir, 0) and self.tipos.de(esq) <= _INTEIROS: resultado = esq
+            elif _literal(esq, 0) and self.tipos.de(dir) <= _INTEIROS: resultado = dir
+        elif op == OP_SUB:
+            if _literal(dir, 0) and self.tipos.de(esq) <= _INTEIROS: resultado = esq
+        if resultado is not None:
+            self.simplificadas += 1
+            return resultado
+        if esq is node.left and dir is node.right: return node
+        return _copiar(node, left=esq, right=dir)
+
+    # --- Elevação de invariantes de laço ---
+
+    def _elevar_bloco(self, comandos, definidas):
+        """
+        'definidas': variáveis com valor garantido neste ponto (atribuídas antes, no mesmo
+        bloco ou num bloco externo); o conjunto é atualizado na ordem dos comandos.
+        """
+        novos = []
+        for stmt in comandos:
+            t = type(stmt)
+            if t is WhileNode or t is ForNode:
+                invariantes = {}
+                laco = self._elevar_laco(stmt, definidas, invariantes)
+                for nome, expr in invariantes.values():
+                    novos.append(BinOpNode(IdNode(('ID', nome, expr.pos)), ('ATRIBUICAO', '=', expr.pos), expr))
+                    definidas.add(nome)
+                novos.append(laco)
+                if t is ForNode and type(stmt.init) is BinOpNode and type(stmt.init.left) is IdNode:
+                    definidas.add(stmt.init.left.nome)
+            elif t is IfNode:
+                novos.append(_copiar(stmt, true_block=self._elevar_sub(stmt.true_block, set(definidas)),
+                                     false_block=self._elevar_sub(stmt.false_block, set(definidas))))
+            else:
+                novos.append(stmt)
+                if t is BinOpNode and type(stmt.left) is IdNode: definidas.add(stmt.left.nome)
+        return novos
+
+    def _elevar_sub(self, bloco, definidas):
+        if type(bloco) is not BlockNode: return bloco
+        return BlockNode(self._elevar_bloco(bloco.statements, definidas))
+
+    def _elevar_laco(self, laco, definidas, invariantes):
+        atribuidas = variaveis_atribuidas(laco, set())
+
+        def trocar(node):
+            t = type(node)
+            if t is BinOpNode:
+                if self._invariante(node, definidas, atribuidas):
+                    chave = _chave(node)
+                    if chave not in invariantes:
+                        nome = f"{self._prefixo}{len(self.temporarios)}"
+                        self.temporarios.append(nome)
+                        self.tipos.variaveis[nome] = self.tipos.de(node)
+                        invariantes[chave] = (nome, node)
+                    return IdNode(('ID', invariantes[chave][0], node.pos))
+                esq, dir = trocar(node.left), trocar(node.right)
+                if esq is node.left and dir is node.right: return node
+                return _copiar(node, left=esq, right=dir)
+            if t is ArrayNode: return _copiar(node, tamanho=trocar(node.tamanho))
+            if t is ArrayAccessNode: return _copiar(node, indice=trocar(node.indice))
+            return node
+
+        # O 'init' do próprio 'para' roda uma vez só: fica como está
+        novo = _mapear(_copiar(laco, init=None) if type(laco) is ForNode else laco, trocar)
+        if type(laco) is ForNode: novo.init = laco.init
+        # Dentro do corpo valem também os temporários e a variável do 'para'; laços internos
+        # podem elevar o que é invariante só para eles
+        internas = definidas | {nome for nome, _ in invariantes.values()}
+        if type(laco) is ForNode and type(laco.init) is BinOpNode and type(laco.init.left) is IdNode:
+            internas.add(laco.init.left.nome)
+        novo.block = self._elevar_sub(novo.block, internas)
+        return novo
+
+    def _invariante(self, node, definidas, atribuidas):
+        """ Expressão sem erro possível, só com constantes e variáveis fixas durante o laço """
+        tem_variavel = False
+        tem_float = False
+        variavel_inteira = False
+        pendentes = [node]
+        while pendentes:
+            n = pendentes.pop()
+            t = type(n)
+            if t is BinOpNode:
+                if n.opcode not in _ELEVAVEIS: return False
+                pendentes += (n.left, n.right)
+            elif t is IdNode:
+                if n.nome not in definidas or n.nome in atribuidas: return False
+                # Já tem valor: o 0 de "variável não definida" não entra
+                tipos = self.tipos.variaveis.get(n.nome, set())
+                if not tipos or not tipos <= _ESCALARES: return False
+                tem_variavel = True
+                tem_float = tem_float or 'float' in tipos
+                variavel_inteira = variavel_inteira or 'int' in tipos
+            elif t is NumeroNode:
+                if type(n.valor) is float: tem_float = True
+                elif type(n.valor) is int and abs(n.valor) >= 2 ** 53: variavel_inteira = True
+            else:
+                return False
+        # Inteiro enorme convertido para float estoura (OverflowError): não mistura os dois
+        return tem_variavel and not (tem_float and variavel_inteira)
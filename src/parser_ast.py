@@ -1,88 +1,149 @@
+from src.util import executar_pilha
+
+# --- Códigos dos operadores binários (BinOpNode.opcode) ---
+OP_ATRIBUICAO, OP_SOMA, OP_SUB, OP_MULT, OP_DIV, OP_POT, OP_MAIOR, OP_MENOR, OP_MAIOR_IGUAL, OP_MENOR_IGUAL, \
+    OP_IGUAL, OP_DIFERENTE, OP_E, OP_OU = range(14)
+# opcode -> símbolo e opcode -> tipo do token de origem
+SIMBOLOS_OP = ('=', '+', '-', '*', '/', '**', '>', '<', '>=', '<=', '==', '!=', 'e', 'ou')
+TIPOS_OP = ('ATRIBUICAO', 'SOMA', 'SUB', 'MULT', 'DIV', 'POTENCIA', 'MAIOR', 'MENOR', 'MAIOR_IGUAL', 'MENOR_IGUAL',
+            'IGUAL', 'DIFERENTE', 'E', 'OU')
+OPCODES = {simbolo: opcode for opcode, simbolo in enumerate(SIMBOLOS_OP)}
+
+def valor_literal(texto):
+    """ Valor numérico de um literal (convertido uma vez, no parser) """
+    try:
+        if '.' in texto:
+            return float(texto)
+        return int(texto)
+    except:
+        return 0
+
 # --- Nós da Árvore (Com Posição) ---
+# Nós com __slots__ (sem __dict__ por instância). CAMPOS lista os atributos na ordem
+# exibida por ast_para_string; nomes fixos ('Bloco', 'Se'...) ficam na classe.
 class Node: 
+    __slots__ = ()
+    CAMPOS = ()
     pos = 0
 
 class BlockNode(Node):
+    __slots__ = ('statements',)
+    CAMPOS = ('statements', 'nome')
+    nome = "Bloco"
     def __init__(self, statements):
         self.statements = statements
-        self.nome = "Bloco"
 
 class IfNode(Node):
+    __slots__ = ('condition', 'true_block', 'false_block', 'pos')
+    CAMPOS = ('condition', 'true_block', 'false_block', 'nome', 'pos')
+    nome = "Se"
     def __init__(self, condition, true_block, false_block=None, pos=0):
         self.condition = condition
         self.true_block = true_block
         self.false_block = false_block
-        self.nome = "Se"
         self.pos = pos
 
 class WhileNode(Node):
+    __slots__ = ('condition', 'block', 'pos')
+    CAMPOS = ('condition', 'block', 'nome', 'pos')
+    nome = "Enquanto"
     def __init__(self, condition, block, pos=0):
         self.condition = condition
         self.block = block
-        self.nome = "Enquanto"
         self.pos = pos
 
 class ForNode(Node):
+    __slots__ = ('init', 'condition', 'increment', 'block', 'pos')
+    CAMPOS = ('init', 'condition', 'increment', 'block', 'nome', 'pos')
+    nome = "Para"
     def __init__(self, init, condition, increment, block, pos=0):
         self.init = init
         self.condition = condition
         self.increment = increment
         self.block = block
-        self.nome = "Para"
         self.pos = pos
 
 class BinOpNode(Node):
+    __slots__ = ('left', 'opcode', 'right', 'pos')
+    CAMPOS = ('left', 'op', 'right', 'pos')
     def __init__(self, left, op, right):
+        # 'op' é o token do operador; guarda só o código e a posição
         self.left = left
-        self.op = op
+        self.opcode = OPCODES[op[1]]
         self.right = right
         # Tenta pegar a posição do operador (índice 2 da tupla)
         self.pos = op[2] if len(op) > 2 else left.pos
 
+    @property
+    def op(self):
+        """ Token equivalente ao original (tipo, símbolo, posição) """
+        return (TIPOS_OP[self.opcode], SIMBOLOS_OP[self.opcode], self.pos)
+
 class NumeroNode(Node):
+    __slots__ = ('valor', 'texto', 'pos')
+    CAMPOS = ('valor', 'pos')
     def __init__(self, token):
-        self.valor = token[1]
+        self.texto = token[1]
+        self.valor = valor_literal(token[1])
         self.pos = token[2]
 
 class IdNode(Node):
+    __slots__ = ('nome', 'pos')
+    CAMPOS = ('nome', 'pos')
     def __init__(self, token):
         self.nome = token[1]
         self.pos = token[2]
 
 # --- CORREÇÃO AQUI: Adicionado self.pos ---
 class ArrayNode(Node):
+    __slots__ = ('tamanho', 'pos')
+    CAMPOS = ('tamanho', 'nome', 'pos')
+    nome = "CriarArray"
     def __init__(self, tamanho_expr, pos=0):
         self.tamanho = tamanho_expr
-        self.nome = "CriarArray"
         self.pos = pos
 
 class ArrayAccessNode(Node):
+    __slots__ = ('array', 'indice', 'pos')
+    CAMPOS = ('array', 'indice', 'nome', 'pos')
     def __init__(self, id_node, indice_expr):
         self.array = id_node
         self.indice = indice_expr
-        self.nome = f"{id_node.nome}[...]"
         # Herda a posição do ID (ex: em 'lista[0]', pega a posição de 'lista')
         self.pos = id_node.pos 
 
+    @property
+    def nome(self):
+        return f"{self.array.nome}[...]"
+
 class CommentNode(Node):
+    __slots__ = ('texto',)
+    CAMPOS = ('texto', 'nome')
+    nome = "Comentario"
     def __init__(self, texto):
         self.texto = texto
-        self.nome = "Comentario"
 
 # --- Parser ---
+# Precedência dos operadores binários (maior liga mais forte; todos associativos à esquerda)
+_PRECEDENCIA = {'E': 1, 'OU': 1,
+                'MAIOR': 2, 'MENOR': 2, 'IGUAL': 2, 'DIFERENTE': 2, 'MAIOR_IGUAL': 2, 'MENOR_IGUAL': 2,
+                'SOMA': 3, 'SUB': 3, 'MULT': 4, 'DIV': 4, 'POTENCIA': 5}
+# Grupos abertos numa expressão: '(' ... ')', 'id[' ... ']' e '[' ... ']'
+_GRUPO_PARENTESES, _GRUPO_ACESSO, _GRUPO_ARRAY = range(3)
+
 class ParserAST:
     def __init__(self, tokens):
+        # 'tokens' pode ser uma lista ou um gerador (ex.: Lexico.iter_tokens()),
+        # o parser só olha um token à frente e os consome sob demanda
         self.tokens = tokens
+        self._fluxo = iter(tokens)
         self.pos = 0
-        self.token_atual = self.tokens[self.pos] if self.tokens else None
+        self.token_atual = next(self._fluxo, None)
         self.erros = [] 
 
     def proximo_token(self):
         self.pos += 1
-        if self.pos < len(self.tokens):
-            self.token_atual = self.tokens[self.pos]
-        else:
-            self.token_atual = None
+        self.token_atual = next(self._fluxo, None)
 
     def consumir(self, tipo_esperado):
         if self.token_atual and self.token_atual[0] == tipo_esperado:
@@ -95,91 +156,87 @@ class ParserAST:
             return False
 
     # --- Expressões ---
-    
-    def fator(self):
-        token = self.token_atual
-        if not token: return None
-        
-        if token[0] == 'NUMERO':
-            self.consumir('NUMERO')
-            return NumeroNode(token)
-        
-        elif token[0] == 'ID':
-            id_node = IdNode(token)
-            self.consumir('ID')
-            
-            if self.token_atual and self.token_atual[0] == 'LBRACKET':
-                self.consumir('LBRACKET')
-                indice = self.expressao_logica()
-                self.consumir('RBRACKET')
-                # Agora ArrayAccessNode recebe o id_node que tem a posição correta
-                return ArrayAccessNode(id_node, indice)
-            
-            return id_node
-            
-        elif token[0] == 'LPAREN':
-            self.consumir('LPAREN')
-            node = self.expressao_logica()
-            self.consumir('RPAREN')
-            return node
-            
-        elif token[0] == 'LBRACKET':
-            # Captura a posição do '['
-            posicao = token[2] 
-            self.consumir('LBRACKET')
-            tamanho = self.expressao_logica()
-            self.consumir('RBRACKET')
-            return ArrayNode(tamanho, posicao)
-            
-        return None
-
-    def expressao_potencia(self):
-        node = self.fator()
-        while self.token_atual and self.token_atual[0] == 'POTENCIA':
-            op = self.token_atual
-            self.consumir('POTENCIA')
-            node = BinOpNode(node, op, self.fator())
-        return node
-
-    def termo(self):
-        node = self.expressao_potencia()
-        while self.token_atual and self.token_atual[0] in ('MULT', 'DIV'):
-            op = self.token_atual
-            self.consumir(op[0])
-            node = BinOpNode(node, op, self.expressao_potencia())
-        return node
-
-    def expressao_aritmetica(self):
-        node = self.termo()
-        while self.token_atual and self.token_atual[0] in ('SOMA', 'SUB'):
-            op = self.token_atual
-            self.consumir(op[0])
-            node = BinOpNode(node, op, self.termo())
-        return node
-
-    def expressao_comparacao(self):
-        node = self.expressao_aritmetica()
-        while self.token_atual and self.token_atual[0] in ('MAIOR', 'MENOR', 'IGUAL', 'DIFERENTE', 'MAIOR_IGUAL', 'MENOR_IGUAL'):
-            op = self.token_atual
-            self.consumir(op[0])
-            node = BinOpNode(node, op, self.expressao_aritmetica())
-        return node
 
     def expressao_logica(self):
-        node = self.expressao_comparacao()
-        while self.token_atual and self.token_atual[0] in ('E', 'OU'):
-            op = self.token_atual
-            self.consumir(op[0])
-            node = BinOpNode(node, op, self.expressao_comparacao())
-        return node
+        """
+        Expressão completa por precedência de operadores, com pilhas explícitas. Equivale à
+        descida recursiva fator -> potência -> termo -> aritmética -> comparação -> lógica
+        (todos os níveis associativos à esquerda), mas parênteses e colchetes aninhados
+        abrem grupos na pilha em vez de chamadas: a profundidade só é limitada pela memória.
+        """
+        operandos = []
+        operadores = []    # tokens de operador (None marca o início de um grupo)
+        precedencias = []  # precedência de cada item de 'operadores' (0 no início de grupo)
+        grupos = []        # (tipo, dado) de cada '(' / 'id[' / '[' aberto
+        fluxo = self._fluxo
+        token = self.token_atual
+        while True:
+            # Operando (fator); um token que não começa um fator vale None e não é consumido
+            tipo = token[0] if token else None
+            if tipo == 'NUMERO' or tipo == 'ID':
+                self.pos += 1
+                proximo = self.token_atual = next(fluxo, None)
+                if tipo == 'NUMERO':
+                    operandos.append(NumeroNode(token))
+                elif proximo and proximo[0] == 'LBRACKET':
+                    grupos.append((_GRUPO_ACESSO, IdNode(token)))
+                    operadores.append(None); precedencias.append(0)
+                    self.pos += 1
+                    token = self.token_atual = next(fluxo, None)
+                    continue
+                else:
+                    operandos.append(IdNode(token))
+                token = proximo
+            elif tipo == 'LPAREN' or tipo == 'LBRACKET':
+                # Array guarda a posição do '['
+                grupos.append((_GRUPO_PARENTESES, None) if tipo == 'LPAREN' else (_GRUPO_ARRAY, token[2]))
+                operadores.append(None); precedencias.append(0)
+                self.pos += 1
+                token = self.token_atual = next(fluxo, None)
+                continue
+            else:
+                operandos.append(None)
+
+            # Operadores depois do operando; sem operador, fecha o grupo aberto (ou termina)
+            while True:
+                precedencia = _PRECEDENCIA.get(token[0]) if token else None
+                if precedencia is not None:
+                    while precedencias and precedencias[-1] >= precedencia:
+                        precedencias.pop()
+                        direita = operandos.pop()
+                        operandos[-1] = BinOpNode(operandos[-1], operadores.pop(), direita)
+                    operadores.append(token); precedencias.append(precedencia)
+                    self.pos += 1
+                    token = self.token_atual = next(fluxo, None)
+                    break
+                while precedencias and precedencias[-1]:
+                    precedencias.pop()
+                    direita = operandos.pop()
+                    operandos[-1] = BinOpNode(operandos[-1], operadores.pop(), direita)
+                if not grupos:
+                    return operandos.pop()
+                operadores.pop(); precedencias.pop()
+                tipo_grupo, dado = grupos.pop()
+                if tipo_grupo == _GRUPO_PARENTESES:
+                    self.consumir('RPAREN')
+                else:
+                    self.consumir('RBRACKET')
+                    # ArrayAccessNode recebe o id_node, que tem a posição correta
+                    interno = operandos[-1]
+                    operandos[-1] = ArrayAccessNode(dado, interno) if tipo_grupo == _GRUPO_ACESSO else ArrayNode(interno, dado)
+                token = self.token_atual
 
     # --- Comandos ---
+    # Blocos aninhados também não usam a pilha do Python: _bloco e os comandos compostos
+    # (_declaracao_se/enquanto/para) são geradores e cada 'yield' é uma chamada executada
+    # por executar_pilha.
 
-    def bloco(self):
+    def _bloco(self):
         if not self.consumir('LBRACE'): return None
         comandos = []
         while self.token_atual and self.token_atual[0] != 'RBRACE':
-            cmd = self.declaracao()
+            composto = _COMPOSTOS.get(self.token_atual[0])
+            cmd = (yield composto(self)) if composto else self.declaracao_simples()
             if cmd:
                 comandos.append(cmd)
             if not cmd and self.token_atual[0] != 'RBRACE':
@@ -187,25 +244,25 @@ class ParserAST:
         self.consumir('RBRACE')
         return BlockNode(comandos)
 
-    def declaracao_se(self):
+    def _declaracao_se(self):
         pos = self.token_atual[2]
         self.consumir('SE')
         cond = self.expressao_logica()
         self.consumir('ENTAO')
-        true_b = self.bloco()
+        true_b = yield self._bloco()
         false_b = None
         if self.token_atual and self.token_atual[0] == 'SENAO':
             self.consumir('SENAO')
-            false_b = self.bloco()
+            false_b = yield self._bloco()
         return IfNode(cond, true_b, false_b, pos)
 
-    def declaracao_enquanto(self):
+    def _declaracao_enquanto(self):
         pos = self.token_atual[2]
         self.consumir('ENQUANTO')
         cond = self.expressao_logica()
-        return WhileNode(cond, self.bloco(), pos)
+        return WhileNode(cond, (yield self._bloco()), pos)
 
-    def declaracao_para(self):
+    def _declaracao_para(self):
         pos = self.token_atual[2]
         self.consumir('PARA')
         self.consumir('LPAREN')
@@ -214,7 +271,7 @@ class ParserAST:
         self.consumir('FIM')
         inc = self.declaracao_atribuicao(False)
         self.consumir('RPAREN')
-        return ForNode(init, cond, inc, self.bloco(), pos)
+        return ForNode(init, cond, inc, (yield self._bloco()), pos)
 
     def declaracao_atribuicao(self, consome_fim=True):
         if self.token_atual[0] != 'ID': return None
@@ -242,21 +299,21 @@ class ParserAST:
             
         return BinOpNode(var_node, op, expr)
 
-    def declaracao(self):
-        if not self.token_atual: return None
+    def declaracao_simples(self):
+        """ Comentário ou atribuição: comandos sem bloco, que dispensam o gerador """
         t = self.token_atual[0]
-        
+        if t == 'ID': return self.declaracao_atribuicao()
         if t == 'COMENTARIO':
             texto = self.token_atual[1]
             self.proximo_token()
             return CommentNode(texto)
-        elif t == 'SE': return self.declaracao_se()
-        elif t == 'ENQUANTO': return self.declaracao_enquanto()
-        elif t == 'PARA': return self.declaracao_para()
-        elif t == 'ID': return self.declaracao_atribuicao()
-        
         return None
 
+    def declaracao(self):
+        if not self.token_atual: return None
+        composto = _COMPOSTOS.get(self.token_atual[0])
+        return executar_pilha(composto(self)) if composto else self.declaracao_simples()
+
     def analisar(self):
         comandos = []
         self.erros = []
@@ -271,4 +328,7 @@ class ParserAST:
             except Exception as e:
                 self.erros.append(str(e))
                 break
-        return [BlockNode(comandos)], self.erros
\ No newline at end of file
+        return [BlockNode(comandos)], self.erros
+
+# Comandos com bloco: geradores executados por executar_pilha
+_COMPOSTOS = {'SE': ParserAST._declaracao_se, 'ENQUANTO': ParserAST._declaracao_enquanto, 'PARA': ParserAST._declaracao_para}
@@ -1,73 +1,200 @@
-from src.parser_ast import BinOpNode, BlockNode, IfNode, WhileNode, ForNode, NumeroNode, IdNode, ArrayNode, ArrayAccessNode, CommentNode
+import operator
+
+from src.parser_ast import Node, BinOpNode, BlockNode, IfNode, WhileNode, ForNode, NumeroNode, IdNode, ArrayNode, ArrayAccessNode, CommentNode
+from src.parser_ast import OP_ATRIBUICAO, OP_SOMA, OP_MULT, OP_DIV, OP_POT, OP_E, OP_OU, SIMBOLOS_OP
+from src.util import MapaFonte
+from src.orcamento import Orcamento, LimiteExcedido
+from src.vetor import Vetor
+from src.vetorizacao import np, plano_para, executar_plano
+
+def tipo_do_valor(valor):
+    """ Tipo exibido na tabela de símbolos para um valor em tempo de execução """
+    if isinstance(valor, Vetor): return 'array'
+    if isinstance(valor, float): return 'float'
+    if isinstance(valor, bool): return 'boolean'
+    return 'int'
+
+# Maior inteiro exibido por extenso na tabela (limite padrão de conversão int -> str do Python)
+_BITS_EXIBICAO = 14000
+# Arrays aninhados além desta profundidade aparecem como [...] (str() estouraria a recursão)
+_PROFUNDIDADE_EXIBICAO = 100
+
+def _texto_valor(valor, ativos=None):
+    """ Igual a str(valor) para os valores da linguagem, mas sem falhar com inteiros enormes ou arrays muito aninhados """
+    if isinstance(valor, Vetor):
+        ativos = ativos if ativos is not None else []
+        if len(ativos) >= _PROFUNDIDADE_EXIBICAO or any(valor is a for a in ativos): return "[...]"
+        ativos.append(valor)
+        texto = "[" + ", ".join(_texto_valor(item, ativos) for item in valor.dados) + "]"
+        ativos.pop()
+        return texto
+    if isinstance(valor, int) and not isinstance(valor, bool) and valor.bit_length() > _BITS_EXIBICAO:
+        return f"<inteiro de {valor.bit_length()} bits>"
+    return str(valor)
 
 class TabelaSimbolos:
+    """
+    Variáveis em listas paralelas indexadas por slot: valores e tipos (None = não definida).
+    Cada nome recebe um slot fixo no passo de resolução (resolver_slots) ou na primeira
+    referência pelo nome ('slots' leva o nome ao índice);
+    'ordem' guarda os slots na ordem da primeira definição, que é a ordem da impressão.
+    """
     def __init__(self):
-        self.simbolos = {} 
+        self.nomes = []
+        self.slots = {}
+        self.valores = []
+        self.tipos = []
+        self.ordem = []
+
+    def slot(self, nome):
+        slot = self.slots.get(nome)
+        if slot is None:
+            slot = self.slots[nome] = len(self.nomes)
+            self.nomes.append(nome)
+            self.valores.append(None)
+            self.tipos.append(None)
+        return slot
 
     def definir(self, nome, tipo, valor=None):
-        self.simbolos[nome] = {'tipo': tipo, 'valor': valor}
+        self.definir_slot(self.slot(nome), tipo, valor)
+
+    def definir_slot(self, slot, tipo, valor=None):
+        if self.tipos[slot] is None: self.ordem.append(slot)
+        self.tipos[slot] = tipo
+        self.valores[slot] = valor
 
     def obter(self, nome):
-        return self.simbolos.get(nome)
+        slot = self.slots.get(nome)
+        if slot is None or self.tipos[slot] is None: return None
+        return {'tipo': self.tipos[slot], 'valor': self.valores[slot]}
 
-    def imprimir(self):
-        print(f"{'NOME':<15} | {'TIPO':<10} | {'VALOR'}")
-        print("-" * 45)
-        for nome, dados in self.simbolos.items():
-            val = dados['valor']
-            valor_str = str(val)
+    def remover(self, nome):
+        slot = self.slots.get(nome)
+        if slot is None or self.tipos[slot] is None: return
+        self.ordem.remove(slot)
+        self.tipos[slot] = self.valores[slot] = None
+
+    def formatar(self):
+        linhas = [f"{'NOME':<15} | {'TIPO':<10} | {'VALOR'}", "-" * 45]
+        for slot in self.ordem:
+            nome, val = self.nomes[slot], self.valores[slot]
             
-            if isinstance(val, list):
-                if len(val) > 5:
-                    valor_str = str(val[:4])[:-1] + ", ...]"
-                else:
-                    valor_str = str(val)
+            if isinstance(val, Vetor) and len(val.dados) > 5:
+                valor_str = _texto_valor(Vetor(val.dados[:4]))[:-1] + ", ...]"
             elif isinstance(val, float) and val.is_integer():
                 valor_str = str(int(val))
+            else:
+                valor_str = _texto_valor(val)
             
-            print(f"{nome:<15} | {dados['tipo']:<10} | {valor_str}")
+            linhas.append(f"{nome:<15} | {self.tipos[slot]:<10} | {valor_str}")
+        return "\n".join(linhas) + "\n"
+
+    def imprimir(self):
+        print(self.formatar(), end="")
+
+def resolver_slots(arvore, tabela):
+    """
+    Passo de resolução, antes da execução: dá a cada IdNode da árvore o slot do nome dele na
+    'tabela' e devolve {IdNode: slot} (chave por identidade). Os nós são compartilhados (cache incremental, outras
+    threads) e não guardam o slot; a tabela lateral vale para esta execução. Pilha explícita,
+    como no parser, para aninhamentos profundos.
+    """
+    slot_de = {}
+    pendentes = [arvore]
+    while pendentes:
+        node = pendentes.pop()
+        if type(node) is IdNode:
+            slot_de[node] = tabela.slot(node.nome)
+            continue
+        for campo in node.CAMPOS:
+            filho = getattr(node, campo, None)
+            if isinstance(filho, Node): pendentes.append(filho)
+            elif type(filho) is list: pendentes += [item for item in filho if isinstance(item, Node)]
+    return slot_de
+
+# opcode -> operação (None: tratados à parte em visitar_BinOpNode)
+_OPERACOES = (None, operator.add, operator.sub, operator.mul, operator.truediv, operator.pow, operator.gt, operator.lt,
+              operator.ge, operator.le, operator.eq, operator.ne, None, None)
+# Operações conferidas pelo orçamento antes de calcular (bits de inteiros / células de arrays)
+_VERIFICADAS = frozenset((OP_SOMA, OP_MULT, OP_POT))
+
+class _Despacho(dict):
+    """ Tipo do nó -> método visitar_<Tipo> do visitante, resolvido uma vez por tipo """
+    def __init__(self, visitante):
+        super().__init__()
+        self.visitante = visitante
+
+    def __missing__(self, tipo):
+        metodo = getattr(self.visitante, f'visitar_{tipo.__name__}', self.visitante.visitar_generico)
+        self[tipo] = metodo
+        return metodo
 
 class Semantico:
-    def __init__(self, arvore, codigo_fonte=""):
+    def __init__(self, arvore, codigo_fonte="", mapa=None, orcamento=None):
         self.arvore = arvore
+        self._despacho = _Despacho(self)
+        self._planos = {}  # ForNode -> PlanoVetorial (ou None), ver src/vetorizacao.py
         self.tabela = TabelaSimbolos()
         self.erros = []
-        self.loop_counter = 0
-        self.linhas = codigo_fonte.split('\n')
+        self.limites_excedidos = []
+        self.mapa = mapa or MapaFonte(codigo_fonte)
+        self.orcamento = orcamento or Orcamento()
+        self.consumo = self.orcamento.iniciar()
 
     # Método para desenhar a setinha no erro (Igual ao Lexico)
     def _formatar_erro(self, pos, msg):
-        if pos < 0: return f"Erro Semântico: {msg}"
+        if not self.mapa.contem(pos): return f"Erro Semântico: {msg}"
         
         COR = "\033[31m"
         RESET = "\033[0m"
-        contador = 0
         
-        for num_linha, conteudo in enumerate(self.linhas, start=1):
-            if contador + len(conteudo) + 1 > pos:
-                coluna = max(0, min(pos - contador, len(conteudo)))
-                
-                linha_cor = conteudo[:coluna] + f"{COR}{conteudo[coluna:coluna+1] or ' '}{RESET}" + conteudo[coluna+1:]
-                underline = " " * coluna + f"{COR}^{RESET}"
-                
-                return f"Erro Semântico na linha {num_linha}: {msg}\n    {linha_cor}\n    {underline}"
-            
-            contador += len(conteudo) + 1
-        return f"Erro Semântico: {msg}"
+        num_linha, coluna = self.mapa.localizar(pos)
+        conteudo = self.mapa.linha(num_linha)
+        coluna = max(0, min(coluna, len(conteudo)))
+        
+        linha_cor = conteudo[:coluna] + f"{COR}{conteudo[coluna:coluna+1] or ' '}{RESET}" + conteudo[coluna+1:]
+        underline = " " * coluna + f"{COR}^{RESET}"
+        
+        return f"Erro Semântico na linha {num_linha}: {msg}\n    {linha_cor}\n    {underline}"
+
+    def _erro(self, pos, msg):
+        self.consumo.registrar_erro(self.erros, self._formatar_erro(pos, msg), pos)
 
     def analisar(self):
         self.erros = []
-        self.loop_counter = 0
+        self.limites_excedidos = []
+        self.consumo = self.orcamento.iniciar()
+        # Os visitantes indexam as listas da tabela direto (elas só crescem, as referências valem)
+        self._slots, self._valores, self._tipos = self.tabela.slots, self.tabela.valores, self.tabela.tipos
+        self._slot_de = resolver_slots(self.arvore, self.tabela) if isinstance(self.arvore, Node) else {}
         try:
             self._visitar(self.arvore)
+        except LimiteExcedido as e:
+            self._registrar_limite(e)
+        except RecursionError:
+            self._executar_na_vm()
         except Exception as e:
             self.erros.append(f"Erro Crítico de Execução: {str(e)}")
         return self.erros
 
+    def _executar_na_vm(self):
+        """
+        O visitante é recursivo: um aninhamento mais fundo que a pilha do Python é refeito do
+        zero pela MaquinaVirtual, que compila e executa com pilhas explícitas e produz os
+        mesmos erros e a mesma tabela (o orçamento recomeça, como no ExecutorPython).
+        """
+        from src.bytecode import MaquinaVirtual  # bytecode importa este módulo
+        vm = MaquinaVirtual(self.arvore, mapa=self.mapa, orcamento=self.orcamento)
+        vm.analisar()
+        self.tabela, self.erros, self.limites_excedidos, self.consumo = vm.tabela, vm.erros, vm.limites_excedidos, vm.consumo
+
+    def _registrar_limite(self, excecao):
+        # A execução para no primeiro limite estourado; o erro aponta o laço/operação responsável
+        self.erros.append(self._formatar_erro(excecao.pos, excecao.mensagem))
+        self.limites_excedidos.append(excecao.como_dict(self.mapa))
+
     def _visitar(self, node):
-        method_name = f'visitar_{type(node).__name__}'
-        method = getattr(self, method_name, self.visitar_generico)
-        return method(node)
+        return self._despacho[type(node)](node)
 
     def visitar_generico(self, node):
         pass
@@ -87,105 +214,111 @@ class Semantico:
             self._visitar(node.false_block)
 
     def visitar_WhileNode(self, node):
-        limite = 1000
+        consumo = self.consumo
         while self._visitar(node.condition):
             self._visitar(node.block)
-            self.loop_counter += 1
-            if self.loop_counter > limite:
-                self.erros.append(self._formatar_erro(node.pos, "Loop infinito interrompido."))
-                break
+            consumo.passos += 1
+            if consumo.passos >= consumo.proxima_verificacao:
+                consumo.verificar(node.pos)
 
     def visitar_ForNode(self, node):
         self._visitar(node.init)
-        limite = 1000
+        plano = self._planos.get(node, False)
+        if plano is False:
+            plano = self._planos[node] = plano_para(node) if np is not None else None
+        if plano is not None:
+            fim = executar_plano(plano, self._valor_de, self.consumo, node.pos)
+            if fim is not None:
+                self.tabela.definir(plano.variavel, 'int', fim)
+                return
+        consumo = self.consumo
         while self._visitar(node.condition):
             self._visitar(node.block)
             self._visitar(node.increment)
-            self.loop_counter += 1
-            if self.loop_counter > limite:
-                self.erros.append(self._formatar_erro(node.pos, "Loop infinito interrompido."))
-                break
+            consumo.passos += 1
+            if consumo.passos >= consumo.proxima_verificacao:
+                consumo.verificar(node.pos)
 
     def visitar_ArrayNode(self, node):
         tamanho = self._visitar(node.tamanho)
         
         if not isinstance(tamanho, int):
-            self.erros.append(self._formatar_erro(node.pos, "Tamanho do array deve ser inteiro."))
-            return []
+            self._erro(node.pos, "Tamanho do array deve ser inteiro.")
+            return Vetor.zeros(0)
             
         if tamanho < 0:
-            self.erros.append(self._formatar_erro(node.pos, "Tamanho do array não pode ser negativo."))
-            return []
-            
-        return [0] * tamanho
+            self._erro(node.pos, "Tamanho do array não pode ser negativo.")
+            return Vetor.zeros(0)
+
+        self.consumo.alocar(tamanho, node.pos)
+        return Vetor.zeros(tamanho)
 
     def visitar_ArrayAccessNode(self, node):
         nome_array = node.array.nome
-        dados = self.tabela.obter(nome_array)
+        slot = self._slot_de[node.array]
         
-        if not dados:
-            self.erros.append(self._formatar_erro(node.pos, f"Array '{nome_array}' não declarado."))
+        if self._tipos[slot] is None:
+            self._erro(node.pos, f"Array '{nome_array}' não declarado.")
             return 0
         
-        if not isinstance(dados['valor'], list):
-            self.erros.append(self._formatar_erro(node.pos, f"Variável '{nome_array}' não é um array."))
+        vetor = self._valores[slot]
+        if not isinstance(vetor, Vetor):
+            self._erro(node.pos, f"Variável '{nome_array}' não é um array.")
             return 0
 
         indice = self._visitar(node.indice)
-        lista = dados['valor']
+        dados = vetor.dados
 
         if not isinstance(indice, int):
-            self.erros.append(self._formatar_erro(node.pos, "Índice do array deve ser inteiro."))
+            self._erro(node.pos, "Índice do array deve ser inteiro.")
             return 0
             
-        if indice < 0 or indice >= len(lista):
-            self.erros.append(self._formatar_erro(node.pos, f"Índice {indice} fora dos limites."))
+        if indice < 0 or indice >= len(dados):
+            self._erro(node.pos, f"Índice {indice} fora dos limites.")
             return 0
         
-        return lista[indice]
+        return dados[indice]
 
     def visitar_BinOpNode(self, node):
-        op = node.op[1]
+        op = node.opcode
 
-        if op == '=':
+        if op == OP_ATRIBUICAO:
             valor = self._visitar(node.right)
             
             if isinstance(node.left, ArrayAccessNode):
-                nome_arr = node.left.array.nome
-                dados = self.tabela.obter(nome_arr)
+                vetor = self._valores[self._slot_de[node.left.array]]
                 
-                if not dados or not isinstance(dados['valor'], list):
+                if not isinstance(vetor, Vetor):
                     return 0
                 
                 indice = self._visitar(node.left.indice)
+
+                if not isinstance(indice, int):
+                    self._erro(node.left.pos, "Índice do array deve ser inteiro.")
+                    return 0
                 
-                if indice < 0 or indice >= len(dados['valor']):
-                    self.erros.append(self._formatar_erro(node.left.pos, f"Índice {indice} fora dos limites."))
+                if indice < 0 or indice >= len(vetor.dados):
+                    self._erro(node.left.pos, f"Índice {indice} fora dos limites.")
                     return 0
                 
-                dados['valor'][indice] = valor
+                vetor.gravar(indice, valor)
                 return valor
 
-            nome_var = node.left.nome
-            if isinstance(valor, list):
-                tipo = 'array'
-            elif isinstance(valor, float):
-                tipo = 'float'
-            elif isinstance(valor, bool):
-                tipo = 'boolean'
+            slot = self._slot_de[node.left]
+            if self._tipos[slot] is None:
+                self.tabela.definir_slot(slot, tipo_do_valor(valor), valor)
             else:
-                tipo = 'int'
-                
-            self.tabela.definir(nome_var, tipo, valor)
+                self._tipos[slot] = tipo_do_valor(valor)
+                self._valores[slot] = valor
             return valor
 
         val_esq = self._visitar(node.left)
 
-        if op == 'e':
+        if op == OP_E:
             if not val_esq: return False
             return bool(self._visitar(node.right))
         
-        if op == 'ou':
+        if op == OP_OU:
             if val_esq: return True
             return bool(self._visitar(node.right))
 
@@ -194,45 +327,33 @@ class Semantico:
         if val_esq is None or val_dir is None:
             return 0
 
+        if op in _VERIFICADAS:
+            self.consumo.verificar_operacao(SIMBOLOS_OP[op], val_esq, val_dir, node.pos)
+
+        if op == OP_DIV and val_dir == 0:
+            self._erro(node.pos, "Divisão por zero.")
+            return 0
+
         try:
-            if op == '+': return val_esq + val_dir
-            if op == '-': return val_esq - val_dir
-            if op == '*': return val_esq * val_dir
-            
-            if op == '/': 
-                if val_dir == 0:
-                    self.erros.append(self._formatar_erro(node.pos, "Divisão por zero."))
-                    return 0
-                return val_esq / val_dir
-                
-            if op == '**': return val_esq ** val_dir
-            if op == '>': return val_esq > val_dir
-            if op == '<': return val_esq < val_dir
-            if op == '>=': return val_esq >= val_dir
-            if op == '<=': return val_esq <= val_dir
-            if op == '==': return val_esq == val_dir
-            if op == '!=': return val_esq != val_dir
-            
+            return _OPERACOES[op](val_esq, val_dir)
         except Exception:
-            self.erros.append(self._formatar_erro(node.pos, f"Erro na operação '{op}'."))
+            self._erro(node.pos, f"Erro na operação '{SIMBOLOS_OP[op]}'.")
             return 0
 
+    def _valor_de(self, nome):
+        slot = self._slots.get(nome)
+        return self._valores[slot] if slot is not None else None
+
     def visitar_NumeroNode(self, node):
-        valor_str = str(node.valor)
-        try:
-            if '.' in valor_str:
-                return float(valor_str)
-            return int(valor_str)
-        except:
-            return 0
+        return node.valor
 
     def visitar_IdNode(self, node):
-        dados = self.tabela.obter(node.nome)
-        if dados:
-            return dados['valor']
+        slot = self._slot_de[node]
+        if self._tipos[slot] is not None:
+            return self._valores[slot]
         else:
             msg = f"Variável '{node.nome}' não definida."
             erro_fmt = self._formatar_erro(node.pos, msg)
             if erro_fmt not in self.erros:
-                self.erros.append(erro_fmt)
+                self.consumo.registrar_erro(self.erros, erro_fmt, node.pos)
             return 0
\ No newline at end of file
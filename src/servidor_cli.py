@@ -0,0 +1,113 @@
+import json
+import os
+import signal
+import socket
+import sys
+
+def caminho_socket():
+    """
+    Socket padrão do modo --servidor (um por usuário); COMPILADOR_SOCKET troca o caminho.
+    Sem o módulo tempfile: o --cliente importa este módulo a cada chamada
+    """
+    caminho = os.environ.get('COMPILADOR_SOCKET')
+    if caminho: return caminho
+    getuid = getattr(os, 'getuid', None)  # ausente no Windows
+    usuario = getuid() if getuid is not None else os.environ.get('USERNAME') or os.environ.get('USER') or "usuario"
+    pasta = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or os.environ.get('TEMP') or "/tmp"
+    return os.path.join(pasta, f"mini_compilador-{usuario}.sock")
+
+class ServidorIndisponivel(Exception):
+    """ Nenhum servidor respondendo no socket """
+
+# --- Protocolo: uma conexão por pedido; o cliente manda um JSON e fecha a escrita, o
+# servidor responde com outro JSON e fecha a conexão ---
+
+def _ler_tudo(conexao):
+    partes = []
+    while True:
+        parte = conexao.recv(65536)
+        if not parte: return b"".join(partes)
+        partes.append(parte)
+
+def enviar(pedido, caminho=None):
+    """ Manda 'pedido' ao servidor e devolve a resposta (dict); ServidorIndisponivel se não há servidor """
+    caminho = caminho or caminho_socket()
+    if not hasattr(socket, 'AF_UNIX'):
+        raise ServidorIndisponivel("Sockets Unix indisponíveis nesta plataforma.")
+    conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            conexao.connect(caminho)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ServidorIndisponivel(f"Nenhum servidor em '{caminho}' ({e.strerror}).") from None
+        conexao.sendall(json.dumps(pedido, ensure_ascii=False).encode("utf-8"))
+        conexao.shutdown(socket.SHUT_WR)
+        return json.loads(_ler_tudo(conexao))
+    finally:
+        conexao.close()
+
+def servir(tratar, caminho=None, trabalhadores=1, ao_iniciar=None):
+    """
+    Atende pedidos no socket Unix 'caminho' até Ctrl-C ou SIGTERM: 'tratar(pedido)' devolve o
+    dict da resposta, e uma exceção dele vira {'erro': mensagem}. Com mais de um trabalhador,
+    processos filhos (fork, já com os módulos importados) disputam o mesmo socket; cada processo
+    atende um pedido por vez, então 'tratar' pode redirecionar o stdout sem travas.
+    'ao_iniciar()' é chamada quando o socket já aceita conexões.
+    """
+    caminho = caminho or caminho_socket()
+    servidor = _abrir(caminho)
+    if ao_iniciar is not None: ao_iniciar()
+    filhos = []
+    # SIGTERM passa pelos 'finally' (remove o socket e encerra os filhos) como o Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for _ in range(trabalhadores - 1):
+            pid = os.fork()
+            if pid == 0:
+                try: _atender(servidor, tratar)
+                except (KeyboardInterrupt, SystemExit): pass
+                finally: os._exit(0)
+            filhos.append(pid)
+        _atender(servidor, tratar)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in filhos:
+            try:
+                os.kill(pid, signal.SIGTERM); os.waitpid(pid, 0)
+            except OSError:
+                pass
+        servidor.close()
+        try: os.unlink(caminho)
+        except OSError: pass
+
+def _abrir(caminho):
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError("Sockets Unix indisponíveis nesta plataforma.")
+    if os.path.exists(caminho):
+        # Sobra de um servidor que morreu sem apagar o arquivo? Só apaga se ninguém atende
+        try:
+            enviar({'ping': True}, caminho)
+        except (ServidorIndisponivel, OSError, ValueError):
+            os.unlink(caminho)
+        else:
+            raise OSError(f"Já existe um servidor em '{caminho}'.")
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    servidor.bind(caminho)
+    os.chmod(caminho, 0o600)  # o servidor executa programas: só o próprio usuário conecta
+    servidor.listen(128)
+    return servidor
+
+def _atender(servidor, tratar):
+    while True:
+        conexao, _ = servidor.accept()
+        with conexao:
+            try:
+                pedido = json.loads(_ler_tudo(conexao))
+                resposta = {'ok': True} if pedido.get('ping') else tratar(pedido)
+            except Exception as e:
+                resposta = {'erro': str(e)}
+            try:
+                conexao.sendall(json.dumps(resposta, ensure_ascii=False).encode("utf-8"))
+            except OSError:
+                pass  # cliente desistiu antes da resposta
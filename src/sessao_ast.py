@@ -0,0 +1,49 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class ArvoresSessao:
+    """
+    Árvores sintáticas guardadas no servidor para a visualização paginada (formato_ast='paginado'):
+    a compilação guarda a raiz e devolve um id; GET /api/ast/<id> lê pedaços dela depois.
+    Os nós são compartilhados e nunca alterados, então guardar a raiz não copia nada.
+    LRU limitada a 'max_arvores'; uma árvore sem consultas por 'validade' segundos é descartada.
+    """
+    def __init__(self, max_arvores=64, validade=1800.0):
+        self.max_arvores = max_arvores
+        self.validade = validade
+        self._arvores = OrderedDict()  # id -> (raiz, último acesso)
+        self._trava = threading.Lock()
+
+    def guardar(self, raiz):
+        id_arvore = uuid.uuid4().hex
+        with self._trava:
+            self._arvores[id_arvore] = (raiz, time.time())
+            self._limpar()
+        return id_arvore
+
+    def obter(self, id_arvore):
+        """ A raiz guardada (renovando a validade), ou None se não existe ou já foi descartada """
+        with self._trava:
+            self._limpar()
+            entrada = self._arvores.get(id_arvore)
+            if entrada is None: return None
+            self._arvores[id_arvore] = (entrada[0], time.time())
+            self._arvores.move_to_end(id_arvore)
+            return entrada[0]
+
+    def __contains__(self, id_arvore):
+        return self.obter(id_arvore) is not None
+
+    def estatisticas(self):
+        with self._trava:
+            return {'arvores': len(self._arvores), 'max_arvores': self.max_arvores, 'validade': self.validade}
+
+    def _limpar(self):
+        # Chamado com a trava: as mais antigas ficam no começo
+        limite = time.time() - self.validade
+        while self._arvores:
+            id_arvore, (_, acesso) = next(iter(self._arvores.items()))
+            if acesso >= limite and len(self._arvores) <= self.max_arvores: break
+            del self._arvores[id_arvore]
@@ -0,0 +1,198 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.compilador_api import compilar_para_web
+from src.orcamento import Orcamento
+
+# Estados de uma tarefa; de CONCLUIDA em diante são finais
+NA_FILA, EXECUTANDO, CONCLUIDA, CANCELADA, EXPIRADA, FALHOU = 'na_fila', 'executando', 'concluida', 'cancelada', 'expirada', 'falhou'
+_FINAIS = (CONCLUIDA, CANCELADA, EXPIRADA, FALHOU)
+
+class FilaCheia(Exception):
+    """ Já há tarefas demais esperando ou executando """
+
+class _Interrompida(Exception):
+    """ Cancelamento ou prazo percebido entre duas fases """
+
+def _compilar_padrao(codigo, modo_execucao, orcamento, otimizar, progresso, formato_ast):
+    return compilar_para_web(codigo, modo_execucao, orcamento=orcamento, otimizar=otimizar, progresso=progresso,
+                             formato_ast=formato_ast)
+
+class Tarefa:
+    """
+    Uma compilação submetida à FilaTarefas. 'parciais' guarda cada parte do resultado assim
+    que a fase correspondente termina (tokens e AST ficam disponíveis antes da execução);
+    'resultados' é o dict completo de compilar_para_web quando a tarefa conclui.
+    Com 'eventos' (uma queue.Queue), cada parte também é enviada como (fase, campos) e o
+    fim como ('fim', resumo()), para quem acompanha a tarefa em tempo real.
+    """
+    def __init__(self, codigo, modo_execucao, orcamento, otimizar, eventos=None, formato_ast='json'):
+        self.id = uuid.uuid4().hex
+        self.codigo = codigo
+        self.modo_execucao = modo_execucao
+        self.orcamento = orcamento
+        self.otimizar = otimizar
+        self.formato_ast = formato_ast
+        self.estado = NA_FILA
+        self.fases_concluidas = []
+        self.parciais = {}
+        self.resultados = None
+        self.erro = None
+        self.criada = time.time()
+        self.iniciada = self.terminada = None
+        self.interrupcao = threading.Event()
+        self.motivo_interrupcao = None  # CANCELADA ou EXPIRADA
+        self.future = None
+        self.eventos = eventos
+
+    @property
+    def final(self):
+        return self.estado in _FINAIS
+
+    def como_dict(self):
+        agora = time.time()
+        dados = {
+            'id': self.id, 'estado': self.estado, 'modo_execucao': self.modo_execucao,
+            'fases_concluidas': list(self.fases_concluidas),
+            'espera_segundos': round((self.iniciada or self.terminada or agora) - self.criada, 3),
+            'execucao_segundos': round((self.terminada or agora) - self.iniciada, 3) if self.iniciada else None,
+            'cancelamento_pedido': self.motivo_interrupcao == CANCELADA,
+        }
+        if self.resultados is not None: dados['resultados'] = self.resultados
+        else: dados['parciais'] = dict(self.parciais)
+        if self.erro: dados['erro_geral'] = self.erro
+        return dados
+
+    def resumo(self):
+        dados = {'id': self.id, 'estado': self.estado, 'sucesso': bool(self.resultados and self.resultados['sucesso'])}
+        if self.resultados is not None: dados['metricas'] = self.resultados['metricas']
+        if self.erro: dados['erro_geral'] = self.erro
+        return dados
+
+class FilaTarefas:
+    """
+    Compilações assíncronas num pool de threads do próprio processo: submeter() devolve a
+    Tarefa na hora e um dos 'trabalhadores' a executa depois. Cada tarefa tem 'tempo_limite'
+    segundos desde o início; ao estourar, ou com cancelar(), a execução para na próxima
+    verificação do orçamento (Orcamento.interrupcao) ou entre duas fases.
+    Tarefas terminadas ficam consultáveis por 'retencao' segundos.
+    'compilar(codigo, modo_execucao, orcamento, otimizar, progresso, formato_ast)' faz a compilação
+    (padrão: compilar_para_web); 'ao_concluir(resultados)' é chamada a cada tarefa concluída.
+    """
+    def __init__(self, compilar=None, trabalhadores=2, max_pendentes=64, tempo_limite=60.0, retencao=300.0,
+                 ao_concluir=None):
+        self.compilar = compilar or _compilar_padrao
+        self.trabalhadores = trabalhadores
+        self.max_pendentes = max_pendentes
+        self.tempo_limite = tempo_limite
+        self.retencao = retencao
+        self.ao_concluir = ao_concluir
+        self._tarefas = {}
+        self._trava = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="tarefa")
+
+    def submeter(self, codigo, modo_execucao='interpretador', orcamento=None, otimizar=False, eventos=None, formato_ast='json'):
+        tarefa = Tarefa(codigo, modo_execucao, orcamento or Orcamento(), otimizar, eventos, formato_ast)
+        with self._trava:
+            self._limpar()
+            pendentes = sum(1 for t in self._tarefas.values() if not t.final)
+            if pendentes >= self.max_pendentes:
+                raise FilaCheia(f"Fila de tarefas cheia ({self.max_pendentes} pendentes).")
+            self._tarefas[tarefa.id] = tarefa
+            tarefa.future = self._executor.submit(self._executar, tarefa)
+        return tarefa
+
+    def consultar(self, id_tarefa):
+        """ como_dict() da tarefa (cópia consistente), ou None se não existe ou já foi descartada """
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            return tarefa.como_dict() if tarefa is not None else None
+
+    def cancelar(self, id_tarefa):
+        """ Pede o cancelamento; devolve como_dict() da tarefa ou None se não existe """
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None: return None
+            if not tarefa.final:
+                self._interromper(tarefa, CANCELADA)
+                # Ainda na fila: nunca vai rodar
+                if tarefa.estado == NA_FILA and tarefa.future.cancel():
+                    tarefa.estado, tarefa.terminada = CANCELADA, time.time()
+                    if tarefa.eventos is not None: tarefa.eventos.put(('fim', tarefa.resumo()))
+            return tarefa.como_dict()
+
+    def estatisticas(self):
+        with self._trava:
+            contagem = {}
+            for tarefa in self._tarefas.values():
+                contagem[tarefa.estado] = contagem.get(tarefa.estado, 0) + 1
+        return {'trabalhadores': self.trabalhadores, 'max_pendentes': self.max_pendentes,
+                'tempo_limite': self.tempo_limite, 'tarefas': contagem}
+
+    def encerrar(self, esperar=True):
+        with self._trava:
+            for tarefa in self._tarefas.values():
+                if not tarefa.final: self._interromper(tarefa, CANCELADA)
+        self._executor.shutdown(wait=esperar)
+
+    # --- Execução (threads do pool) ---
+
+    def _executar(self, tarefa):
+        with self._trava:
+            if tarefa.estado != NA_FILA: return
+            tarefa.estado, tarefa.iniciada = EXECUTANDO, time.time()
+        prazo = threading.Timer(self.tempo_limite, self._expirar, (tarefa,))
+        prazo.daemon = True
+        prazo.start()
+
+        def progresso(fase, campos):
+            with self._trava:
+                tarefa.parciais.update(campos)
+                tarefa.fases_concluidas.append(fase)
+            if tarefa.eventos is not None: tarefa.eventos.put((fase, campos))
+            if tarefa.interrupcao.is_set(): raise _Interrompida()
+
+        resultados = erro = None
+        try:
+            orcamento = tarefa.orcamento.com_interrupcao(tarefa.interrupcao)
+            resultados = self.compilar(tarefa.codigo, tarefa.modo_execucao, orcamento, tarefa.otimizar, progresso,
+                                       tarefa.formato_ast)
+        except _Interrompida:
+            pass
+        except Exception as e:
+            erro = f"Erro interno do servidor ao compilar: {str(e)}"
+        finally:
+            prazo.cancel()
+
+        interrompida = resultados is None or any(l['limite'] == 'interrompido' for l in resultados['limites_excedidos'])
+        with self._trava:
+            tarefa.terminada = time.time()
+            if erro is not None:
+                tarefa.estado, tarefa.erro = FALHOU, erro
+            elif interrompida:
+                tarefa.estado = tarefa.motivo_interrupcao
+                if tarefa.estado == EXPIRADA:
+                    tarefa.erro = f"Tarefa interrompida: mais de {self.tempo_limite:g}s de execução."
+            else:
+                tarefa.estado, tarefa.resultados = CONCLUIDA, resultados
+                tarefa.parciais = {}
+            if tarefa.eventos is not None: tarefa.eventos.put(('fim', tarefa.resumo()))
+        if tarefa.estado == CONCLUIDA and self.ao_concluir is not None:
+            self.ao_concluir(resultados)
+
+    def _expirar(self, tarefa):
+        with self._trava:
+            if not tarefa.final: self._interromper(tarefa, EXPIRADA)
+
+    @staticmethod
+    def _interromper(tarefa, motivo):
+        if tarefa.motivo_interrupcao is None: tarefa.motivo_interrupcao = motivo
+        tarefa.interrupcao.set()
+
+    def _limpar(self):
+        # Chamado com a trava: descarta tarefas terminadas há mais de 'retencao' segundos
+        limite = time.time() - self.retencao
+        for id_tarefa in [t.id for t in self._tarefas.values() if t.final and t.terminada < limite]:
+            del self._tarefas[id_tarefa]
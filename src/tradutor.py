@@ -1,51 +1,99 @@
-from src.parser_ast import BinOpNode, NumeroNode, IdNode, IfNode, WhileNode, ForNode, BlockNode, ArrayNode, ArrayAccessNode
+from src.parser_ast import BinOpNode, NumeroNode, IdNode, IfNode, WhileNode, ForNode, BlockNode, ArrayNode, ArrayAccessNode, CommentNode
+from src.parser_ast import OP_ATRIBUICAO, OP_SOMA, OP_MENOR, OP_MENOR_IGUAL, OP_E, OP_OU, SIMBOLOS_OP
+from src.otimizador import TiposInferidos, variaveis_atribuidas
+
+# Os tradutores são recursivos (mais rápidos em programas comuns). Se o aninhamento passar da
+# pilha do Python, a tradução é refeita pelas versões *_pilha, com pilhas explícitas.
+
+def _montar(raiz, binarios, acesso, array):
+    """
+    Texto de uma expressão com pilha explícita. Os dois formatos são concatenações na ordem
+    da árvore: 'binarios' dá, por opcode, os textos (antes, entre, depois) dos operandos;
+    'acesso' e 'array' dão os textos (antes, depois) do índice e do tamanho.
+    Textos na pilha saem como estão.
+    """
+    partes = []
+    emitir = partes.append
+    pendentes = [raiz]
+    while pendentes:
+        node = pendentes.pop()
+        if isinstance(node, str):
+            emitir(node)
+        elif isinstance(node, BinOpNode):
+            antes, entre, depois = binarios[node.opcode]
+            emitir(antes)
+            pendentes += (depois, node.right, entre, node.left)
+        elif isinstance(node, NumeroNode):
+            emitir(node.texto)
+        elif isinstance(node, IdNode):
+            emitir(str(node.nome))
+        elif isinstance(node, ArrayAccessNode):
+            antes, depois = acesso
+            emitir(node.array.nome + antes)
+            pendentes += (depois, node.indice)
+        elif isinstance(node, ArrayNode):
+            antes, depois = array
+            emitir(antes)
+            pendentes += (depois, node.tamanho)
+    return "".join(partes)
 
 class Tradutor:
     """ Tradutor para Notação Pós-Fixa (Usado na aba Logs/Saída) """
     def __init__(self):
         self.saida = []
 
+    def formatar(self, node):
+        """ Tradução como texto (uma linha por comando), sem escrever no stdout """
+        self.saida = []
+        try:
+            self._visitar(node)
+        except RecursionError:
+            self.saida = []
+            self._visitar_pilha(node)
+        return "".join(linha + "\n" for linha in self.saida)
+
     def traduzir(self, node):
-        self._visitar(node)
+        print(self.formatar(node), end="")
 
     def _visitar(self, node):
+        emitir = self.saida.append
         if isinstance(node, BlockNode):
             for stmt in node.statements: self._visitar(stmt)
         
         elif isinstance(node, IfNode):
-            print("SE [cond]: ", end=""); print(self._gerar_posfixa(node.condition))
-            print("ENTAO {"); self._visitar(node.true_block); print("}")
+            emitir("SE [cond]: " + self._gerar_posfixa(node.condition))
+            emitir("ENTAO {"); self._visitar(node.true_block); emitir("}")
             if node.false_block:
-                print("SENAO {"); self._visitar(node.false_block); print("}")
+                emitir("SENAO {"); self._visitar(node.false_block); emitir("}")
         
         elif isinstance(node, WhileNode):
-            print("ENQUANTO [cond]: ", end=""); print(self._gerar_posfixa(node.condition))
-            print("FACA {"); self._visitar(node.block); print("}")
+            emitir("ENQUANTO [cond]: " + self._gerar_posfixa(node.condition))
+            emitir("FACA {"); self._visitar(node.block); emitir("}")
         
         elif isinstance(node, ForNode):
             init = self._gerar_posfixa(node.init)
             cond = self._gerar_posfixa(node.condition)
             inc = self._gerar_posfixa(node.increment)
-            print(f"PARA ({init}) ; ({cond}) ; ({inc}) {{"); self._visitar(node.block); print("}")
+            emitir(f"PARA ({init}) ; ({cond}) ; ({inc}) {{"); self._visitar(node.block); emitir("}")
         
         elif isinstance(node, BinOpNode):
-            if node.op[1] == '=':
+            if node.opcode == OP_ATRIBUICAO:
                 # Se for atribuição em Array: fib[i] = ...
                 if hasattr(node.left, 'array'): 
-                     # Imprime: fib i <valor> =
-                     print(f"{node.left.array.nome} {self._gerar_posfixa(node.left.indice)} {self._gerar_posfixa(node.right)} =")
+                     # Gera: fib i <valor> =
+                     emitir(f"{node.left.array.nome} {self._gerar_posfixa(node.left.indice)} {self._gerar_posfixa(node.right)} =")
                 else:
                      # Atribuição normal: x 10 =
-                     print(f"{node.left.nome} {self._gerar_posfixa(node.right)} =")
+                     emitir(f"{node.left.nome} {self._gerar_posfixa(node.right)} =")
             else:
-                print(self._gerar_posfixa(node))
+                emitir(self._gerar_posfixa(node))
 
     def _gerar_posfixa(self, node):
         if isinstance(node, BinOpNode):
-            return f"{self._gerar_posfixa(node.left)} {self._gerar_posfixa(node.right)} {node.op[1]}"
+            return f"{self._gerar_posfixa(node.left)} {self._gerar_posfixa(node.right)} {SIMBOLOS_OP[node.opcode]}"
         
         elif isinstance(node, NumeroNode): 
-            return str(node.valor)
+            return node.texto
         
         elif isinstance(node, IdNode): 
             return str(node.nome)
@@ -60,13 +108,65 @@ class Tradutor:
         
         return ""
 
+    # --- Versão com pilha explícita (aninhamento profundo) ---
+
+    def _visitar_pilha(self, raiz):
+        # Textos na pilha são emitidos ao sair dela, nós são visitados
+        emitir = self.saida.append
+        posfixa = self._gerar_posfixa_pilha
+        pendentes = [raiz]
+        while pendentes:
+            node = pendentes.pop()
+            if isinstance(node, str):
+                emitir(node)
+
+            elif isinstance(node, BlockNode):
+                pendentes += reversed(node.statements)
+
+            elif isinstance(node, IfNode):
+                emitir("SE [cond]: " + posfixa(node.condition))
+                emitir("ENTAO {")
+                if node.false_block:
+                    pendentes += ("}", node.false_block, "SENAO {")
+                pendentes += ("}", node.true_block)
+
+            elif isinstance(node, WhileNode):
+                emitir("ENQUANTO [cond]: " + posfixa(node.condition))
+                emitir("FACA {")
+                pendentes += ("}", node.block)
+
+            elif isinstance(node, ForNode):
+                emitir(f"PARA ({posfixa(node.init)}) ; ({posfixa(node.condition)}) ; ({posfixa(node.increment)}) {{")
+                pendentes += ("}", node.block)
+
+            elif isinstance(node, BinOpNode):
+                if node.opcode != OP_ATRIBUICAO:
+                    emitir(posfixa(node))
+                elif hasattr(node.left, 'array'):
+                    emitir(f"{node.left.array.nome} {posfixa(node.left.indice)} {posfixa(node.right)} =")
+                else:
+                    emitir(f"{node.left.nome} {posfixa(node.right)} =")
+
+    def _gerar_posfixa_pilha(self, node):
+        return _montar(node, _BINARIOS_POSFIXA, (" ", " @"), ("[", "]"))
+
+# x y + : textos (antes, entre, depois) dos operandos de cada opcode
+_BINARIOS_POSFIXA = tuple(("", " ", " " + simbolo) for simbolo in SIMBOLOS_OP)
+
 # --- Gerador de código PYTHON ---
 class Gerador:
     def __init__(self):
         self.indentacao = 0
 
     def traduzir(self, node):
-        return self._visitar(node)
+        indentacao = self.indentacao
+        try:
+            return self._visitar(node)
+        except RecursionError:
+            self.indentacao = indentacao
+            partes = []
+            self._visitar_pilha(node, partes)
+            return "".join(partes)
 
     def _indent(self, codigo):
         return "    " * self.indentacao + codigo
@@ -108,7 +208,7 @@ class Gerador:
             return code
 
         elif isinstance(node, BinOpNode):
-            if node.op[1] == '=':
+            if node.opcode == OP_ATRIBUICAO:
                 # Atribuição Array Python: fib[int(i)] = ...
                 if isinstance(node.left, ArrayAccessNode):
                     nome_array = node.left.array.nome
@@ -129,16 +229,14 @@ class Gerador:
         if isinstance(node, BinOpNode):
             e = self._visitar_expr(node.left)
             d = self._visitar_expr(node.right)
-            op = node.op[1]
             # Mapeamento de operadores para Python
-            if op == 'e': op = 'and'
-            elif op == 'ou': op = 'or'
-            elif op == '^': op = '**'
-            elif op == '!=': op = '!=' 
+            if node.opcode == OP_E: op = 'and'
+            elif node.opcode == OP_OU: op = 'or'
+            else: op = SIMBOLOS_OP[node.opcode]
             return f"({e} {op} {d})"
         
         elif isinstance(node, NumeroNode): 
-            return str(node.valor)
+            return node.texto
         
         elif isinstance(node, IdNode): 
             return str(node.nome)
@@ -155,4 +253,178 @@ class Gerador:
             indice = self._visitar_expr(node.indice)
             return f"{nome}[int({indice})]"
         
-        return ""
\ No newline at end of file
+        return ""
+
+    # --- Versão com pilha explícita (aninhamento profundo) ---
+
+    def _visitar_pilha(self, raiz, partes):
+        # Textos na pilha são emitidos ao sair dela e inteiros mudam a indentação
+        emitir = partes.append
+        expr = self._visitar_expr_pilha
+        pendentes = [raiz]
+        while pendentes:
+            node = pendentes.pop()
+            if isinstance(node, str):
+                emitir(node)
+
+            elif isinstance(node, int):
+                self.indentacao += node
+
+            elif isinstance(node, BlockNode):
+                if not node.statements:
+                    emitir(self._indent("pass")); continue
+                # Comandos separados por quebra de linha
+                itens = []
+                for stmt in reversed(node.statements): itens += (stmt, "\n")
+                itens.pop()
+                pendentes += itens
+
+            elif isinstance(node, IfNode):
+                emitir(self._indent(f"if {expr(node.condition)}:\n"))
+                if node.false_block:
+                    pendentes += (-1, node.false_block, 1, "\n" + self._indent("else:\n"))
+                pendentes += (-1, node.true_block, 1)
+
+            elif isinstance(node, WhileNode):
+                emitir(self._indent(f"while {expr(node.condition)}:\n"))
+                pendentes += (-1, node.block, 1)
+
+            elif isinstance(node, ForNode):
+                init, inc = [], []
+                self._visitar_pilha(node.init, init); self._visitar_pilha(node.increment, inc)
+                emitir("".join(init) + "\n" + self._indent(f"while {expr(node.condition)}:\n"))
+                self.indentacao += 1; fim = "\n" + self._indent("".join(inc).strip()); self.indentacao -= 1
+                pendentes += (-1, fim, node.block, 1)
+
+            elif isinstance(node, BinOpNode):
+                if node.opcode != OP_ATRIBUICAO:
+                    emitir(self._indent(expr(node)))
+                elif isinstance(node.left, ArrayAccessNode):
+                    emitir(self._indent(f"{node.left.array.nome}[int({expr(node.left.indice)})] = {expr(node.right)}"))
+                else:
+                    emitir(self._indent(f"{node.left.nome} = {expr(node.right)}"))
+
+    def _visitar_expr_pilha(self, node):
+        return _montar(node, _BINARIOS_PYTHON, ("[int(", ")]"), ("[0] * int(", ")"))
+
+# Operadores em Python, (x + y) / (x and y): textos (antes, entre, depois) de cada opcode
+_BINARIOS_PYTHON = tuple(("(", " " + {OP_E: 'and', OP_OU: 'or'}.get(op, simbolo) + " ", ")") for op, simbolo in enumerate(SIMBOLOS_OP))
+
+# --- Gerador de código PYTHON otimizado ---
+_INDICE_INTEIRO = {'int', 'bool'}
+
+class GeradorOtimizado(Gerador):
+    """
+    Gerador para execução nativa e para a saída com 'otimizar': mesmo comportamento do
+    Python do Gerador, com menos trabalho por iteração.
+      - 'para (i = a; i < b; i = i + c)' com a e b inteiros, c literal positivo, b sem arrays
+        e sem variáveis alteradas no laço, e i não alterado no corpo, vira 'for i in range(i, b, c)'
+        seguido do ajuste que deixa i com o valor final do 'while' ('<=' usa 'b + 1');
+      - índices e tamanhos que a inferência de tipos prova inteiros saem sem int(...);
+      - o código é montado numa lista de linhas e comentários não geram linhas.
+    Se o aninhamento passar da pilha do Python, a tradução é a do Gerador comum.
+    """
+    def traduzir(self, node):
+        try:
+            self.tipos = TiposInferidos(node, semantica_python=True)
+            self.lacos = set()  # variáveis de 'for ... in range' ativas (sempre inteiras)
+            linhas = []
+            self._comando(node, "", linhas)
+            return "\n".join(linhas)
+        except RecursionError:
+            return super().traduzir(node)
+
+    def _comando(self, node, recuo, linhas):
+        t = type(node)
+        if t is BlockNode:
+            antes = len(linhas)
+            for stmt in node.statements:
+                if type(stmt) is not CommentNode: self._comando(stmt, recuo, linhas)
+            if len(linhas) == antes: linhas.append(recuo + "pass")
+
+        elif t is IfNode:
+            linhas.append(f"{recuo}if {self._expr(node.condition)}:")
+            self._comando(node.true_block, recuo + "    ", linhas)
+            if node.false_block:
+                linhas.append(recuo + "else:")
+                self._comando(node.false_block, recuo + "    ", linhas)
+
+        elif t is WhileNode:
+            linhas.append(f"{recuo}while {self._expr(node.condition)}:")
+            self._comando(node.block, recuo + "    ", linhas)
+
+        elif t is ForNode:
+            contado = self._contado(node)
+            self._comando(node.init, recuo, linhas)
+            if contado is None:
+                linhas.append(f"{recuo}while {self._expr(node.condition)}:")
+                self._comando(node.block, recuo + "    ", linhas)
+                self._comando(node.increment, recuo + "    ", linhas)
+                return
+            var, passo = contado
+            limite = self._expr(node.condition.right)
+            fim = limite if node.condition.opcode == OP_MENOR else f"({limite} + 1)"
+            passo_range = "" if passo.valor == 1 else f", {passo.texto}"
+            linhas.append(f"{recuo}for {var} in range({var}, {fim}{passo_range}):")
+            self.lacos.add(var)
+            self._comando(node.block, recuo + "    ", linhas)
+            self.lacos.discard(var)
+            # O 'while' termina com i no primeiro valor que não passa na condição
+            linhas.append(f"{recuo}if {self._expr(node.condition)}:")
+            linhas.append(f"{recuo}    {var} = ({var} + {passo.texto})")
+
+        elif t is BinOpNode:
+            if node.opcode != OP_ATRIBUICAO:
+                linhas.append(recuo + self._expr(node))
+            elif type(node.left) is ArrayAccessNode:
+                linhas.append(f"{recuo}{node.left.array.nome}[{self._inteiro(node.left.indice)}] = {self._expr(node.right)}")
+            else:
+                linhas.append(f"{recuo}{node.left.nome} = {self._expr(node.right)}")
+
+    def _contado(self, node):
+        """ (variável, NumeroNode do passo) de um 'para' que pode virar 'for ... in range', senão None """
+        init, cond, inc = node.init, node.condition, node.increment
+        if type(init) is not BinOpNode or init.opcode != OP_ATRIBUICAO or type(init.left) is not IdNode: return None
+        var = init.left.nome
+        if 'range' in self.tipos.variaveis or self.tipos.de(init.right) != {'int'}: return None
+        if type(cond) is not BinOpNode or cond.opcode not in (OP_MENOR, OP_MENOR_IGUAL): return None
+        if type(cond.left) is not IdNode or cond.left.nome != var: return None
+        if type(inc) is not BinOpNode or inc.opcode != OP_ATRIBUICAO or type(inc.left) is not IdNode or inc.left.nome != var:
+            return None
+        soma = inc.right
+        if type(soma) is not BinOpNode or soma.opcode != OP_SOMA: return None
+        if type(soma.left) is IdNode and soma.left.nome == var: passo = soma.right
+        elif type(soma.right) is IdNode and soma.right.nome == var: passo = soma.left
+        else: return None
+        if type(passo) is not NumeroNode or type(passo.valor) is not int or passo.valor <= 0: return None
+
+        alteradas = variaveis_atribuidas(node.block, set())
+        if var in alteradas or not self.tipos.de(cond.right) <= _INDICE_INTEIRO: return None
+        # O limite é calculado uma vez: só literais e variáveis que o laço não altera
+        pendentes = [cond.right]
+        while pendentes:
+            n = pendentes.pop()
+            if type(n) is BinOpNode: pendentes += (n.left, n.right)
+            elif type(n) is IdNode:
+                if n.nome == var or n.nome in alteradas: return None
+            elif type(n) is not NumeroNode: return None
+        return var, passo
+
+    def _inteiro(self, node):
+        """ Texto de um índice/tamanho: int(...) só quando o valor pode não ser inteiro """
+        texto = self._expr(node)
+        if (type(node) is IdNode and node.nome in self.lacos) or self.tipos.de(node) <= _INDICE_INTEIRO:
+            return texto
+        return f"int({texto})"
+
+    def _expr(self, node):
+        t = type(node)
+        if t is BinOpNode:
+            op = node.opcode
+            simbolo = 'and' if op == OP_E else 'or' if op == OP_OU else SIMBOLOS_OP[op]
+            return f"({self._expr(node.left)} {simbolo} {self._expr(node.right)})"
+        if t is NumeroNode: return node.texto
+        if t is IdNode: return str(node.nome)
+        if t is ArrayNode: return f"[0] * {self._inteiro(node.tamanho)}"
+        if t is ArrayAccessNode: return f"{node.array.nome}[{self._inteiro(node.indice)}]"
+        return ""
@@ -1,5 +1,147 @@
+import mmap
+from bisect import bisect_right
 from typing import List, Tuple
 
+# Bytes por bloco na leitura de arquivos mapeados (LexicoArquivo, MapaArquivo)
+TAMANHO_BLOCO = 1 << 20
+
+class MapaFonte:
+    """
+    Mapa pos_global -> (linha, coluna) do código-fonte, compartilhado pelas fases.
+    Guarda só os deslocamentos de início de cada linha (construídos uma vez, na
+    primeira consulta) e resolve cada posição com busca binária.
+    """
+    def __init__(self, codigo_fonte: str):
+        self.codigo_fonte = codigo_fonte
+        self.tamanho = len(codigo_fonte)
+        self._inicios = None
+
+    @property
+    def inicios(self):
+        if self._inicios is None:
+            texto = self.codigo_fonte
+            inicios = [0]
+            i = texto.find("\n")
+            while i != -1:
+                inicios.append(i + 1)
+                i = texto.find("\n", i + 1)
+            self._inicios = inicios
+        return self._inicios
+
+    @property
+    def num_linhas(self):
+        return len(self.inicios)
+
+    def contem(self, pos_global: int):
+        # Como no split('\n'), a posição logo após o último caractere ainda pertence à última linha
+        return 0 <= pos_global <= self.tamanho
+
+    def localizar(self, pos_global: int):
+        """ (linha, coluna), com linha a partir de 1; posições além do fim caem na última linha """
+        inicios = self.inicios
+        idx = bisect_right(inicios, max(0, pos_global)) - 1
+        return idx + 1, pos_global - inicios[idx]
+
+    def linha(self, num_linha: int):
+        """ Texto da linha (sem o '\n'), fatiado sob demanda do código-fonte """
+        inicios = self.inicios
+        inicio = inicios[num_linha - 1]
+        fim = inicios[num_linha] - 1 if num_linha < len(inicios) else self.tamanho
+        return self.codigo_fonte[inicio:fim]
+
+def abrir_mapeado(caminho):
+    """
+    Conteúdo do arquivo mapeado em memória (somente leitura): as páginas são lidas do disco
+    sob demanda e não ocupam a memória do processo. Fica válido enquanto houver referências
+    (o arquivo em si já pode ser fechado). Arquivos vazios viram b"" (o mmap não os aceita).
+    """
+    with open(caminho, "rb") as f:
+        if not f.seek(0, 2): return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def blocos_de_linhas(buffer, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Divide os bytes em blocos (início, fim) de ~tamanho_bloco que terminam logo após um '\n'
+    (o último, no fim do buffer): nenhum bloco corta uma linha nem um caractere UTF-8 no meio.
+    Uma linha maior que o bloco fica inteira num bloco só.
+    """
+    inicio, total = 0, len(buffer)
+    while inicio < total:
+        fim = inicio + tamanho_bloco
+        if fim >= total:
+            fim = total
+        else:
+            quebra = buffer.rfind(b"\n", inicio, fim)
+            if quebra == -1: quebra = buffer.find(b"\n", fim)
+            fim = total if quebra == -1 else quebra + 1
+        yield inicio, fim
+        inicio = fim
+
+class MapaArquivo:
+    """
+    MapaFonte de um arquivo mapeado (bytes UTF-8, ver abrir_mapeado), com as posições em
+    caracteres como no MapaFonte. Em vez do início de cada linha guarda só, por bloco de
+    blocos_de_linhas, o byte, o caractere e a linha em que ele começa (montados na primeira
+    consulta). Cada consulta decodifica apenas o bloco da posição ou linha pedida.
+    """
+    def __init__(self, buffer, tamanho_bloco=TAMANHO_BLOCO):
+        self.buffer = buffer
+        self.tamanho_bloco = tamanho_bloco
+        self._blocos = None
+
+    @property
+    def blocos(self):
+        # (bytes, caracteres, linhas) no início de cada bloco, mais o total no fim
+        if self._blocos is None:
+            inicios_byte, inicios_char, inicios_linha = [0], [0], [0]
+            for inicio, fim in blocos_de_linhas(self.buffer, self.tamanho_bloco):
+                trecho = self.buffer[inicio:fim]
+                inicios_byte.append(fim)
+                inicios_char.append(inicios_char[-1] + len(trecho.decode("utf-8")))
+                inicios_linha.append(inicios_linha[-1] + trecho.count(b"\n"))
+            self._blocos = (inicios_byte, inicios_char, inicios_linha)
+        return self._blocos
+
+    @property
+    def tamanho(self):
+        return self.blocos[1][-1]
+
+    @property
+    def num_linhas(self):
+        return self.blocos[2][-1] + 1
+
+    def contem(self, pos_global: int):
+        return 0 <= pos_global <= self.tamanho
+
+    def _bloco(self, inicios, valor):
+        # Índice e texto do bloco em que 'valor' cai; depois do '\n' final vem um bloco vazio,
+        # mas sem '\n' no fim do arquivo a última linha continua no último bloco
+        i = bisect_right(inicios, valor) - 1
+        if i == len(inicios) - 1 and i > 0 and self.buffer[-1:] != b"\n": i -= 1
+        inicios_byte = self.blocos[0]
+        if i == len(inicios_byte) - 1: return i, ""
+        return i, self.buffer[inicios_byte[i]:inicios_byte[i + 1]].decode("utf-8")
+
+    def localizar(self, pos_global: int):
+        """ (linha, coluna), com linha a partir de 1; posições além do fim caem na última linha """
+        _, inicios_char, inicios_linha = self.blocos
+        i, texto = self._bloco(inicios_char, max(0, pos_global))
+        relativa = pos_global - inicios_char[i]
+        # Blocos começam no início de uma linha
+        ate = max(0, relativa)
+        return inicios_linha[i] + texto.count("\n", 0, ate) + 1, relativa - (texto.rfind("\n", 0, ate) + 1)
+
+    def linha(self, num_linha: int):
+        """ Texto da linha (sem o '\n' e sem o '\r' de um fim de linha Windows), do próprio buffer """
+        _, _, inicios_linha = self.blocos
+        i, texto = self._bloco(inicios_linha, num_linha - 1)
+        inicio = 0
+        for _ in range(num_linha - 1 - inicios_linha[i]):
+            inicio = texto.index("\n", inicio) + 1
+        fim = texto.find("\n", inicio)
+        linha = texto[inicio:] if fim == -1 else texto[inicio:fim]
+        return linha[:-1] if linha.endswith("\r") else linha
+
 class ErrorFormatter:
     """
     Formata erros para o Léxico.
@@ -7,23 +149,22 @@ class ErrorFormatter:
       - localizar(pos_global) -> (linha, coluna)
       - formatar_multiplos(linha, lista[(coluna, mensagem)])
     """
-    def __init__(self, linhas):
-        if isinstance(linhas, str):
-            self.linhas = linhas.split("\n")
+    def __init__(self, fonte):
+        if isinstance(fonte, MapaFonte):
+            self.mapa = fonte
+        elif isinstance(fonte, str):
+            self.mapa = MapaFonte(fonte)
         else:
-            self.linhas = linhas  # já é lista
+            self.mapa = MapaFonte("\n".join(fonte))  # lista de linhas
 
     # ------------------------------------------------------------
     # Localiza linha e coluna a partir de pos_global
     # ------------------------------------------------------------
     def localizar(self, pos_global: int):
-        desloc = 0
-        for idx, linha in enumerate(self.linhas, start=1):
-            # +1 por causa do '\n' perdido no split
-            if desloc + len(linha) + 1 > pos_global:
-                return idx, pos_global - desloc
-            desloc += len(linha) + 1
-        return len(self.linhas), max(0, len(self.linhas[-1]))
+        if pos_global > self.mapa.tamanho:
+            num_linhas = self.mapa.num_linhas
+            return num_linhas, len(self.mapa.linha(num_linhas))
+        return self.mapa.localizar(pos_global)
 
     # ------------------------------------------------------------
     # Formatação consolidada para múltiplos erros na MESMA linha
@@ -37,10 +178,10 @@ class ErrorFormatter:
             - coluna c1: msg
             - coluna c2: msg
         """
-        if linha < 1 or linha > len(self.linhas):
+        if linha < 1 or linha > self.mapa.num_linhas:
             return f"posição de linha inválida ({linha})"
 
-        texto = self.linhas[linha - 1]
+        texto = self.mapa.linha(linha)
         largura = len(texto)
 
         # Colunas únicas ordenadas
@@ -70,3 +211,23 @@ class ErrorFormatter:
             f"    {underline_str}\n"
             f"{detalhes}"
         )
+
+def executar_pilha(gerador):
+    """
+    Roda código recursivo escrito como gerador sem usar a pilha do Python: cada
+    'resultado = yield outro_gerador' é uma chamada, e o valor retornado pelo outro
+    gerador volta como resultado do yield. A profundidade fica limitada só pela memória.
+    Exceções sobem como numa chamada comum.
+    """
+    pilha = [gerador]
+    valor = None
+    while True:
+        try:
+            sub = pilha[-1].send(valor)
+        except StopIteration as fim:
+            pilha.pop()
+            if not pilha: return fim.value
+            valor = fim.value
+        else:
+            pilha.append(sub)
+            valor = None
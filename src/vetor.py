@@ -0,0 +1,70 @@
+from array import array
+
+class Vetor:
+    """
+    Array da linguagem ('[n]'). Enquanto só guarda inteiros de 64 bits as células ficam num
+    array('q') compacto (8 bytes cada, sem um objeto int por célula); o primeiro valor de outro
+    tipo (float, booleano, inteiro maior, outro array) promove o armazenamento para uma lista,
+    então cada célula devolve exatamente o valor gravado.
+    'dados' é o armazenamento: os back-ends leem e medem direto nele e gravam com gravar().
+    As operações da linguagem (+, *, comparações, verdade) seguem as de uma lista do Python.
+    """
+    __slots__ = ('dados',)
+
+    def __init__(self, dados):
+        self.dados = dados
+
+    @classmethod
+    def zeros(cls, tamanho):
+        return cls(array('q', (0,)) * tamanho)
+
+    def gravar(self, indice, valor):
+        dados = self.dados
+        if type(valor) is int or type(dados) is list:
+            try:
+                dados[indice] = valor
+                return
+            except (OverflowError, TypeError):
+                pass  # inteiro maior que 64 bits ou índice inválido (a lista dá o erro de sempre)
+        self.dados = dados = list(dados)
+        dados[indice] = valor
+
+    def __len__(self):
+        return len(self.dados)
+
+    def __getitem__(self, indice):
+        return self.dados[indice]
+
+    def __setitem__(self, indice, valor):
+        self.gravar(indice, valor)
+
+    def __iter__(self):
+        return iter(self.dados)
+
+    def lista(self):
+        return self.dados if type(self.dados) is list else self.dados.tolist()
+
+    # --- Operações com semântica de lista ---
+    def __add__(self, outro):
+        if type(outro) is not Vetor: return NotImplemented
+        if type(self.dados) is type(outro.dados): return Vetor(self.dados + outro.dados)
+        return Vetor(self.lista() + outro.lista())
+
+    def __mul__(self, vezes):
+        if not isinstance(vezes, int): return NotImplemented
+        return Vetor(self.dados * vezes)
+
+    __rmul__ = __mul__
+
+    def _comparar(self, outro, op):
+        if type(outro) is not Vetor: return NotImplemented
+        return op(self.lista(), outro.lista())
+
+    def __eq__(self, outro): return self._comparar(outro, list.__eq__)
+    def __ne__(self, outro): return self._comparar(outro, list.__ne__)
+    def __lt__(self, outro): return self._comparar(outro, list.__lt__)
+    def __le__(self, outro): return self._comparar(outro, list.__le__)
+    def __gt__(self, outro): return self._comparar(outro, list.__gt__)
+    def __ge__(self, outro): return self._comparar(outro, list.__ge__)
+
+    __hash__ = None
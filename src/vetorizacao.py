@@ -0,0 +1,253 @@
+import ast
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele os laços rodam sempre um a um
+    np = None
+
+from src.parser_ast import BinOpNode, BlockNode, NumeroNode, IdNode, ArrayAccessNode, CommentNode
+from src.parser_ast import OP_ATRIBUICAO, OP_SOMA, OP_SUB, OP_MULT, OP_MENOR, OP_MENOR_IGUAL
+from src.vetor import Vetor
+
+# Abaixo disso o custo fixo do NumPy passa o do laço escalar
+MIN_ITERACOES = 64
+
+_MIN_INT64, _MAX_INT64 = -2 ** 63, 2 ** 63 - 1
+
+class PlanoVetorial:
+    """
+    Laço 'para (i = ...; i < n; i = i + 1) { v[i + c] = expr }' que pode virar uma única
+    operação do NumPy. 'expressao' é uma árvore de tuplas:
+      ('i',)  ('num', valor)  ('var', nome)  ('ler', nome_array, deslocamento)  ('op', opcode, esq, dir)
+    e 'limite' é ('num', valor) ou ('var', nome). Só entram inteiros, +, - e *.
+    """
+    __slots__ = ('variavel', 'limite', 'inclusivo', 'destino', 'deslocamento', 'expressao', 'multiplica')
+
+    def __init__(self, variavel, limite, inclusivo, destino, deslocamento, expressao):
+        self.variavel = variavel
+        self.limite = limite
+        self.inclusivo = inclusivo
+        self.destino = destino
+        self.deslocamento = deslocamento
+        self.expressao = expressao
+        self.multiplica = _tem_multiplicacao(expressao)
+
+def _tem_multiplicacao(expr):
+    if expr[0] != 'op': return False
+    return expr[1] == OP_MULT or _tem_multiplicacao(expr[2]) or _tem_multiplicacao(expr[3])
+
+# --- Reconhecimento na AST da linguagem (Semantico) ---
+
+def _inteiro(node):
+    return type(node) is NumeroNode and type(node.valor) is int
+
+def _deslocamento(node, var):
+    """ 'i', 'i + c', 'c + i' ou 'i - c' -> c (ou None) """
+    if type(node) is IdNode: return 0 if node.nome == var else None
+    if type(node) is not BinOpNode: return None
+    esq, dir = node.left, node.right
+    if node.opcode == OP_SOMA:
+        if type(esq) is IdNode and esq.nome == var and _inteiro(dir): return dir.valor
+        if type(dir) is IdNode and dir.nome == var and _inteiro(esq): return esq.valor
+    elif node.opcode == OP_SUB:
+        if type(esq) is IdNode and esq.nome == var and _inteiro(dir): return -dir.valor
+    return None
+
+def _expressao(node, var):
+    t = type(node)
+    if t is NumeroNode: return ('num', node.valor) if _inteiro(node) else None
+    if t is IdNode: return ('i',) if node.nome == var else ('var', node.nome)
+    if t is ArrayAccessNode:
+        c = _deslocamento(node.indice, var)
+        return None if c is None else ('ler', node.array.nome, c)
+    if t is BinOpNode and node.opcode in (OP_SOMA, OP_SUB, OP_MULT):
+        esq, dir = _expressao(node.left, var), _expressao(node.right, var)
+        if esq is None or dir is None: return None
+        return ('op', node.opcode, esq, dir)
+    return None
+
+def plano_para(node):
+    """ PlanoVetorial de um ForNode, ou None se o laço não tem a forma reconhecida """
+    cond, inc = node.condition, node.increment
+    if type(cond) is not BinOpNode or cond.opcode not in (OP_MENOR, OP_MENOR_IGUAL): return None
+    if type(cond.left) is not IdNode: return None
+    var = cond.left.nome
+    if _inteiro(cond.right): limite = ('num', cond.right.valor)
+    elif type(cond.right) is IdNode and cond.right.nome != var: limite = ('var', cond.right.nome)
+    else: return None
+
+    # Incremento 'i = i + 1' (ou 'i = 1 + i')
+    if type(inc) is not BinOpNode or inc.opcode != OP_ATRIBUICAO: return None
+    if type(inc.left) is not IdNode or inc.left.nome != var or _deslocamento(inc.right, var) != 1: return None
+
+    # Corpo: uma única atribuição a elemento de array (comentários são ignorados)
+    if type(node.block) is not BlockNode: return None
+    comandos = [c for c in node.block.statements if type(c) is not CommentNode]
+    if len(comandos) != 1: return None
+    cmd = comandos[0]
+    if type(cmd) is not BinOpNode or cmd.opcode != OP_ATRIBUICAO or type(cmd.left) is not ArrayAccessNode: return None
+    deslocamento = _deslocamento(cmd.left.indice, var)
+    expressao = _expressao(cmd.right, var)
+    if deslocamento is None or expressao is None: return None
+    return PlanoVetorial(var, limite, cond.opcode == OP_MENOR_IGUAL, cmd.left.array.nome, deslocamento, expressao)
+
+# --- Reconhecimento no Python emitido pelo Gerador (ExecutorPython) ---
+
+_OPERADORES_PY = {ast.Add: OP_SOMA, ast.Sub: OP_SUB, ast.Mult: OP_MULT}
+
+def _inteiro_py(node):
+    return isinstance(node, ast.Constant) and type(node.value) is int
+
+def _indice_py(node):
+    # O Gerador emite 'a[int(i)]'; o GeradorOtimizado tira o int(...) de índices inteiros
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'int' and len(node.args) == 1:
+        return node.args[0]
+    return node
+
+def _deslocamento_py(node, var):
+    if isinstance(node, ast.Name): return 0 if node.id == var else None
+    if not isinstance(node, ast.BinOp): return None
+    esq, dir = node.left, node.right
+    if isinstance(node.op, ast.Add):
+        if isinstance(esq, ast.Name) and esq.id == var and _inteiro_py(dir): return dir.value
+        if isinstance(dir, ast.Name) and dir.id == var and _inteiro_py(esq): return esq.value
+    elif isinstance(node.op, ast.Sub):
+        if isinstance(esq, ast.Name) and esq.id == var and _inteiro_py(dir): return -dir.value
+    return None
+
+def _acesso_py(node, var):
+    """ 'a[int(i + c)]' ou 'a[(i + c)]' -> (nome, c) """
+    if not isinstance(node, ast.Subscript) or not isinstance(node.value, ast.Name): return None
+    c = _deslocamento_py(_indice_py(node.slice), var)
+    return None if c is None else (node.value.id, c)
+
+def _expressao_py(node, var):
+    if _inteiro_py(node): return ('num', node.value)
+    if isinstance(node, ast.Name): return ('i',) if node.id == var else ('var', node.id)
+    if isinstance(node, ast.Subscript):
+        acesso = _acesso_py(node, var)
+        return None if acesso is None else ('ler',) + acesso
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERADORES_PY:
+        esq, dir = _expressao_py(node.left, var), _expressao_py(node.right, var)
+        if esq is None or dir is None: return None
+        return ('op', _OPERADORES_PY[type(node.op)], esq, dir)
+    return None
+
+def _limite_py(limite, var):
+    if _inteiro_py(limite): return ('num', limite.value)
+    if isinstance(limite, ast.Name) and limite.id != var: return ('var', limite.id)
+    return None
+
+def _plano_corpo_py(var, limite, inclusivo, cmd):
+    """ PlanoVetorial com corpo 'a[i + c] = expr' (um ast.Assign), ou None """
+    if not isinstance(cmd, ast.Assign) or len(cmd.targets) != 1: return None
+    acesso = _acesso_py(cmd.targets[0], var)
+    expressao = _expressao_py(cmd.value, var)
+    if acesso is None or expressao is None: return None
+    return PlanoVetorial(var, limite, inclusivo, acesso[0], acesso[1], expressao)
+
+def plano_while(node):
+    """ PlanoVetorial do 'while' que o Gerador emite para um 'para' (antes das proteções), ou None """
+    teste = node.test
+    if node.orelse or not isinstance(teste, ast.Compare) or len(teste.ops) != 1: return None
+    if not isinstance(teste.ops[0], (ast.Lt, ast.LtE)) or not isinstance(teste.left, ast.Name): return None
+    var = teste.left.id
+    limite = _limite_py(teste.comparators[0], var)
+    if limite is None or len(node.body) != 2: return None
+
+    cmd, inc = node.body
+    if not isinstance(inc, ast.Assign) or len(inc.targets) != 1: return None
+    if not isinstance(inc.targets[0], ast.Name) or inc.targets[0].id != var or _deslocamento_py(inc.value, var) != 1: return None
+    return _plano_corpo_py(var, limite, isinstance(teste.ops[0], ast.LtE), cmd)
+
+def plano_for(node):
+    """ PlanoVetorial do 'for i in range(i, b)' que o GeradorOtimizado emite (antes das proteções), ou None """
+    alvo, chamada = node.target, node.iter
+    if node.orelse or not isinstance(alvo, ast.Name) or len(node.body) != 1: return None
+    if not isinstance(chamada, ast.Call) or not isinstance(chamada.func, ast.Name) or chamada.func.id != 'range': return None
+    var = alvo.id
+    if len(chamada.args) != 2 or not isinstance(chamada.args[0], ast.Name) or chamada.args[0].id != var: return None
+    # '<=' chega como 'range(i, (b + 1))'
+    fim = chamada.args[1]
+    inclusivo = isinstance(fim, ast.BinOp) and isinstance(fim.op, ast.Add) and _inteiro_py(fim.right) and fim.right.value == 1
+    limite = _limite_py(fim.left if inclusivo else fim, var)
+    if limite is None: return None
+    return _plano_corpo_py(var, limite, inclusivo, node.body[0])
+
+# --- Execução ---
+
+def _inteiro64(valor):
+    return type(valor) is int and _MIN_INT64 <= valor <= _MAX_INT64
+
+def _dados_int64(valor):
+    """ Células de um Vetor ainda em array('q'), vistas como int64 (sem cópia); senão None """
+    if type(valor) is not Vetor or type(valor.dados) is not array: return None
+    return np.frombuffer(valor.dados, dtype=np.int64)
+
+def executar_plano(plano, valor_de, consumo, pos=-1):
+    """
+    Executa o laço inteiro de uma vez a partir do estado atual ('valor_de(nome)' devolve o valor
+    da variável ou None). Devolve o valor final da variável do laço, ou None quando o laço precisa
+    rodar escalar: poucas iterações, algum valor que não é inteiro de 64 bits, array já promovido
+    para lista, índice fora dos limites (o escalar gera os erros), dependência entre iterações,
+    resultado que poderia passar de 64 bits ou orçamento de passos/bits que estouraria no meio.
+    Em todos os outros casos o resultado é idêntico ao do laço escalar.
+    """
+    if np is None: return None
+    inicio = valor_de(plano.variavel)
+    limite = plano.limite[1] if plano.limite[0] == 'num' else valor_de(plano.limite[1])
+    if not _inteiro64(inicio) or not _inteiro64(limite): return None
+    fim = limite + 1 if plano.inclusivo else limite
+    n = fim - inicio
+    if n < MIN_ITERACOES: return None
+    orc = consumo.orcamento
+    if consumo.passos + n > orc.max_passos: return None
+    # '*' entre inteiros de até 64 bits nunca passa de 128 bits
+    if plano.multiplica and orc.max_bits < 128: return None
+
+    destino = valor_de(plano.destino)
+    celulas = _dados_int64(destino)
+    if celulas is None: return None
+    a, b = inicio + plano.deslocamento, fim + plano.deslocamento
+    if a < 0 or b > len(celulas): return None
+
+    # Avaliação com intervalos: cada resultado parcial precisa caber em int64
+    def avaliar(expr):
+        tipo = expr[0]
+        if tipo == 'i':
+            return np.arange(inicio, fim, dtype=np.int64), inicio, fim - 1
+        if tipo == 'num' or tipo == 'var':
+            valor = expr[1] if tipo == 'num' else valor_de(expr[1])
+            if not _inteiro64(valor): return None
+            return np.int64(valor), valor, valor
+        if tipo == 'ler':
+            vetor = valor_de(expr[1])
+            dados = _dados_int64(vetor)
+            if dados is None: return None
+            c = expr[2]
+            # Ler uma posição anterior do próprio destino veria valores gravados pelo laço
+            if vetor is destino and c < plano.deslocamento: return None
+            if inicio + c < 0 or fim + c > len(dados): return None
+            fatia = dados[inicio + c:fim + c]
+            return fatia, int(fatia.min()), int(fatia.max())
+        esq, dir = avaliar(expr[2]), avaliar(expr[3])
+        if esq is None or dir is None: return None
+        (x, x0, x1), (y, y0, y1) = esq, dir
+        op = expr[1]
+        if op == OP_SOMA: lo, hi = x0 + y0, x1 + y1
+        elif op == OP_SUB: lo, hi = x0 - y1, x1 - y0
+        else:
+            produtos = (x0 * y0, x0 * y1, x1 * y0, x1 * y1)
+            lo, hi = min(produtos), max(produtos)
+        if lo < _MIN_INT64 or hi > _MAX_INT64: return None
+        return (x + y if op == OP_SOMA else x - y if op == OP_SUB else x * y), lo, hi
+
+    resultado = avaliar(plano.expressao)
+    if resultado is None: return None
+    celulas[a:b] = resultado[0]
+
+    consumo.passos += n
+    if consumo.passos >= consumo.proxima_verificacao:
+        consumo.verificar(pos)
+    return fim
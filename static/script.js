@@ -8,6 +8,7 @@ let astModoVisual = true;
 let dadosSaida = {
     ast: null,
     astJson: null, // JSON para o gráfico D3
+    arvoreAST: null, // id da árvore guardada no servidor (nós carregados ao expandir)
     simbolos: null,
     saida: "Execute uma ação para ver os resultados",
     codigoPython: null
@@ -222,6 +223,36 @@ function selecionarAba(novaAba) {
     atualizarPainelSaida();
 }
 
+// Zoom/posição do gráfico, mantidos quando ele é redesenhado depois de abrir ou fechar um nó
+let transformacaoAST = null;
+
+// Um nó com menos filhos carregados que 'total_filhos' ainda tem filhos só no servidor
+function temFilhosPendentes(dados) {
+    return dados.total_filhos !== undefined && dados.children.length < dados.total_filhos;
+}
+
+// Próxima página de filhos do nó (GET /api/ast/<id>), acrescentada aos que já estão no navegador
+async function carregarFilhosAST(dados) {
+    const url = '/api/ast/' + dadosSaida.arvoreAST + '?no=' + encodeURIComponent(dados.id) + '&inicio=' + dados.children.length;
+    const resposta = await fetch(url);
+    const corpo = await resposta.json();
+    if (!resposta.ok) throw new Error(corpo.erro_geral || "Erro HTTP " + resposta.status + ": Falha no servidor.");
+    corpo.no.children.forEach(function(filho) { dados.children.push(filho); });
+}
+
+// Clique: carrega os filhos pendentes; num nó já completo, fecha a subárvore e libera a memória
+async function alternarNoAST(dados) {
+    if (!dadosSaida.arvoreAST || !dados.total_filhos) return;
+    try {
+        if (temFilhosPendentes(dados)) await carregarFilhosAST(dados);
+        else dados.children = [];
+    } catch (erro) {
+        definirErro("Falha ao carregar a AST: " + erro.message);
+        return;
+    }
+    atualizarPainelSaida();
+}
+
 // --- Função D3.js (Mantida) ---
 function desenharArvoreD3(data) {
     if (!data) return;
@@ -229,15 +260,17 @@ function desenharArvoreD3(data) {
     const width = areaGraficaElemento.clientWidth || 800;
     const height = areaGraficaElemento.clientHeight || 600;
 
+    const zoom = d3.zoom().scaleExtent([0.1, 3]).on("zoom", function(event) {
+        transformacaoAST = event.transform;
+        g.attr("transform", event.transform);
+    });
     const svg = d3.select("#areaGrafica").append("svg")
         .attr("width", "100%")
         .attr("height", "100%")
-        .call(d3.zoom().scaleExtent([0.1, 3]).on("zoom", function(event) {
-            g.attr("transform", event.transform);
-        }));
+        .call(zoom);
 
-    const g = svg.append("g")
-        .attr("transform", "translate(" + (width / 2) + ", 50)");
+    const g = svg.append("g");
+    svg.call(zoom.transform, transformacaoAST || d3.zoomIdentity.translate(width / 2, 50));
 
     const root = d3.hierarchy(data);
     const treeLayout = d3.tree().nodeSize([70, 90]);
@@ -267,6 +300,9 @@ function desenharArvoreD3(data) {
         .attr("fill", function(d) { return COLORS[d.data.type] || COLORS.default; })
         .attr("stroke", "#333")
         .attr("stroke-width", 2)
+        .attr("stroke-dasharray", function(d) { return temFilhosPendentes(d.data) ? "4 3" : null; })
+        .style("cursor", function(d) { return d.data.total_filhos ? "pointer" : null; })
+        .on("click", function(event, d) { alternarNoAST(d.data); })
         .on("mouseover", function() { d3.select(this).attr("stroke", "#fff").attr("stroke-width", 3); })
         .on("mouseout", function() { d3.select(this).attr("stroke", "#333").attr("stroke-width", 2); });
 
@@ -282,7 +318,10 @@ function desenharArvoreD3(data) {
         .style("font-size", "10px")
         .style("pointer-events", "none");
         
-    node.append("title").text(function(d) { return d.data.name; });
+    node.append("title").text(function(d) {
+        if (!temFilhosPendentes(d.data)) return d.data.name;
+        return d.data.name + " (" + (d.data.total_filhos - d.data.children.length) + " filhos não carregados, clique para abrir)";
+    });
 }
 
 function observarMudancaCodigo() {
@@ -316,20 +355,89 @@ async function processarUploadArquivo(evento) {
     }
 }
 
-async function chamarAPICompilacao(codigo) {
-    const url = '/api/compilar';
+// Programas até este tamanho recebem a AST inteira no formato compacto; acima dele, só as
+// primeiras páginas ('paginado'), com o restante carregado ao expandir cada nó
+const MAX_CARACTERES_AST_COMPACTA = 4000;
+
+// Resultados chegam por Server-Sent Events: um evento por fase, assim que ela termina,
+// e um evento 'fim'. 'aoReceberFase' é chamada com os resultados acumulados até ali.
+async function chamarAPICompilacao(codigo, aoReceberFase) {
+    const url = '/api/compilar/stream';
     const resposta = await fetch(url, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ codigo: codigo })
+        body: JSON.stringify({
+            codigo: codigo,
+            formato_ast: codigo.length <= MAX_CARACTERES_AST_COMPACTA ? 'compacto' : 'paginado'
+        })
     });
-    
-    const dados = await resposta.json();
-    if (resposta.ok) {
-        return dados; 
-    } else {
+
+    if (!resposta.ok) {
+        const dados = await resposta.json();
         throw new Error(dados.erro_geral || "Erro HTTP " + resposta.status + ": Falha no servidor.");
     }
+
+    const resultados = {
+        tokens: '', erros_lexicos: [], ast: '', ast_json: null, erros_sintaticos: [], erros_semanticos: [],
+        limites_excedidos: [], tabela_simbolos: '', traducao_posfixa: '', codigo_python: '', sucesso: false
+    };
+    const leitor = resposta.body.getReader();
+    const decodificador = new TextDecoder();
+    let pendente = "";
+
+    while (true) {
+        const parte = await leitor.read();
+        if (parte.done) break;
+        pendente += decodificador.decode(parte.value, { stream: true });
+
+        let fimEvento;
+        while ((fimEvento = pendente.indexOf("\n\n")) >= 0) {
+            const evento = lerEventoSSE(pendente.slice(0, fimEvento));
+            pendente = pendente.slice(fimEvento + 2);
+            if (!evento || evento.nome === 'tarefa') continue;
+
+            if (evento.nome === 'fim') {
+                if (evento.dados.erro_geral) throw new Error(evento.dados.erro_geral);
+                if (evento.dados.estado !== 'concluida') throw new Error("Compilação " + evento.dados.estado + ".");
+                resultados.sucesso = evento.dados.sucesso;
+                return resultados;
+            }
+            Object.assign(resultados, evento.dados);
+            if (evento.dados.ast_compacta) resultados.ast_json = decodificarASTCompacta(evento.dados.ast_compacta);
+            // Só os primeiros níveis; o restante é pedido ao expandir cada nó (carregarFilhosAST)
+            if (evento.dados.ast_paginada) {
+                resultados.ast_json = evento.dados.ast_paginada.raiz;
+                resultados.arvore_ast = evento.dados.ast_paginada.arvore;
+            }
+            if (aoReceberFase) aoReceberFase(evento.nome, resultados);
+        }
+    }
+    throw new Error("Conexão encerrada antes do fim da compilação.");
+}
+
+// Reconstrói a hierarquia {name, type, children} do D3 a partir das listas planas do servidor
+// ('ast_compacta'): os nós vêm em pré-ordem, então o pai de cada nó já foi criado
+function decodificarASTCompacta(compacta) {
+    const total = compacta.pai.length;
+    if (total === 0) return null;
+    const nos = new Array(total);
+    for (let i = 0; i < total; i++) {
+        nos[i] = { name: compacta.nomes[compacta.nome[i]], type: compacta.tipos[compacta.tipo[i]], children: [] };
+        if (compacta.pai[i] >= 0) nos[compacta.pai[i]].children.push(nos[i]);
+    }
+    return nos[0];
+}
+
+function lerEventoSSE(bloco) {
+    let nome = 'message';
+    const linhasDados = [];
+    bloco.split("\n").forEach(function(linha) {
+        if (linha.startsWith("event:")) nome = linha.slice(6).trim();
+        else if (linha.startsWith("data:")) linhasDados.push(linha.slice(5).trimStart());
+    });
+    // Blocos só com comentários (": ping") mantêm a conexão viva
+    if (linhasDados.length === 0) return null;
+    return { nome: nome, dados: JSON.parse(linhasDados.join("\n")) };
 }
 
 async function executarCompilacaoGeral() {
@@ -341,14 +449,25 @@ async function executarCompilacaoGeral() {
     definirCarregando(true);
     definirAlerta(null);
     
-    dadosSaida = { ast: null, astJson: null, simbolos: null, saida: "Iniciando compilação (aguarde)...", codigoPython: null };
+    dadosSaida = { ast: null, astJson: null, arvoreAST: null, simbolos: null, saida: "Iniciando compilação (aguarde)...", codigoPython: null };
+    transformacaoAST = null;
     atualizarPainelSaida();
 
     try {
-        const resultados = await chamarAPICompilacao(codigoEntrada);
+        const resultados = await chamarAPICompilacao(codigoEntrada, function(fase, parciais) {
+            // Mostra cada parte assim que chega; a execução pode continuar por um tempo
+            dadosSaida.ast = parciais.ast || null;
+            dadosSaida.astJson = parciais.ast_json;
+            dadosSaida.arvoreAST = parciais.arvore_ast || null;
+            dadosSaida.simbolos = parciais.tabela_simbolos || null;
+            dadosSaida.codigoPython = parciais.codigo_python || null;
+            dadosSaida.saida = parciais.tokens + "\n\n--- Fase '" + fase + "' concluída, aguardando as próximas... ---";
+            atualizarPainelSaida();
+        });
         
         dadosSaida.ast = resultados.ast;
         dadosSaida.astJson = resultados.ast_json;
+        dadosSaida.arvoreAST = resultados.arvore_ast || null;
         dadosSaida.simbolos = resultados.tabela_simbolos;
         dadosSaida.codigoPython = resultados.codigo_python;
         
@@ -383,7 +502,7 @@ async function executarCompilacaoGeral() {
 }
 
 function limparSaida() {
-    dadosSaida = { ast: null, astJson: null, simbolos: null, saida: "Saída limpa. Execute uma nova compilação.", codigoPython: null };
+    dadosSaida = { ast: null, astJson: null, arvoreAST: null, simbolos: null, saida: "Saída limpa. Execute uma nova compilação.", codigoPython: null };
     areaGraficaElemento.innerHTML = '';
     atualizarPainelSaida();
     selecionarAba('saida');